@@ -1,14 +1,38 @@
+import gzip
+import io
 import json
+import lzma
+import os
+import tempfile
 import unittest
 import tkinter as tk
-from unittest.mock import mock_open, patch, MagicMock
+from unittest.mock import patch, MagicMock
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 import ttkbootstrap as ttk
+import numpy as np
+import matplotlib.dates as mdates
 import pandas as pd
 import plotly.graph_objects as go
+from matplotlib.figure import Figure
 
+import batch_render
+from aggregates import AggregatePyramid, window_aggregates, window_mean
+from alignment import align_devices
+from anomalies import AnomalyTracker, StreamingStats
 from main import ChartApp
 from gui import ChartAppGUI
 from data_processing import DataProcessor
+from chart_builder import (ChartRequest, ChartSpec, FigureArtists, add_effective_temp_traces, add_regular_traces,
+                           build_chart_figure, draw_figure, filter_by_date, to_plotly)
+from data_cache import DeviceDataCache, SeriesCache
+from decimation import decimate_indices
+from device_store import (CompactDeviceFrame, DeviceColumnBuffer, DeviceStore, LazyDeviceFrame, merge_device_frames,
+                          read_device_file)
+from json_stream import JsonRecordStream, split_lines
+from load_progress import LoadCancelled, LoadProgress
+from thermal_comfort import (SENSATION_SCALE, calculate_comfort_index, calculate_effective_temperature,
+                             classify_sensation)
 
 
 class TestChartApp(unittest.TestCase):
@@ -30,7 +54,9 @@ class TestChartApp(unittest.TestCase):
         self.mock_app.avg_three_hours = tk.BooleanVar(value=False)
         self.mock_app.avg_one_day = tk.BooleanVar(value=False)
         self.mock_app.min_max_daily = tk.BooleanVar(value=False)
+        self.mock_app.anomalies = tk.BooleanVar(value=False)
         self.mock_app.chart_style = tk.StringVar(value="line")
+        self.mock_app.comfort_index = tk.StringVar(value="ЭТ")
         self.mock_app.min_datetime = None
         self.mock_app.max_datetime = None
         self.mock_app.chart_figure = None
@@ -43,15 +69,18 @@ class TestChartApp(unittest.TestCase):
             'Тепло': '#FFD700', 'Жарко': '#FF8C00', 'Очень жарко': '#FF0000'
         }
         self.processor = DataProcessor(self.mock_app)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.processor.data_cache = DeviceDataCache(self.cache_dir.name)
 
 
     # ==TestChartAppMain==
     def test_initialization_main(self):
         """TitleBar"""
         self.assertEqual(self.chart_app.title(), "Calculus Graphicus")
-        self.assertEqual(self.chart_app.geometry().split('+')[0], "1200x400")
+        self.assertEqual(self.chart_app.geometry().split('+')[0], "1200x560")
+        self.assertEqual(self.chart_app.minsize(), (1200, 560))
         self.assertFalse(self.chart_app.resizable()[0])
-        self.assertFalse(self.chart_app.resizable()[1])
+        self.assertTrue(self.chart_app.resizable()[1])
 
         """Device data"""
         self.assertIsInstance(self.chart_app.device_data, dict)
@@ -63,6 +92,10 @@ class TestChartApp(unittest.TestCase):
         self.assertIsInstance(self.chart_app.avg_three_hours, tk.BooleanVar)
         self.assertIsInstance(self.chart_app.avg_one_day, tk.BooleanVar)
         self.assertIsInstance(self.chart_app.min_max_daily, tk.BooleanVar)
+        self.assertIsInstance(self.chart_app.anomalies, tk.BooleanVar)
+        self.assertIsInstance(self.chart_app.compact_storage, tk.BooleanVar)
+        self.assertIsInstance(self.chart_app.lazy_loading, tk.BooleanVar)
+        self.assertIsInstance(self.chart_app.follow_file, tk.BooleanVar)
         self.assertIsInstance(self.chart_app.chart_style, tk.StringVar)
 
         """Chart Flags"""
@@ -97,6 +130,8 @@ class TestChartApp(unittest.TestCase):
         self.assertIsNotNone(self.chart_app_gui.humidity_selector)
         self.assertIsNotNone(self.chart_app_gui.load_json_button)
         self.assertIsNotNone(self.chart_app_gui.loading_bar)
+        self.assertIsNotNone(self.chart_app_gui.loading_label)
+        self.assertIsNotNone(self.chart_app_gui.cancel_load_button)
 
     def test_initialize_widgets(self):
         """Styles ttkbootstrap"""
@@ -141,6 +176,8 @@ class TestChartApp(unittest.TestCase):
         self.assertEqual(str(self.chart_app_gui.loading_bar.cget("orient")), "horizontal")
         self.assertEqual(str(self.chart_app_gui.loading_bar.cget("mode")), "determinate")
         self.assertFalse(self.chart_app_gui.loading_bar.winfo_ismapped())
+        self.assertEqual(self.chart_app_gui.cancel_load_button.cget("text"), "Отмена")
+        self.assertFalse(self.chart_app_gui.cancel_load_button.winfo_ismapped())
 
         """device_select_frame"""
         device_select_frame = left_frame.winfo_children()[1]
@@ -150,6 +187,8 @@ class TestChartApp(unittest.TestCase):
         self.assertEqual(str(self.chart_app_gui.device_selector.cget("state")), "readonly")
         self.assertEqual(self.chart_app_gui.device_selector.grid_info()["row"], 0)
         self.assertEqual(self.chart_app_gui.device_selector.grid_info()["column"], 1)
+        self.assertIsInstance(self.chart_app_gui.compare_list, tk.Listbox)
+        self.assertEqual(self.chart_app_gui.compare_list.cget("selectmode"), "extended")
 
         """axis_params_frame"""
         axis_params_frame = left_frame.winfo_children()[2]
@@ -174,6 +213,7 @@ class TestChartApp(unittest.TestCase):
         self.assertEqual(str(self.chart_app_gui.start_hour_entry.cget("state")), "disabled")
         self.assertIsInstance(self.chart_app_gui.temp_selector, ttk.Combobox)
         self.assertEqual(str(self.chart_app_gui.temp_selector.cget("state")), "readonly")
+        self.assertEqual(self.chart_app_gui.comfort_index_selector.get(), "ЭТ")
 
         """chart_type_frame"""
         chart_type_frame = right_frame.winfo_children()[1]
@@ -191,6 +231,7 @@ class TestChartApp(unittest.TestCase):
         build_button = button_frame.winfo_children()[0]
         self.assertIsInstance(build_button, ttk.Button)
         self.assertEqual(build_button.cget("text"), "Построить")
+        self.assertEqual(button_frame.winfo_children()[1].cget("text"), "Открыть интерактивно")
 
     def test_configure_time_validation(self):
         self.assertEqual(self.chart_app_gui.start_hour_entry.cget("validate"), "key")
@@ -276,6 +317,23 @@ class TestChartApp(unittest.TestCase):
         self.assertEqual(str(self.chart_app_gui.start_hour_entry.cget("state")), "disabled")
 
     # ==TestDataProcessor==
+    def test_pick_date(self):
+        gui = self.mock_app.gui
+        self.mock_app.min_datetime = pd.Timestamp("2023-01-01 12:00")
+        self.mock_app.max_datetime = pd.Timestamp("2023-01-05 08:00")
+        with patch('data_processing.Querybox.get_date', return_value=pd.Timestamp("2023-01-03")) as mock_get_date:
+            gui.start_datetime_selector.get.return_value = "02-01-2023"
+            self.processor._pick_date(gui.start_datetime_selector)
+            self.assertEqual(mock_get_date.call_args[0][3], pd.Timestamp("2023-01-02").date())
+            gui.start_datetime_selector.set.assert_called_once_with("03-01-2023")
+            # Пустое поле открывает календарь на границе данных, а не на NaT
+            gui.start_datetime_selector.get.return_value = ""
+            self.processor._pick_date(gui.start_datetime_selector)
+            self.assertEqual(mock_get_date.call_args[0][3], pd.Timestamp("2023-01-01").date())
+            gui.end_datetime_selector.get.return_value = ""
+            self.processor._pick_date(gui.end_datetime_selector)
+            self.assertEqual(mock_get_date.call_args[0][3], pd.Timestamp("2023-01-05").date())
+
     def test_parse_datetime(self):
         self.mock_app.gui.start_datetime_selector.get.return_value = "01-01"
         self.mock_app.gui.start_hour_entry.get.return_value = "12"
@@ -287,6 +345,18 @@ class TestChartApp(unittest.TestCase):
         )
         self.assertEqual(result, (2025, 1, 1, 12, 30))
 
+        # Список дат несёт год, поэтому интервал может переходить через Новый год
+        self.mock_app.gui.start_datetime_selector.get.return_value = "31-12-2024"
+        result = self.processor._parse_datetime(
+            self.mock_app.gui.start_datetime_selector,
+            self.mock_app.gui.start_hour_entry,
+            self.mock_app.gui.start_minute_entry,
+            pd.Timestamp("2025-01-01")
+        )
+        self.assertEqual(result, (2024, 12, 31, 12, 30))
+        self.assertEqual(self.processor._date_strings(pd.Timestamp("2024-12-31 10:00"), pd.Timestamp("2025-01-01")),
+                         ["31-12-2024", "01-01-2025"])
+
         self.mock_app.gui.start_datetime_selector.get.return_value = "invalid"
         result = self.processor._parse_datetime(
             self.mock_app.gui.start_datetime_selector,
@@ -296,16 +366,16 @@ class TestChartApp(unittest.TestCase):
         self.assertIsNone(result)
 
     def test_classify_sensation(self):
-        self.assertEqual(self.processor._classify_sensation(31), "Очень жарко")
-        self.assertEqual(self.processor._classify_sensation(25), "Жарко")
-        self.assertEqual(self.processor._classify_sensation(20), "Тепло")
-        self.assertEqual(self.processor._classify_sensation(15), "Умеренно тепло")
-        self.assertEqual(self.processor._classify_sensation(10), "Прохладно")
-        self.assertEqual(self.processor._classify_sensation(3), "Умеренно холодно")
-        self.assertEqual(self.processor._classify_sensation(-10), "Холодно")
-        self.assertEqual(self.processor._classify_sensation(-20), "Очень холодно")
-        self.assertEqual(self.processor._classify_sensation(-30), "Крайне холодно")
-        self.assertIsNone(self.processor._classify_sensation(float("nan")))
+        self.assertEqual(classify_sensation(31), "Очень жарко")
+        self.assertEqual(classify_sensation(25), "Жарко")
+        self.assertEqual(classify_sensation(20), "Тепло")
+        self.assertEqual(classify_sensation(15), "Умеренно тепло")
+        self.assertEqual(classify_sensation(10), "Прохладно")
+        self.assertEqual(classify_sensation(3), "Умеренно холодно")
+        self.assertEqual(classify_sensation(-10), "Холодно")
+        self.assertEqual(classify_sensation(-20), "Очень холодно")
+        self.assertEqual(classify_sensation(-30), "Крайне холодно")
+        self.assertIsNone(classify_sensation(float("nan")))
 
     #Отсюда тесты без последовательности
     def test_process_json_load(self):
@@ -317,13 +387,638 @@ class TestChartApp(unittest.TestCase):
                 "data": {"weather_temp": 20.5, "weather_humidity": 60.0}
             }
         }
-        with patch('builtins.open', mock_open(read_data=json.dumps(mock_data))):
-            with patch('tkinter.filedialog.askopenfilename', return_value='test.json'):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump(mock_data, file)
+            with patch('tkinter.filedialog.askopenfilenames', return_value=(file_path,)):
                 with patch.object(self.mock_app, 'after') as mock_after:
                     self.processor._process_json_load()
                     self.assertTrue(mock_after.called)
                     self.assertEqual(len(self.mock_app.device_data), 1)
 
+    def test_process_json_load_folder(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for day in (2, 1):
+                mock_data = {str(hour): {"uName": "Test Device", "serial": "12345",
+                                         "Date": f"2023-01-0{day} {hour:02d}:00:00",
+                                         "data": {"weather_temp": day * 10 + hour}} for hour in range(3)}
+                with open(os.path.join(temp_dir, f'day{day}.json'), 'w', encoding='utf-8') as file:
+                    json.dump(mock_data, file)
+            with open(os.path.join(temp_dir, 'notes.csv'), 'w', encoding='utf-8') as file:
+                file.write('skip')
+            self.assertEqual([os.path.basename(path) for path in self.processor._collect_json_files(temp_dir)],
+                             ['day1.json', 'day2.json'])
+            with patch('tkinter.filedialog.askdirectory', return_value=temp_dir):
+                self.processor._process_json_load(folder=True)
+        frame = self.mock_app.device_data["Test Device (12345)"]
+        self.assertEqual(len(frame), 6)
+        self.assertTrue(frame.index.is_monotonic_increasing)
+        self.assertEqual(frame["weather_temp"].tolist(), [10, 11, 12, 20, 21, 22])
+
+    def test_process_json_load_from_cache(self):
+        mock_data = {"0": {"uName": "Test Device", "serial": "12345", "Date": "2023-01-01 12:00:00",
+                           "data": {"weather_temp": 20.5, "system_IP": "10.0.0.1"}}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump(mock_data, file)
+            with patch('tkinter.filedialog.askopenfilenames', return_value=(file_path,)):
+                self.processor._process_json_load()
+                first = self.mock_app.device_data["Test Device (12345)"]
+                with patch('data_processing.read_device_file') as mock_read:
+                    self.processor._process_json_load()
+                    mock_read.assert_not_called()
+        pd.testing.assert_frame_equal(self.mock_app.device_data["Test Device (12345)"], first)
+
+    def test_process_json_load_lazy(self):
+        mock_data = {str(num): {"uName": "Прибор" if num % 2 else "Test Device", "serial": "12345",
+                                "Date": f"2023-01-01 12:0{num}:00",
+                                "data": {"weather_temp": num + 0.5, "weather_humidity": None if num < 2 else 60}}
+                     for num in range(6)}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump(mock_data, file, ensure_ascii=False, indent=1)
+            with patch('tkinter.filedialog.askopenfilenames', return_value=(file_path,)):
+                self.processor._process_json_load(lazy=True)
+            # Устройства каталога не читаются ради пирамид, поэтому фоновое построение не запускается
+            self.assertIsNone(self.processor.pyramid_thread)
+            device_data = self.mock_app.device_data
+            self.assertEqual(list(device_data), ["Test Device (12345)", "Прибор (12345)"])
+            self.assertFalse(device_data.is_loaded("Прибор (12345)"))
+            # Проверка наличия устройства не читает его из файла
+            self.assertIn("Прибор (12345)", device_data)
+            self.assertNotIn("Нет (1)", device_data)
+            self.assertFalse(device_data.is_loaded("Прибор (12345)"))
+            catalog = device_data.entry("Прибор (12345)")
+            self.assertIsInstance(catalog, LazyDeviceFrame)
+            self.assertEqual(catalog.count, 3)
+            self.assertEqual(catalog.columns, ["weather_temp", "weather_humidity"])
+            self.assertAlmostEqual(catalog.null_ratios["weather_humidity"], 1 / 3)
+            self.assertEqual(catalog.time_span, (pd.Timestamp("2023-01-01 12:01"), pd.Timestamp("2023-01-01 12:05")))
+            frame = device_data["Прибор (12345)"]
+            self.assertTrue(device_data.is_loaded("Прибор (12345)"))
+            self.assertIs(device_data["Прибор (12345)"], frame)
+        self.assertEqual(frame["weather_temp"].tolist(), [1.5, 3.5, 5.5])
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+    def _follow_poll(self):
+        """Одна проверка слежения: фоновая часть и её применение выполняются сразу; возвращает изменённые устройства."""
+        processor = self.processor
+        self.mock_app.after.side_effect = lambda delay, callback: callback()
+        with patch.object(processor, '_refresh_appended_data', wraps=processor._refresh_appended_data) as mock_refresh:
+            processor._follow_worker(self.mock_app.device_data, dict(processor.follow_offsets), processor.pyramids,
+                                     dict(processor.pyramids))
+        self.assertIsNone(processor.follow_thread)
+        return mock_refresh.call_args[0][0] if mock_refresh.called else set()
+
+    def test_follow_appended_records(self):
+        mock_data = {str(num): {"uName": "Test Device", "serial": "12345", "Date": f"2023-01-01 12:0{num}:00",
+                                "data": {"weather_temp": num}} for num in range(3)}
+        self.mock_app.gui.device_selector.get.return_value = "Test Device (12345)"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump(mock_data, file)
+            with patch('tkinter.filedialog.askopenfilenames', return_value=(file_path,)):
+                self.processor._process_json_load()
+            self.assertEqual(self._follow_poll(), set())
+            with open(file_path, 'r+', encoding='utf-8') as file:
+                file.seek(self.processor.follow_offsets[file_path])
+                file.write(', "3": {"uName": "Test Device", "serial": "12345", "Date": "2023-01-01 12:03:00", '
+                           '"data": {"weather_temp": 3, "weather_humidity": 50}}, "4": {"uName": "Нов')
+            # Последняя запись ещё не дописана - смещение не сдвигается
+            self.assertEqual(self._follow_poll(), set())
+            with open(file_path, 'a', encoding='utf-8') as file:
+                file.write('ый", "serial": "1", "Date": "2023-01-01 12:04:00", "data": {"weather_temp": 4}}}')
+            with patch('data_processing.read_device_file') as mock_read:
+                changed = self._follow_poll()
+                mock_read.assert_not_called()
+            self.assertEqual(changed, {"Test Device (12345)", "Новый (1)"})
+            self.assertEqual(self.processor.follow_offsets[file_path], os.path.getsize(file_path) - 1)
+        frame = self.mock_app.device_data["Test Device (12345)"]
+        self.assertEqual(frame["weather_temp"].tolist(), [0, 1, 2, 3])
+        self.assertEqual(frame["weather_humidity"].iloc[-1], 50)
+        self.assertEqual(self.mock_app.max_datetime, pd.Timestamp("2023-01-01 12:03:00"))
+
+    def test_follow_records_appended_during_load(self):
+        mock_data = {"0": {"uName": "Test Device", "serial": "12345", "Date": "2023-01-01 12:00:00",
+                           "data": {"weather_temp": 0}}}
+        appended = ', "1": {"uName": "Test Device", "serial": "12345", "Date": "2023-01-01 12:01:00", ' \
+                   '"data": {"weather_temp": 1}}}'
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump(mock_data, file)
+            size = os.path.getsize(file_path)
+
+            def read_and_append(*args, **kwargs):
+                result = read_device_file(*args, **kwargs)
+                # Запись дописывается после разбора, но до начала слежения
+                with open(file_path, 'r+', encoding='utf-8') as file:
+                    file.seek(size - 1)
+                    file.write(appended)
+                return result
+
+            with patch('tkinter.filedialog.askopenfilenames', return_value=(file_path,)), \
+                    patch('data_processing.read_device_file', side_effect=read_and_append):
+                self.processor._process_json_load()
+            self.assertEqual(self.processor.follow_offsets[file_path], size - 1)
+            self.assertEqual(self._follow_poll(), {"Test Device (12345)"})
+            self.assertEqual(self.mock_app.device_data["Test Device (12345)"]["weather_temp"].tolist(), [0, 1])
+            # Из кэша берётся смещение, сохранённое вместе с разобранными данными
+            self.assertEqual(self.processor.data_cache.load(file_path, with_offset=True)[1], size - 1)
+
+    def test_device_data_cache(self):
+        cache = self.processor.data_cache
+        frames = {"A (1)": pd.DataFrame({"x": [1.0, 2.0], "y": [None, 3.0]},
+                                        index=pd.DatetimeIndex(pd.to_datetime(["2023-01-01", "2023-01-02"]),
+                                                               name="Date"))}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                file.write('{}')
+            self.assertIsNone(cache.load(file_path))
+            cache.store(file_path, frames)
+            pd.testing.assert_frame_equal(cache.load(file_path)["A (1)"], frames["A (1)"])
+            with open(file_path, 'w', encoding='utf-8') as file:
+                file.write('{ }')
+            self.assertIsNone(cache.load(file_path))
+            cache.store(file_path, frames)
+            self.assertEqual(len(os.listdir(self.cache_dir.name)), 1)
+
+            other_path = os.path.join(temp_dir, 'other.json')
+            with open(other_path, 'w', encoding='utf-8') as file:
+                file.write('{}')
+            cache.max_bytes = 1
+            cache.store(other_path, frames)
+            self.assertIsNone(cache.load(file_path))
+            self.assertIsNotNone(cache.load(other_path))
+            cache.clear()
+            self.assertIsNone(cache.load(other_path))
+
+    def test_series_cache(self):
+        cache = SeriesCache(max_bytes=200)
+        values = {name: np.zeros(10) for name in "abc"}
+        self.assertIs(cache.get(("A", "a"), lambda: values["a"]), values["a"])
+        cache.get(("B", "b"), lambda: values["b"])
+        self.assertIs(cache.get(("A", "a"), lambda: None), values["a"])
+        # Третий массив не помещается в бюджет - вытесняется давно не использованный B
+        cache.get(("A", "c"), lambda: values["c"])
+        self.assertEqual((cache.hits, cache.misses, len(cache), cache.nbytes), (1, 3, 2, 160))
+        self.assertIsNone(cache.get(("B", "b"), lambda: None))
+        cache.invalidate("A")
+        self.assertEqual((len(cache), cache.nbytes), (1, 0))
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+        index = pd.date_range("2023-01-01", periods=5000, freq="min")
+        data = pd.DataFrame({"t": np.linspace(10, 30, 5000), "h": np.full(5000, 50.0), "x": np.ones(5000)},
+                            index=index)
+        cache = SeriesCache()
+        request = ChartRequest("Dev", data, "Date", ["t"], "line", (index[100], index[4000]),
+                               averages={"avg_one_hour": True, "min_max_daily": True}, cache=cache)
+        first = build_chart_figure(request)
+        misses = cache.misses
+        second = build_chart_figure(request)
+        self.assertEqual(cache.misses, misses)
+        self.assertEqual(cache.hits, misses)
+        for left, right in zip(first.traces, second.traces):
+            np.testing.assert_array_equal(left.y, right.y)
+        # После дозаписи те же параметры считаются заново
+        build_chart_figure(request.with_view(pd.concat([data, data.iloc[-1:].shift(1, freq="min")]), None))
+        self.assertEqual(cache.misses, 2 * misses)
+
+    def test_compact_device_frame(self):
+        index = pd.DatetimeIndex(pd.to_datetime(["2025-05-01 00:00:44", "2025-05-01 00:05:44",
+                                                 "2025-05-01 00:10:45", "2025-05-01 00:15:44"]), name="Date")
+        frame = pd.DataFrame({"system_HDD_Total": [np.nan] * 4, "system_RAM_Total": [2004.0, 2004.0, np.nan, 2004.0],
+                              "system_Processes_Total": [103.0, 104.0, 103.0, 105.0],
+                              "BME280_temp": [23.45, 23.5, 23.61, 23.4], "system_LA1": [0.0, 0.08, 1e-9, 0.1]},
+                             index=index)
+        compact = CompactDeviceFrame.from_frame(frame)
+        kinds = {name: (kind, getattr(payload, 'dtype', None)) for name, kind, payload, _ in compact.columns}
+        self.assertEqual(kinds["system_HDD_Total"][0], "null")
+        self.assertEqual(kinds["system_RAM_Total"][0], "constant")
+        self.assertEqual(kinds["system_Processes_Total"][1], np.float16)
+        self.assertEqual(kinds["BME280_temp"][1], np.float32)
+        self.assertEqual(kinds["system_LA1"][1], np.float64)
+        self.assertEqual(compact.index_deltas.dtype, np.int16)
+        self.assertLess(compact.nbytes, frame.memory_usage().sum())
+        pd.testing.assert_frame_equal(compact.to_frame(), frame)
+
+        store = DeviceStore({"A (1)": compact, "B (1)": frame}, materialized_limit=1)
+        self.assertIs(store["B (1)"], frame)
+        self.assertIs(store["A (1)"], store["A (1)"])
+        self.assertIs(store.entry("A (1)"), compact)
+        self.assertEqual(list(store), ["A (1)", "B (1)"])
+
+    def test_merge_device_frames(self):
+        first = {"A (1)": pd.DataFrame({"x": [2.0]}, index=pd.to_datetime(["2023-01-02"])),
+                 "B (1)": pd.DataFrame({"y": [1.0]}, index=pd.to_datetime(["2023-01-01"]))}
+        second = {"A (1)": pd.DataFrame({"x": [1.0], "z": [5.0]}, index=pd.to_datetime(["2023-01-01"]))}
+        merged = merge_device_frames([first, second])
+        self.assertEqual(list(merged), ["A (1)", "B (1)"])
+        self.assertEqual(merged["A (1)"]["x"].tolist(), [1.0, 2.0])
+        self.assertEqual(list(merged["A (1)"].columns), ["x", "z"])
+        self.assertIs(merged["B (1)"], first["B (1)"])
+        # Повторённая в двух выгрузках запись остаётся одна, из последней выгрузки
+        third = {"A (1)": pd.DataFrame({"x": [7.0]}, index=pd.to_datetime(["2023-01-02"]))}
+        merged = merge_device_frames([first, second, third])
+        self.assertEqual(merged["A (1)"]["x"].tolist(), [1.0, 7.0])
+        self.assertTrue(merged["A (1)"].index.is_unique)
+        # Сворачивание задаётся режимом хранилища, а не видом первой части
+        compact = {"A (1)": CompactDeviceFrame.from_frame(second["A (1)"])}
+        self.assertIsInstance(merge_device_frames([first, compact], compact=True)["A (1)"], CompactDeviceFrame)
+        self.assertIsInstance(merge_device_frames([compact, first])["A (1)"], pd.DataFrame)
+        # Каталог одной выгрузки и свёрнутая часть другой дают каталог, который читается только при обращении
+        file_path = os.path.join(self.cache_dir.name, 'lazy.json')
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump({"0": {"uName": "A", "serial": "1", "Date": "2023-01-03 00:00:00", "data": {"x": 3.0}}}, file)
+        merged = merge_device_frames([compact, read_device_file(file_path, lazy=True)], compact=True)
+        catalog = merged["A (1)"]
+        self.assertIsInstance(catalog, LazyDeviceFrame)
+        self.assertEqual(catalog.count, 2)
+        self.assertEqual(catalog.columns, ["x", "z"])
+        self.assertEqual(catalog.null_ratios, {"x": 0.0, "z": 0.5})
+        self.assertEqual(catalog.time_span, (pd.Timestamp("2023-01-01"), pd.Timestamp("2023-01-03")))
+        store = DeviceStore(merged, compact=True)
+        self.assertFalse(store.is_loaded("A (1)"))
+        self.assertEqual(store["A (1)"]["x"].tolist(), [1.0, 3.0])
+        self.assertIsInstance(store.entry("A (1)"), CompactDeviceFrame)
+
+    def test_device_store_append_records(self):
+        index = pd.date_range("2023-01-01", periods=100, freq="min")
+        frame = pd.DataFrame({"a": np.arange(100.0)}, index=index)
+        tail = pd.DataFrame({"a": [100.0, 101.0], "b": [1.0, np.nan]}, index=index[-1] + pd.to_timedelta([1, 2], "min"))
+        store = DeviceStore({"A": frame})
+        # Новый столбец пересоздаёт массивы, дальше записи копируются в их запас без копирования прежних строк
+        store.append_records({}, {"A": tail}, store.extend_frames({"A": tail}))
+        grown = store["A"]
+        self.assertEqual(grown["a"].tolist(), list(range(102)))
+        self.assertEqual(list(grown.columns), ["a", "b"])
+        more = pd.DataFrame({"a": [102.0]}, index=[grown.index[-1] + pd.Timedelta(minutes=1)])
+        self.assertEqual(store.append_records({}, {"A": more}, store.extend_frames({"A": more})), {"A"})
+        self.assertEqual(len(store["A"]), 103)
+        self.assertTrue(np.shares_memory(store["A"]["a"].to_numpy(), grown["a"].to_numpy()))
+        self.assertEqual(len(grown), 102)
+        # Запись раньше последней сливается с упорядочиванием
+        early = pd.DataFrame({"a": [-1.0]}, index=[index[0] - pd.Timedelta(minutes=1)])
+        store.append_records({}, {"A": early}, store.extend_frames({"A": early}))
+        self.assertEqual(store["A"]["a"].iloc[0], -1.0)
+        self.assertTrue(store["A"].index.is_monotonic_increasing)
+        # Компактное устройство копит дописанные части и сворачивается заново при росте на четверть
+        long_index = pd.date_range("2023-01-01", periods=20000, freq="min")
+        compact = DeviceStore({"C": CompactDeviceFrame.from_frame(pd.DataFrame({"a": np.arange(20000.0)},
+                                                                               index=long_index))}, compact=True)
+        expanded = compact["C"]
+        tail = pd.DataFrame({"a": [1.0, 2.0]},
+                            index=long_index[-1] + pd.to_timedelta([1, 2], "min")).rename_axis("Date")
+        compact.append_records({}, {"C": tail}, compact.extend_frames({"C": tail}))
+        self.assertEqual(len(compact["C"]), 20002)
+        self.assertTrue(np.shares_memory(compact["C"]["a"].to_numpy(), compact._buffers["C"].values))
+        self.assertEqual(compact.entry("C").length, 20000)
+        big = pd.DataFrame({"a": np.ones(5000)},
+                           index=tail.index[-1] + pd.to_timedelta(np.arange(1, 5001), "min")).rename_axis("Date")
+        compact.append_records({}, {"C": big})
+        self.assertEqual(compact.entry("C").length, 25002)
+        self.assertNotIn("C", compact._tails)
+        pd.testing.assert_frame_equal(compact["C"].iloc[:20000], expanded, check_freq=False)
+
+    def test_process_json_load_cancelled(self):
+        mock_data = {"0": {"uName": "Test Device", "serial": "12345", "Date": "2023-01-01 12:00:00",
+                           "data": {"weather_temp": 20.5}}}
+        previous_data = {"Old Device (1)": pd.DataFrame()}
+        self.mock_app.device_data = previous_data
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'test.json')
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump(mock_data, file)
+            with patch('tkinter.filedialog.askopenfilenames', return_value=(file_path,)):
+                with patch.object(LoadProgress, 'check_cancelled', side_effect=LoadCancelled):
+                    with patch('tkinter.messagebox.showerror') as mock_error:
+                        self.processor._process_json_load()
+                        mock_error.assert_not_called()
+        self.assertIs(self.mock_app.device_data, previous_data)
+        self.assertIsNone(self.processor.load_progress)
+
+    def test_read_json_files_parallel_cancelled(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_paths = []
+            for num in range(2):
+                file_paths.append(os.path.join(temp_dir, f'{num}.json'))
+                with open(file_paths[-1], 'w', encoding='utf-8') as file:
+                    json.dump({}, file)
+            progress = LoadProgress(1, MagicMock())
+            progress.cancel()
+            # Отмена останавливает процессы пула, а не ждёт, пока они дочитают свои файлы
+            with patch.object(DataProcessor, '_terminate_workers',
+                              side_effect=DataProcessor._terminate_workers) as mock_terminate:
+                with self.assertRaises(LoadCancelled):
+                    self.processor._read_json_files_parallel(file_paths, [(0, None), (1, None)], [None, None],
+                                                             [None, None], 0, progress, False)
+                mock_terminate.assert_called_once()
+
+    def test_load_progress(self):
+        callback = MagicMock()
+        progress = LoadProgress(1000, callback, interval_ms=60000)
+        progress.update(100)
+        progress.update(200)
+        self.assertEqual(callback.call_count, 1)
+        progress.update(500, force=True)
+        self.assertEqual(callback.call_count, 2)
+        percent, eta = callback.call_args[0]
+        self.assertEqual(percent, 50)
+        self.assertGreaterEqual(eta, 0)
+        self.assertEqual(LoadProgress.format_eta(None), '')
+        self.assertEqual(LoadProgress.format_eta(125), 'осталось ~2 мин 05 с')
+        progress.check_cancelled()
+        progress.cancel()
+        self.assertTrue(progress.cancelled)
+        with self.assertRaises(LoadCancelled):
+            progress.check_cancelled()
+
+    def test_json_record_stream(self):
+        mock_data = {str(num): {"uName": "Сервер", "serial": "01", "Date": f"2023-01-01 12:0{num}:00",
+                                "data": {"system_LA1": num}} for num in range(5)}
+        raw = json.dumps(mock_data, ensure_ascii=False, indent=1).encode('utf-8')
+        # Маленький блок заставляет записи и многобайтовые символы попадать на границу блоков
+        stream = JsonRecordStream(io.BytesIO(raw), chunk_size=7)
+        self.assertEqual(dict(stream), mock_data)
+        self.assertEqual(stream.bytes_read, len(raw))
+        self.assertEqual(list(JsonRecordStream(io.BytesIO(b' {} '))), [])
+        with self.assertRaises(ValueError):
+            list(JsonRecordStream(io.BytesIO(b'{"0": {"uName": "x"}')))
+
+    def test_json_record_stream_lines(self):
+        records = [{"uName": "Сервер", "serial": "01", "Date": f"2023-01-01 12:0{num}:00",
+                    "data": {"system_LA1": num}} for num in range(5)]
+        raw = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        stream = JsonRecordStream(io.BytesIO(raw), chunk_size=7)
+        self.assertEqual([value for _, value in stream], records)
+        with open(os.path.join(self.cache_dir.name, 'test.jsonl'), 'wb') as file:
+            file.write(raw)
+        with open(os.path.join(self.cache_dir.name, 'test.jsonl'), 'rb') as file:
+            ranges = split_lines(file, 3)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], len(raw))
+            parts = []
+            for start, end in ranges:
+                file.seek(start)
+                self.assertTrue(start == 0 or raw[start - 1:start] == b'\n')
+                parts.extend(value for _, value in JsonRecordStream(file, lines=True, length=end - start))
+        self.assertEqual(parts, records)
+
+    def test_process_json_load_compressed(self):
+        records = [{"uName": "Test Device", "serial": "12345", "Date": f"2023-01-01 12:0{num}:00",
+                    "data": {"weather_temp": num}} for num in range(4)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with gzip.open(os.path.join(temp_dir, 'day1.jsonl.gz'), 'wt', encoding='utf-8') as file:
+                file.writelines(json.dumps(record) + '\n' for record in records[:2])
+            with lzma.open(os.path.join(temp_dir, 'day2.json.xz'), 'wt', encoding='utf-8') as file:
+                json.dump({str(num): record for num, record in enumerate(records[2:])}, file)
+            file_paths = self.processor._collect_json_files(temp_dir)
+            self.assertEqual(len(file_paths), 2)
+            with patch('tkinter.filedialog.askopenfilenames', return_value=tuple(file_paths)):
+                self.processor._process_json_load(lazy=True)
+            self.assertEqual(self.processor.follow_offsets, {path: None for path in file_paths})
+        frame = self.mock_app.device_data["Test Device (12345)"]
+        self.assertEqual(frame["weather_temp"].tolist(), [0, 1, 2, 3])
+
+    def test_device_column_buffer(self):
+        buffer = DeviceColumnBuffer()
+        buffer.append("2023-01-01 12:00:00", {"weather_temp": 20.5, "system_IP": "10.0.0.1"})
+        buffer.append("2023-01-01 12:05:00", {"weather_temp": None, "weather_humidity": "60"})
+        buffer.append("2023-01-01 12:10:00", {"weather_temp": None})
+        frame = buffer.to_frame()
+        self.assertEqual(list(frame.columns), ["weather_temp", "system_IP", "weather_humidity"])
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(frame.index.name, "Date")
+        self.assertEqual(frame.index[1], pd.Timestamp("2023-01-01 12:05:00"))
+        self.assertTrue(frame["system_IP"].isna().all())
+        self.assertEqual(frame["weather_humidity"].iloc[1], 60.0)
+        self.assertEqual(buffer.columns, {})
+
+    def test_device_column_buffer_blocks(self):
+        dates = pd.date_range("2023-01-01 12:00", periods=7, freq="5min")
+        records = [{"system_LA1": num, "system_Version": "2021-06-02", "system_IP": None} for num in range(7)]
+        records[3] = {"system_LA1": "3.5"}
+        with patch('device_store.BLOCK_ROWS', 2):
+            buffer = DeviceColumnBuffer()
+            for date, record in zip(dates, records):
+                buffer.append(date.strftime("%Y-%m-%d %H:%M:%S"), record)
+            frame = buffer.to_frame()
+        expected = pd.DataFrame(records, index=pd.DatetimeIndex(dates, name="Date")).apply(pd.to_numeric,
+                                                                                            errors='coerce')
+        pd.testing.assert_frame_equal(frame, expected.dropna(how='all'), check_freq=False, check_dtype=False,
+                                      check_index_type=False)
+
+    def test_batch_render(self):
+        mock_data = {str(num): {"uName": "Hydra", "serial": str(num % 2), "Date": f"2023-01-01 1{num}:00:00",
+                                "data": {"weather_temp": 20 + num, "weather_humidity": 50}} for num in range(6)}
+        mock_data["6"] = {"uName": "Сервер", "serial": "01", "Date": "2023-01-01 12:00:00", "data": {"system_LA1": 1}}
+        file_path = os.path.join(self.cache_dir.name, 'test.json')
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(mock_data, file)
+        output = os.path.join(self.cache_dir.name, 'charts')
+        os.makedirs(output)
+        options = batch_render.parse_args([file_path, '-d', 'Hydra*', '-y', 'weather_temp', '--avg', '1h', '-f', 'png',
+                                           'html', '-o', output])
+        device_data = batch_render.load_devices(options.files, options.device)
+        self.assertEqual(sorted(device_data), ["Hydra (0)", "Hydra (1)"])
+        timings = batch_render.render_device("Hydra (0)", device_data["Hydra (0)"], options)
+        self.assertEqual([os.path.basename(path) for path, _ in timings], ["Hydra (0).png", "Hydra (0).html"])
+        self.assertTrue(all(os.path.getsize(path) > 0 for path, _ in timings))
+        # Устройства, чьи имена совпадают после замены недопустимых символов, пишутся в разные файлы
+        self.assertEqual(batch_render.output_names(["A/B (1)", "A_B (1)", "a_b (1)"]),
+                         {"A/B (1)": "A_B (1)", "A_B (1)": "A_B (1)_2", "a_b (1)": "a_b (1)_3"})
+        options = batch_render.parse_args([file_path, '--effective-temp', '-o', output])
+        self.assertTrue(batch_render.has_parameters(device_data["Hydra (0)"], options))
+        self.assertFalse(batch_render.has_parameters(batch_render.load_devices([file_path], 'Сервер*')["Сервер (01)"],
+                                                     options))
+        with self.assertRaises(SystemExit):
+            with patch('sys.stderr', io.StringIO()):
+                batch_render.parse_args([file_path])
+
+    def test_decimate_indices(self):
+        index = pd.date_range("2023-01-01", periods=100000, freq="min")
+        values = np.sin(np.arange(100000) / 500)
+        values[12345] = 50
+        values[40000:50000] = np.nan
+        self.assertIsNone(decimate_indices(index[:100], values[:100], 1000))
+        positions = decimate_indices(index, values, 1000)
+        self.assertLessEqual(len(positions), 1002)
+        self.assertTrue((np.diff(positions) > 0).all())
+        self.assertIn(12345, positions)
+        self.assertTrue(np.isnan(values[positions]).any())
+        self.assertEqual([positions[0], positions[-1]], [0, 99999])
+        positions = decimate_indices(index, values, 1000, method='lttb')
+        self.assertEqual(len(positions), 1000)
+        self.assertIn(12345, positions)
+        self.assertFalse(np.isnan(values[positions]).any())
+        chart_spec = ChartSpec()
+        data = pd.DataFrame({"weather_temp": values}, index=index)
+        add_regular_traces(chart_spec, "line", data, data, "Date", ["weather_temp"], "Test Device")
+        self.assertLessEqual(len(chart_spec.traces[0].x), 3202)
+        self.assertEqual(max(chart_spec.traces[0].y), 50)
+
+    def test_aggregate_pyramid(self):
+        index = pd.date_range("2023-01-01 00:07", periods=20000, freq="2min")
+        data = pd.DataFrame({"a": np.sin(np.arange(20000) / 300), "b": np.arange(20000.0)}, index=index)
+        data.iloc[3000:5000, 0] = np.nan
+        pyramid = AggregatePyramid(data)
+        self.assertTrue(pyramid.matches(data))
+        self.assertFalse(pyramid.matches(data.iloc[:-1]))
+        # Продолжение дописанными записями (в том числе после разрыва) совпадает с построением заново
+        for head, tail in ((data.iloc[:12345], data.iloc[12345:]), (data.iloc[:9000], data.iloc[10500:])):
+            extended = AggregatePyramid(head).extended(tail)
+            rebuilt = AggregatePyramid(pd.concat([head, tail]))
+            self.assertTrue(extended.matches(pd.concat([head, tail])))
+            for rule, level in rebuilt.levels.items():
+                for how, frame in level.items():
+                    pd.testing.assert_frame_equal(extended.levels[rule][how], frame, check_freq=False)
+        self.assertIsNone(pyramid.extended(data.iloc[-5:]))
+        part = data.iloc[1234:17777]
+        # Окна вне пирамиды и пропуски в записях считаются тем же проходом, что и уровни пирамиды
+        gapped = data.drop(data.index[6000:7500])
+        rules = ("15min", "1h", "3h", "6h", "D", "7D")
+        for frame, windows in ((part, pyramid.aggregate(part, rules)), (gapped, window_aggregates(gapped, rules))):
+            for rule in rules:
+                for how in ("sum", "count", "min", "max"):
+                    pd.testing.assert_frame_equal(windows[rule][how], getattr(frame.resample(rule), how)(),
+                                                  check_freq=False)
+                pd.testing.assert_frame_equal(window_mean(windows[rule]), frame.resample(rule).mean(),
+                                              check_freq=False)
+        averages = dict(avg_one_hour=True, avg_three_hours=True, avg_one_day=True, min_max_daily=True)
+        expected, actual = ChartSpec(), ChartSpec()
+        add_regular_traces(expected, "line", part, part, "Date", ["a", "b"], "Dev", **averages)
+        add_regular_traces(actual, "line", part, part, "Date", ["a", "b"], "Dev", pyramid=pyramid, **averages)
+        self.assertEqual([trace.name for trace in actual.traces], [trace.name for trace in expected.traces])
+        for left, right in zip(actual.traces, expected.traces):
+            np.testing.assert_allclose(left.x, right.x)
+            np.testing.assert_allclose(left.y, right.y, equal_nan=True)
+        # Ступенька последних суток дорисовывается до их конца
+        daily_max = next(trace for trace in actual.traces if trace.name == "b max 1д (Dev)")
+        self.assertEqual(daily_max.x[-1], mdates.date2num(part.index[-1].floor("D") + pd.Timedelta(days=1)))
+        self.assertEqual(daily_max.y[-1], part["b"].iloc[-1])
+
+    def test_start_pyramid_build(self):
+        index = pd.date_range("2023-01-01", periods=500, freq="10min")
+        frame = pd.DataFrame({"a": np.arange(500.0)}, index=index)
+        device_data = DeviceStore({"A": frame, "B": CompactDeviceFrame.from_frame(frame)}, compact=True)
+        self.mock_app.after.side_effect = lambda delay, callback: callback()
+        # Свёрнутое компактное устройство не разворачивается ради пирамиды
+        self.processor._start_pyramid_build(device_data, ["A", "B"])
+        self.processor.pyramid_thread.join()
+        self.assertEqual(list(self.processor.pyramids), ["A"])
+        self.assertIsNone(device_data.loaded_frame("B"))
+        device_data["B"]
+        self.processor._start_pyramid_build(device_data, ["B"])
+        self.processor.pyramid_thread.join()
+        self.assertTrue(self.processor.pyramids["B"].matches(frame))
+        # Пирамиды прежней загрузки не попадают в новый словарь
+        pyramids = self.processor.pyramids
+        self.processor.pyramids = {}
+        self.processor._store_pyramids(pyramids, {"C": AggregatePyramid(frame)})
+        self.assertEqual(self.processor.pyramids, {})
+        # Пирамида, построенная при графике, сохраняется уже в потоке Tk вместе с результатом построения
+        self.mock_app.after.side_effect = None
+        request = ChartRequest("A", frame, "Date", ["a"], "line", averages={"avg_one_hour": True})
+        request.generation = -1
+        self.processor._render_worker(request)
+        self.assertEqual(self.processor.pyramids, {})
+        self.mock_app.after.call_args[0][1]()
+        self.assertIs(self.processor.pyramids["A"], request.pyramid)
+
+    def test_streaming_stats(self):
+        index = pd.date_range("2023-01-01", periods=3000, freq="min")
+        series = pd.Series(np.sin(np.arange(3000) / 200) + np.random.default_rng(0).normal(0, 0.05, 3000), index=index)
+        series.iloc[100:150] = np.nan
+        series.iloc[2000] += 5
+        full = StreamingStats().update(series)
+        self.assertTrue(full["anomaly"].iloc[2000])
+        self.assertFalse(full["anomaly"].iloc[100:150].any())
+        # Дописанные записи продолжают статистики без пересчёта истории
+        stats = StreamingStats()
+        for end in (1, 120, 2000, 2001, 3000):
+            stats.sync(series.iloc[:end])
+        self.assertEqual(stats.rows, 3000)
+        pd.testing.assert_frame_equal(stats.frame, full, check_exact=False)
+        # Части статистик не склеиваются при каждом update, а только при чтении frame
+        appended = StreamingStats()
+        for start in range(0, 3000, 1000):
+            appended.update(series.iloc[start:start + 1000])
+        self.assertEqual(len(appended.chunks), 3)
+        pd.testing.assert_frame_equal(appended.frame, full, check_exact=False)
+        self.assertEqual(len(appended.chunks), 1)
+
+        data = series.to_frame("system_LA1")
+        tracker = AnomalyTracker()
+        request = ChartRequest("Dev", data.iloc[:2500], "Date", ["system_LA1"], "line", (index[1500], index[2400]),
+                               anomalies=True, anomaly_tracker=tracker)
+        figure = build_chart_figure(request)
+        self.assertEqual([trace.name for trace in figure.traces],
+                         ["system_LA1 (Dev)", "system_LA1 EWMA (Dev)", "system_LA1 аномалии (Dev)"])
+        self.assertIn(mdates.date2num(index[2000]), figure.traces[2].x)
+        with patch.object(StreamingStats, "update", autospec=True, side_effect=StreamingStats.update) as mock_update:
+            build_chart_figure(request.with_view(data, None))
+            self.assertEqual(len(mock_update.call_args[0][1]), 500)
+
+    def test_align_devices(self):
+        grid = pd.to_datetime(["2025-05-01 00:00:00", "2025-05-01 00:05:00", "2025-05-01 00:10:00",
+                               "2025-05-01 00:15:00"])
+        first = pd.DataFrame({"system_LA1": [1.0, 2.0, 3.0, 4.0]}, index=grid)
+        # Второе устройство пишет со сдвигом в секунды и пропускает одну запись
+        second = pd.DataFrame({"system_LA1": [10.0, 20.0, 40.0], "other": [0.0, 0.0, 0.0]},
+                              index=grid[[0, 1, 3]] + pd.Timedelta(seconds=20))
+        third = pd.DataFrame({"weather_temp": [5.0]}, index=grid[:1])
+        aligned = align_devices({"A": first, "B": second, "C": third}, ["system_LA1", "weather_temp"])
+        self.assertEqual(list(aligned.columns), ["system_LA1 (A)", "system_LA1 (B)", "weather_temp (C)"])
+        self.assertTrue(aligned.index.equals(grid))
+        np.testing.assert_array_equal(aligned["system_LA1 (B)"], [10.0, 20.0, np.nan, 40.0])
+        np.testing.assert_array_equal(aligned["weather_temp (C)"], [5.0, np.nan, np.nan, np.nan])
+        aligned = align_devices({"A": first, "B": second}, ["system_LA1"], tolerance=pd.Timedelta(seconds=10))
+        self.assertTrue(aligned["system_LA1 (B)"].isna().all())
+
+        request = ChartRequest("A", first, "Date", ["system_LA1"], "line", overlay={"B": second},
+                               averages={"avg_one_hour": True})
+        figure = build_chart_figure(request)
+        self.assertEqual([trace.name for trace in figure.traces],
+                         ["system_LA1 (A)", "system_LA1 (B)", "system_LA1 (A) 1ч", "system_LA1 (B) 1ч"])
+        self.assertEqual(request.device_label, "A, B")
+        self.assertIn("A, B", figure.title)
+
+    def test_handle_device_selection(self):
+        index = pd.date_range("2023-11-15 08:00", "2025-02-10 18:30", periods=1000)
+        columns = [f"docker_{num}_cpu" for num in range(300)] + ["weather_temp", "weather_humidity"]
+        frame = pd.DataFrame(np.zeros((1000, len(columns))), index=index, columns=columns)
+        self.mock_app.device_data = {"Hydra (1)": frame}
+        gui = self.mock_app.gui
+        gui.device_selector.get.return_value = "Hydra (1)"
+        gui.x_axis_list.curselection.return_value = ()
+        gui.y_axis_list.curselection.return_value = ()
+        self.processor._handle_device_selection()
+        # Каждый список заполняется одной вставкой
+        gui.x_axis_list.insert.assert_called_once_with('end', 'Date', *columns)
+        gui.y_axis_list.insert.assert_called_once_with('end', *columns)
+        gui.temp_selector.set.assert_called_once_with("weather_temp")
+        gui.humidity_selector.set.assert_called_once_with("weather_humidity")
+        self.assertEqual(self.mock_app.min_datetime, index[0])
+        date_strs = gui.start_datetime_selector.__setitem__.call_args[0][1]
+        self.assertEqual(date_strs[:3], ["15-11-2023", "01-12-2023", "01-01-2024"])
+        self.assertEqual(date_strs[-2:], ["01-02-2025", "10-02-2025"])
+        self.assertEqual(len(date_strs), 17)
+
+        # Поиск оставляет выбранные параметры в списке и выбранными
+        gui.y_axis_list.reset_mock()
+        gui.y_axis_list.curselection.return_value = (0,)
+        gui.y_axis_list.get.return_value = "docker_0_cpu"
+        gui.y_filter_entry.get.return_value = " Weather"
+        self.processor._filter_y_parameters()
+        gui.y_axis_list.insert.assert_called_once_with('end', "docker_0_cpu", "weather_temp", "weather_humidity")
+        gui.y_axis_list.selection_set.assert_called_once_with(0)
+
     # ==TestDataProcessorNewMethods==
     def test_get_selected_device_and_parameters(self):
         self.mock_app.gui.device_selector.get.return_value = "Test Device (12345)"
@@ -353,25 +1048,23 @@ class TestChartApp(unittest.TestCase):
             {"weather_temp": [20, 21, 22]},
             index=pd.to_datetime(["2023-01-01 12:00", "2023-01-01 13:00", "2023-01-02 12:00"])
         )
-        self.mock_app.filter_by_date.set(False)
-        result = self.processor._filter_data_by_date(data, None, None)
+        result = filter_by_date(data, (None, None))
         self.assertTrue(data.equals(result))
-        self.mock_app.filter_by_date.set(True)
         self.mock_app.min_datetime = pd.Timestamp("2023-01-01 00:00")
         self.mock_app.max_datetime = pd.Timestamp("2023-01-02 23:59")
         start_datetime = (2023, 1, 1, 12, 0)
         end_datetime = (2023, 1, 1, 14, 0)
-        result = self.processor._filter_data_by_date(data, start_datetime, end_datetime)
+        result = filter_by_date(data, self.processor._date_range(start_datetime, end_datetime))
         expected = data[
             (data.index >= pd.Timestamp("2023-01-01 12:00")) & (data.index <= pd.Timestamp("2023-01-01 14:00"))]
         self.assertTrue(expected.equals(result))
+        # Срез отсортированного индекса без копирования данных
+        self.assertTrue(np.shares_memory(result["weather_temp"].to_numpy(), data["weather_temp"].to_numpy()))
         start_datetime = (2023, 1, 2, 12, 0)
         end_datetime = (2023, 1, 1, 12, 0)
-        result = self.processor._filter_data_by_date(data, start_datetime, end_datetime)
-        self.assertIsNone(result)
+        self.assertIsNone(self.processor._date_range(start_datetime, end_datetime))
         start_datetime = None
-        result = self.processor._filter_data_by_date(data, start_datetime, end_datetime)
-        self.assertIsNone(result)
+        self.assertIsNone(self.processor._date_range(start_datetime, end_datetime))
 
     def test_calculate_effective_temperature(self):
         data = pd.DataFrame({
@@ -379,26 +1072,52 @@ class TestChartApp(unittest.TestCase):
             "weather_humidity": [50.0, 60.0, 70.0]
         })
         temp_column, humidity_column = "weather_temp", "weather_humidity"
-        effective_temp, sensation = self.processor._calculate_effective_temperature(data, temp_column, humidity_column)
+        effective_temp, sensation = calculate_effective_temperature(data, temp_column, humidity_column)
         expected_temp = pd.Series([18.0, 22.6, None], index=effective_temp.index)
         expected_sensation = pd.Series(["Тепло", "Тепло", None],
                                        index=effective_temp.index)  # Исправлено: 22.6 -> "Тепло"
         pd.testing.assert_series_equal(effective_temp, expected_temp, check_dtype=False)
-        pd.testing.assert_series_equal(sensation, expected_sensation, check_dtype=False)
+        # Теплоощущение хранится кодами категорий, а не строкой на каждую запись
+        self.assertEqual(sensation.dtype, "category")
+        pd.testing.assert_series_equal(sensation.astype(object), expected_sensation, check_dtype=False)
 
-        result = self.processor._calculate_effective_temperature(data, None, humidity_column)
-        self.assertIsNone(result[0])
-        self.assertIsNone(result[1])
+        with self.assertRaises(ValueError):
+            calculate_effective_temperature(data, None, humidity_column)
 
         data_invalid = pd.DataFrame({"other_column": [1, 2, 3]})
-        result = self.processor._calculate_effective_temperature(data_invalid, temp_column, humidity_column)
-        self.assertIsNone(result[0])
-        self.assertIsNone(result[1])
+        with self.assertRaises(ValueError):
+            calculate_effective_temperature(data_invalid, temp_column, humidity_column)
 
         data_nan = pd.DataFrame({"weather_temp": [None, None], "weather_humidity": [None, None]})
-        result = self.processor._calculate_effective_temperature(data_nan, temp_column, humidity_column)
-        self.assertIsNone(result[0])
-        self.assertIsNone(result[1])
+        with self.assertRaises(ValueError):
+            calculate_effective_temperature(data_nan, temp_column, humidity_column)
+
+    def test_comfort_indices(self):
+        # Коды одного searchsorted совпадают с поштучной классификацией, включая значения на границах
+        values = pd.Series([-30.0, -24.0, -12.0, 0.0, 5.9, 6.0, 12.0, 18.0, 23.99, 24.0, 30.0, 31.0, None])
+        sensation = SENSATION_SCALE.classify(values)
+        self.assertEqual(sensation.cat.codes.dtype, np.int8)
+        self.assertEqual(sensation.astype(object).where(sensation.notna(), None).tolist(),
+                         [classify_sensation(value) for value in values])
+
+        data = pd.DataFrame({"t": [20.0, 32.0, 30.0], "h": [50.0, 70.0, 0.0]})
+        dew, comfort = calculate_comfort_index(data, "t", "h", "Точка росы")
+        self.assertAlmostEqual(dew[0], 9.26, places=2)
+        self.assertTrue(np.isnan(dew[2]))
+        self.assertEqual(comfort.tolist()[:2], ["Сухо", "Тягостно"])
+        heat, comfort = calculate_comfort_index(data, "t", "h", "Индекс жары")
+        self.assertAlmostEqual(heat[1], 40.4, places=1)
+        self.assertAlmostEqual(heat[0], 19.4, places=1)
+        self.assertEqual(comfort[1], "Повышенная осторожность")
+        humidex_values, _ = calculate_comfort_index(data, "t", "h", "Хьюмидекс")
+        self.assertAlmostEqual(humidex_values[0], 20.9, places=1)
+        self.assertAlmostEqual(humidex_values[1], 45.3, places=1)
+
+        data.index = pd.date_range("2023-01-01", periods=3, freq="h")
+        spec = build_chart_figure(ChartRequest("Test Device", data, "Date", [], "line", effective_temp=True,
+                                               temp_column="t", humidity_column="h", comfort_index="Хьюмидекс"))
+        self.assertEqual(spec.traces[0].name, "Хьюмидекс (Test Device)")
+        self.assertEqual(spec.y_title, "Хьюмидекс (°C)")
 
 
     def test_create_chart_window(self):
@@ -415,91 +1134,185 @@ class TestChartApp(unittest.TestCase):
                     self.assertIsNotNone(self.mock_app.chart_display)
                     self.assertIsNotNone(self.mock_app.matplotlib_figure)
 
+    def test_render_chart_background(self):
+        data = pd.DataFrame({"weather_temp": [20.0, 21.0, 22.0]},
+                            index=pd.to_datetime(["2023-01-01 12:00", "2023-01-01 13:00", "2023-01-01 14:00"]))
+        self.mock_app.device_data = {"Test Device": data}
+        self.mock_app.after.side_effect = lambda delay, callback: callback()
+        with patch.object(self.processor, '_get_selected_device_and_parameters',
+                          return_value=("Test Device", "Date", ["weather_temp"])), \
+                patch.object(self.processor, '_start_render') as mock_start:
+            self.processor.render_chart()
+            first = mock_start.call_args[0][0]
+            # Повторные нажатия во время построения оставляют только последний запрос
+            self.processor.render_thread = MagicMock()
+            self.processor.render_chart()
+            self.processor.render_chart()
+            self.assertEqual(mock_start.call_count, 1)
+            self.assertEqual(self.processor.pending_render.generation, 3)
+            self.processor._finish_render(first, None, 'устаревший результат')
+            self.assertEqual(mock_start.call_args[0][0].generation, 3)
+            self.assertIsNone(self.processor.pending_render)
+        def create_window(title):
+            self.mock_app.chart_display = MagicMock()
+            self.mock_app.chart_canvas = MagicMock()
+            self.mock_app.matplotlib_figure = Figure()
+
+        with patch.object(self.processor, '_create_chart_window', side_effect=create_window) as mock_window, \
+                patch.object(self.processor, '_attach_canvas') as mock_canvas:
+            self.processor._render_worker(first)
+            mock_window.assert_not_called()
+            request = mock_start.call_args[0][0]
+            self.processor._render_worker(request)
+            self.assertIsNone(self.processor.render_thread)
+            mock_window.assert_called_once()
+            mock_canvas.assert_called_once()
+            self.assertEqual(len(self.mock_app.chart_figure.traces), 1)
+            line = self.processor.chart_artists.artists["weather_temp (Test Device)"][2]
+            # Повторное построение с осреднением оставляет окно и линию, добавляя только новую трассу
+            request.averages['avg_one_hour'] = True
+            request.generation = self.processor.render_generation
+            self.processor._render_worker(request)
+            mock_window.assert_called_once()
+            self.mock_app.chart_canvas.draw_idle.assert_called_once()
+            self.assertIs(self.processor.chart_artists.artists["weather_temp (Test Device)"][2], line)
+            self.assertEqual(len(self.processor.chart_artists.ax.get_lines()), 2)
+
+    def test_open_interactive(self):
+        index = pd.date_range("2023-01-01", periods=20000, freq="min")
+        data = pd.DataFrame({"weather_temp": np.sin(np.arange(20000) / 100)}, index=index)
+        self.mock_app.device_data = {"Test Device": data}
+        self.mock_app.after.side_effect = lambda delay, callback: callback()
+        with patch.object(self.processor, '_get_selected_device_and_parameters',
+                          return_value=("Test Device", "Date", ["weather_temp"])), \
+                patch('threading.Thread') as mock_thread, patch('webbrowser.open') as mock_open:
+            self.processor.open_interactive()
+            request = mock_thread.call_args.kwargs['args'][0]
+            self.assertIsNone(request.max_points)
+            self.processor._interactive_worker(request)
+        url = mock_open.call_args[0][0]
+        self.assertTrue(url.startswith("file://"))
+        path = url2pathname(urlparse(url).path)
+        try:
+            with open(path, encoding='utf-8') as file:
+                html = file.read()
+        finally:
+            os.remove(path)
+        # Все 20000 точек уходят в WebGL-трассу двоичным массивом, а не списком JSON
+        self.assertIn('"type":"scattergl"', html)
+        self.assertIn('"bdata"', html)
+        self.assertNotIn('2023-01-01T00:00:00', html)
+
+    def test_chart_view_requery(self):
+        index = pd.date_range("2023-01-01", periods=100000, freq="5min")
+        data = pd.DataFrame({"weather_temp": np.sin(np.arange(100000) / 100)}, index=index)
+        self.mock_app.device_data = {"Test Device": data}
+        request = ChartRequest("Test Device", data, "Date", ["weather_temp"], "line")
+        on_view_change = MagicMock()
+        artists = FigureArtists(Figure(), on_view_change)
+        artists.update(build_chart_figure(request), "Date", "Test Device")
+        on_view_change.assert_not_called()
+        self.assertIsNone(artists.view_range())
+        # Увеличение до одного часа: перезапрос возвращает исходные 5-минутные точки этого участка
+        start, end = mdates.date2num(index[50000]), mdates.date2num(index[50012])
+        artists.ax.set_xlim(start, end)
+        on_view_change.assert_called_once()
+        view_request = request.with_view(data, artists.view_range())
+        chart_figure = build_chart_figure(view_request)
+        x_values = chart_figure.traces[0].x
+        self.assertEqual(len(x_values), 27)
+        np.testing.assert_allclose(np.diff(x_values), 5 / 1440)
+        self.assertTrue(artists.update(chart_figure, "Date", "Test Device", autoscale=False))
+        self.assertEqual(artists.ax.get_xlim(), (start, end))
+        self.processor.chart_artists = artists
+        self.processor.last_request = request
+        with patch.object(self.processor, '_submit_render') as mock_submit:
+            self.processor._request_view()
+            self.assertEqual(mock_submit.call_args[0][0].view_range, (start, end))
+
     def test_add_effective_temp_traces(self):
         valid_data = pd.Series([18.0, 25.0], index=pd.to_datetime(["2023-01-01", "2023-01-02"]))
         valid_sensation = pd.Series(["Тепло", "Жарко"], index=valid_data.index)
-        self.mock_app.chart_figure = go.Figure()
-
-        # Mock the _create_chart_window to avoid GUI interaction
-        with patch.object(self.processor, '_create_chart_window') as mock_create_window:
-            # Test line chart
-            self.processor._add_effective_temp_traces("line", valid_data, valid_sensation, "Test Device")
-            self.assertEqual(len(self.mock_app.chart_figure.data), 2)
-            self.assertEqual(self.mock_app.chart_figure.data[0]['mode'], 'lines')
-            self.assertEqual(self.mock_app.chart_figure.data[0]['name'], 'Тепло')
-            self.assertEqual(self.mock_app.chart_figure.data[1]['name'], 'Жарко')
-            self.assertEqual(self.mock_app.chart_figure.data[0]['line']['color'],
-                             self.mock_app.sensation_colors['Тепло'])
-
-            # Test bar chart
-            self.mock_app.chart_figure = go.Figure()
-            self.processor._add_effective_temp_traces("bar", valid_data, valid_sensation, "Test Device")
-            self.assertEqual(len(self.mock_app.chart_figure.data), 2)
-            self.assertEqual(self.mock_app.chart_figure.data[0]['type'], 'bar')
-            self.assertEqual(self.mock_app.chart_figure.data[0]['name'], 'Тепло')
-            self.assertEqual(self.mock_app.chart_figure.data[1]['name'], 'Жарко')
-            self.assertEqual(self.mock_app.chart_figure.data[0]['marker']['color'],
-                             self.mock_app.sensation_colors['Тепло'])
-
-            # Test scatter chart
-            self.mock_app.chart_figure = go.Figure()
-            self.processor._add_effective_temp_traces("scatter", valid_data, valid_sensation, "Test Device")
-            self.assertEqual(len(self.mock_app.chart_figure.data), 2)
-            self.assertEqual(self.mock_app.chart_figure.data[0]['mode'], 'markers')
-            self.assertEqual(self.mock_app.chart_figure.data[0]['name'], 'Тепло')
-            self.assertEqual(self.mock_app.chart_figure.data[1]['name'], 'Жарко')
-            self.assertEqual(self.mock_app.chart_figure.data[0]['marker']['color'],
-                             self.mock_app.sensation_colors['Тепло'])
-            self.assertEqual(self.mock_app.chart_figure.data[0]['marker']['size'], 8)
-            self.assertEqual(self.mock_app.chart_figure.data[0]['marker']['opacity'], 0.7)
-
-            # Test empty data
-            empty_data = pd.Series([], dtype=float)
-            empty_sensation = pd.Series([], dtype=object)
-            self.mock_app.chart_figure = go.Figure()
-            with patch('tkinter.messagebox.showerror') as mock_error:
-                with patch.object(self.processor, 'clear_chart') as mock_clear:
-                    self.processor._add_effective_temp_traces("line", empty_data, empty_sensation, "Test Device")
-                    mock_error.assert_called_once_with('Ошибка',
-                                                       'Нет валидных данных для построения графика теплоощущения.')
-                    mock_clear.assert_called_once()
+        colors = self.mock_app.sensation_colors
+
+        # Test line chart: одна трасса, цвет точки задаётся кодом категории
+        chart_spec = ChartSpec()
+        add_effective_temp_traces(chart_spec, "line", valid_data, valid_sensation, "Test Device", colors)
+        self.assertEqual(len(chart_spec.traces), 1)
+        trace = chart_spec.traces[0]
+        self.assertEqual(trace.kind, 'line')
+        self.assertEqual(trace.codes.tolist(), [0, 1])
+        self.assertEqual(trace.palette, (('Тепло (Test Device)', colors['Тепло']),
+                                         ('Жарко (Test Device)', colors['Жарко'])))
+
+        # Test bar chart
+        chart_spec = ChartSpec()
+        add_effective_temp_traces(chart_spec, "bar", valid_data, valid_sensation, "Test Device", colors)
+        self.assertEqual(len(chart_spec.traces), 1)
+        self.assertEqual(chart_spec.traces[0].kind, 'bar')
+        self.assertEqual(chart_spec.traces[0].palette[0][0], 'Тепло (Test Device)')
+
+        # Test scatter chart
+        chart_spec = ChartSpec()
+        add_effective_temp_traces(chart_spec, "scatter", valid_data, valid_sensation, "Test Device", colors)
+        self.assertEqual(len(chart_spec.traces), 1)
+        self.assertEqual(chart_spec.traces[0].kind, 'markers')
+        self.assertEqual(chart_spec.traces[0].size, 8)
+        self.assertEqual(chart_spec.traces[0].opacity, 0.7)
+
+        # Линия рисуется одной коллекцией отрезков и прерывается на пропусках
+        data = pd.Series([18.0, 25.0, None, 19.0, 20.0], index=pd.date_range("2023-01-01", periods=5, freq="h"))
+        sensation = data.apply(classify_sensation)
+        chart_spec = ChartSpec()
+        add_effective_temp_traces(chart_spec, "line", data, sensation, "Test Device")
+        figure = Figure()
+        draw_figure(chart_spec, figure, 'Date', "Test Device")
+        ax = figure.axes[0]
+        self.assertEqual(len(ax.collections), 1)
+        self.assertEqual(len(ax.collections[0].get_segments()), 2)
+        self.assertEqual([text.get_text() for text in ax.get_legend().get_texts()],
+                         ['Тепло (Test Device)', 'Жарко (Test Device)'])
+        self.assertEqual([trace.name for trace in to_plotly(chart_spec).data],
+                         ['Тепло (Test Device)', 'Жарко (Test Device)'])
+
+        # Без валидных данных построение завершается ошибкой с текстом для пользователя
+        empty_data = pd.DataFrame({"weather_temp": [None], "weather_humidity": [50.0]},
+                                  index=pd.to_datetime(["2023-01-01"]))
+        request = ChartRequest("Test Device", empty_data, "Date", [], "line", effective_temp=True,
+                               temp_column="weather_temp", humidity_column="weather_humidity")
+        with self.assertRaises(ValueError):
+            build_chart_figure(request)
 
     def test_add_regular_traces(self):
         data = pd.DataFrame({
             "weather_temp": [20.0, 21.0, 22.0],
             "weather_humidity": [50.0, 60.0, 70.0]
         }, index=pd.to_datetime(["2023-01-01 12:00", "2023-01-01 13:00", "2023-01-01 14:00"]))
-        self.mock_app.chart_figure = MagicMock()
-        self.mock_app.avg_one_hour.set(True)
-        self.processor._add_regular_traces("line", data, data, "Date", ["weather_temp"], "Test Device")
-        self.mock_app.chart_figure.add_trace.assert_called()
-        self.assertGreaterEqual(self.mock_app.chart_figure.add_trace.call_count, 2)  # Основной график + осреднение
+        chart_figure = MagicMock()
+        add_regular_traces(chart_figure, "line", data, data, "Date", ["weather_temp"], "Test Device", avg_one_hour=True)
+        chart_figure.add_trace.assert_called()
+        self.assertGreaterEqual(chart_figure.add_trace.call_count, 2)  # Основной график + осреднение
 
     def test_add_regular_traces_scatter(self):
-        self.mock_app.chart_style.set('scatter')
-        self.mock_app.device_data = {
-            'Test Device (12345)': pd.DataFrame({
-                'weather_temp': [20.5, 21.0],
-                'weather_humidity': [60.0, 65.0]
-            }, index=pd.to_datetime(['2023-01-01 12:00:00', '2023-01-01 13:00:00']))
-        }
-        self.mock_app.gui.device_selector.get.return_value = 'Test Device (12345)'
-        self.mock_app.gui.x_axis_list.curselection.return_value = (0,)
-        self.mock_app.gui.x_axis_list.get.return_value = 'Date'
-        self.mock_app.gui.y_axis_list.curselection.return_value = (0,)
-        self.mock_app.gui.y_axis_list.get.return_value = 'weather_temp'
-        self.mock_app.chart_figure = go.Figure()
-        self.processor._add_regular_traces('scatter', self.mock_app.device_data['Test Device (12345)'],
-                                           self.mock_app.device_data['Test Device (12345)'], 'Date', ['weather_temp'],
-                                           'Test Device (12345)')
-        self.assertEqual(len(self.mock_app.chart_figure.data), 1)
-        self.assertEqual(self.mock_app.chart_figure.data[0]['mode'], 'markers')
-        self.assertEqual(self.mock_app.chart_figure.data[0]['name'], 'weather_temp (Test Device (12345))')
-        self.assertEqual(self.mock_app.chart_figure.data[0]['marker']['size'], 8)
-        self.assertEqual(self.mock_app.chart_figure.data[0]['marker']['opacity'], 0.7)
+        data = pd.DataFrame({
+            'weather_temp': [20.5, 21.0],
+            'weather_humidity': [60.0, 65.0]
+        }, index=pd.to_datetime(['2023-01-01 12:00:00', '2023-01-01 13:00:00']))
+        chart_spec = ChartSpec()
+        add_regular_traces(chart_spec, 'scatter', data, data, 'Date', ['weather_temp'], 'Test Device (12345)')
+        self.assertEqual(len(chart_spec.traces), 1)
+        self.assertEqual(chart_spec.traces[0].kind, 'markers')
+        self.assertEqual(chart_spec.traces[0].name, 'weather_temp (Test Device (12345))')
+        self.assertEqual(chart_spec.traces[0].size, 8)
+        self.assertEqual(chart_spec.traces[0].opacity, 0.7)
+        plotly_figure = to_plotly(chart_spec)
+        self.assertIsInstance(plotly_figure.data[0], go.Scatter)
+        self.assertEqual(plotly_figure.data[0]['mode'], 'markers')
+        self.assertEqual(pd.Timestamp(plotly_figure.data[0]['x'][0]), pd.Timestamp('2023-01-01 12:00'))
 
 
     def tearDown(self):
+        self.cache_dir.cleanup()
         self.root.destroy()
 
 
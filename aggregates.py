@@ -0,0 +1,159 @@
+import copy
+import math
+
+import numpy as np
+import pandas as pd
+
+# Правила resample уровней и длительность их интервалов
+PYRAMID_RULES = {'1h': pd.Timedelta(hours=1), '3h': pd.Timedelta(hours=3), 'D': pd.Timedelta(days=1)}
+_STATS = ('sum', 'count', 'min', 'max')
+# Частичные итоги мелких интервалов сворачиваются в крупные той же операцией, NaN в min/max пропускаются
+_REDUCERS = {'sum': np.add, 'count': np.add, 'min': np.fmin, 'max': np.fmax}
+_DAY = pd.Timedelta(days=1).value
+
+
+def window_width(rule):
+    """Длина интервала правила в наносекундах; правила календарной длины (неделя, месяц) не поддерживаются."""
+    offset = pd.tseries.frequencies.to_offset(rule)
+    # В pandas 3 сутки - календарное смещение Day, а не Tick, но для индекса без часового пояса их длина постоянна
+    if isinstance(offset, pd.offsets.Day):
+        return offset.n * _DAY
+    if not isinstance(offset, pd.offsets.Tick):
+        raise ValueError(f'Окно осреднения {rule} должно быть фиксированной длины')
+    return offset.nanos
+
+
+def _reduce(codes, stats):
+    """Свёртка статистик по подряд идущим равным кодам: коды интервалов и их статистики."""
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    return codes[starts], {stat: _REDUCERS[stat].reduceat(values, starts, axis=0) for stat, values in stats.items()}
+
+
+def window_aggregates(frame, rules):
+    """
+    {правило: {статистика: DataFrame}} - то же, что getattr(frame.resample(правило), статистика)()
+    для статистик 'sum', 'count', 'min', 'max' и правил фиксированной длины из rules ('15min', '1h', 'D', '7D').
+    Индекс frame отсортирован, поэтому записи раскладываются по интервалам наибольшего общего делителя окон
+    за один проход, а каждое окно собирается из этих частичных итогов: новое окно стоит порядка числа
+    интервалов, а не числа записей.
+    """
+    widths = {rule: window_width(rule) for rule in rules}
+    if frame.empty:
+        return {rule: {stat: getattr(frame.resample(rule), stat)() for stat in _STATS} for rule in rules}
+    time = frame.index.to_numpy().astype('datetime64[ns]').astype(np.int64)
+    # Интервалы отсчитываются от полуночи первой записи, как у resample по умолчанию (origin='start_day')
+    origin = time[0] - time[0] % _DAY
+    step = math.gcd(*widths.values())
+    values = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    codes, partial = _reduce((time - origin) // step, {'sum': np.where(present, values, 0.0),
+                                                       'count': present.astype(np.int64), 'min': values, 'max': values})
+    result = {}
+    for rule, width in widths.items():
+        bins, level = _reduce(codes // (width // step), partial)
+        positions = bins - bins[0]
+        starts = origin + (bins[0] + np.arange(positions[-1] + 1)) * width
+        index = pd.DatetimeIndex(starts.astype('datetime64[ns]'), name=frame.index.name).astype(frame.index.dtype)
+        result[rule] = {}
+        for stat, values in level.items():
+            # Интервалы без записей: сумма и количество - 0, минимум и максимум - NaN, как у resample
+            dense = np.zeros((len(index), values.shape[1]), values.dtype) if stat in ('sum', 'count') else \
+                np.full((len(index), values.shape[1]), np.nan)
+            dense[positions] = values
+            result[rule][stat] = pd.DataFrame(dense, index=index, columns=frame.columns)
+    return result
+
+
+class AggregatePyramid:
+    """
+    Суммы, количества, минимумы и максимумы всех столбцов устройства по часам, 3 часам и суткам.
+    Все уровни считаются window_aggregates за один проход по исходному ряду.
+    """
+
+    __slots__ = ('levels', 'rows', 'start', 'end')
+
+    def __init__(self, frame):
+        self.levels = window_aggregates(frame, PYRAMID_RULES)
+        self.rows = len(frame)
+        self.start = frame.index[0] if len(frame) else None
+        self.end = frame.index[-1] if len(frame) else None
+
+    def extended(self, tail):
+        """
+        Пирамида ряда, к концу которого дописаны записи tail: уровни дополняются итогами одного tail,
+        а интервал, который tail продолжает, сворачивается с ними - стоимость порядка len(tail) и числа интервалов.
+        None, если tail начинается не после конца ряда или несёт столбцы, которых нет в пирамиде.
+        """
+        columns = self.levels['1h']['sum'].columns
+        if self.end is None or tail.empty or tail.index[0] <= self.end or not tail.columns.isin(columns).all():
+            return None
+        added = window_aggregates(tail.reindex(columns=columns), PYRAMID_RULES)
+        pyramid = copy.copy(self)
+        pyramid.levels = {rule: _join_levels(level, added[rule], PYRAMID_RULES[rule])
+                          for rule, level in self.levels.items()}
+        pyramid.rows = self.rows + len(tail)
+        pyramid.end = tail.index[-1]
+        return pyramid
+
+    def matches(self, frame):
+        """Построена ли пирамида по этому состоянию ряда (дописанные записи делают её устаревшей)."""
+        return len(frame) == self.rows and (not len(frame) or frame.index[-1] == self.end)
+
+    def aggregate(self, data, rules):
+        """
+        То же, что window_aggregates(data, rules), где data - непрерывный участок исходного ряда.
+        Внутренние интервалы уровней берутся из пирамиды, а крайние, которые участок может покрывать частично,
+        и правила вне пирамиды считаются по строкам data, так что полный участок не пересчитывается.
+        """
+        usable = (not data.empty and self.start is not None and self.start <= data.index[0] and
+                  data.index[-1] <= self.end and data.columns.isin(self.levels['1h']['sum'].columns).all())
+        result = {}
+        rest = []
+        for rule in rules:
+            offset = PYRAMID_RULES.get(rule)
+            if not usable or offset is None:
+                rest.append(rule)
+                continue
+            first_bin = data.index[0].floor(rule)
+            last_bin = data.index[-1].floor(rule)
+            if last_bin - first_bin <= offset:
+                rest.append(rule)
+                continue
+            level = self.levels[rule]
+            inner = slice(first_bin + offset, last_bin - offset)
+            columns = list(data.columns)
+            head = window_aggregates(data.iloc[:data.index.searchsorted(first_bin + offset)], [rule])[rule]
+            tail = window_aggregates(data.iloc[data.index.searchsorted(last_bin):], [rule])[rule]
+            result[rule] = {stat: pd.concat([head[stat], level[stat].loc[inner, columns], tail[stat]])
+                            for stat in _STATS}
+        if rest:
+            result.update(window_aggregates(data, rest))
+        return {rule: result[rule] for rule in rules}
+
+
+def _join_levels(level, added, width):
+    """Уровень, продолженный итогами дописанных записей; интервалы между ними заполняются пустыми, как у resample."""
+    index = level['sum'].index
+    last = index[-1]
+    first = added['sum'].index[0]
+    gap = pd.date_range(last + width, first - width, freq=width).astype(index.dtype).rename(index.name)
+    result = {}
+    for stat in _STATS:
+        old, new = level[stat], added[stat]
+        if first == last:
+            # Первый интервал дописанных записей продолжает последний интервал уровня
+            new = new.copy()
+            new.iloc[0] = _REDUCERS[stat](old.iloc[-1].to_numpy(), new.iloc[0].to_numpy())
+            old = old.iloc[:-1]
+        parts = [old, new]
+        if len(gap):
+            empty = pd.DataFrame(0 if stat in ('sum', 'count') else np.nan, index=gap, columns=old.columns)
+            parts.insert(1, empty.astype(old.dtypes))
+        result[stat] = pd.concat(parts)
+    return result
+
+
+def window_mean(level):
+    """Среднее по интервалам из сумм и количеств уровня; интервалы без записей - NaN."""
+    count = level['count']
+    return level['sum'] / count.where(count > 0)
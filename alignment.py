@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+def _nanoseconds(index):
+    return index.to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+
+def median_step(index):
+    """Медианный шаг записей в наносекундах или None, если записей меньше двух."""
+    if len(index) < 2:
+        return None
+    return int(np.median(np.diff(_nanoseconds(index))))
+
+
+def nearest_positions(source, target, tolerance):
+    """
+    Позиции ближайших по времени меток отсортированного source для каждой метки target (наносекунды);
+    -1, если ближайшая метка дальше tolerance.
+    """
+    if not len(source):
+        return np.full(len(target), -1, dtype=np.int64)
+    right = np.minimum(np.searchsorted(source, target), len(source) - 1)
+    left = np.maximum(right - 1, 0)
+    positions = np.where(np.abs(target - source[left]) <= np.abs(source[right] - target), left, right)
+    positions[np.abs(source[positions] - target) > tolerance] = -1
+    return positions
+
+
+def align_devices(frames, columns, tolerance=None):
+    """
+    Ряды нескольких устройств на общей сетке времени - индексе первого устройства в frames.
+    Каждой метке сетки сопоставляется ближайшая по времени запись устройства не дальше tolerance
+    (по умолчанию половина наибольшего медианного шага устройств), иначе NaN. Столбцы - «параметр (устройство)»,
+    сгруппированные по параметрам; на устройство приходится один searchsorted, а не цикл по записям.
+    """
+    grid = next(iter(frames.values())).index
+    target = _nanoseconds(grid)
+    if tolerance is None:
+        steps = [step for step in map(median_step, (frame.index for frame in frames.values())) if step is not None]
+        tolerance = max(steps, default=0) // 2
+    elif not isinstance(tolerance, (int, np.integer)):
+        tolerance = pd.Timedelta(tolerance).value
+    aligned = {}
+    for device, frame in frames.items():
+        present = [column for column in columns if column in frame.columns]
+        positions = nearest_positions(_nanoseconds(frame.index), target, tolerance)
+        missing = positions < 0
+        for column in present:
+            values = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)[positions]
+            values[missing] = np.nan
+            aligned[column, device] = values
+    order = sorted(aligned, key=lambda key: columns.index(key[0]))
+    return pd.DataFrame({f'{column} ({device})': aligned[column, device] for column, device in order}, index=grid)
@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Окно скользящих среднего и СКО в записях, коэффициент сглаживания EWMA и порог |z| аномалии
+ANOMALY_WINDOW = 60
+EWMA_ALPHA = 0.05
+Z_THRESHOLD = 3.0
+STATS_COLUMNS = ('mean', 'std', 'ewma', 'z', 'anomaly')
+
+
+class StreamingStats:
+    """
+    Скользящие среднее и СКО по window последним записям, EWMA и z-оценка одного ряда.
+    z - отклонение записи от среднего предыдущих window записей в их СКО; |z| > threshold - аномалия.
+    Состояние (последние window значений и последнее EWMA) переносится между вызовами update,
+    поэтому дописанные записи обрабатываются без пересчёта всей истории.
+    Статистики каждого вызова хранятся отдельными частями и склеиваются только при чтении frame,
+    так что update не копирует уже накопленную историю.
+    """
+
+    __slots__ = ('window', 'alpha', 'threshold', 'tail', 'ewma', 'rows', 'last', 'chunks')
+
+    def __init__(self, window=ANOMALY_WINDOW, alpha=EWMA_ALPHA, threshold=Z_THRESHOLD):
+        self.window = window
+        self.alpha = alpha
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.tail = np.empty(0)
+        self.ewma = np.nan
+        self.rows = 0
+        self.last = None
+        self.chunks = []
+
+    @property
+    def frame(self):
+        """Статистики всех обработанных записей."""
+        if not self.chunks:
+            return pd.DataFrame(columns=list(STATS_COLUMNS))
+        if len(self.chunks) > 1:
+            self.chunks = [pd.concat(self.chunks)]
+        return self.chunks[0]
+
+    def update(self, series):
+        """Учитывает записи series, идущие после уже обработанных, и возвращает статистики по ним."""
+        if series.empty:
+            return pd.DataFrame(columns=list(STATS_COLUMNS))
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        history = len(self.tail)
+        extended = pd.Series(np.concatenate([self.tail, values]))
+        # Статистики окна до записи, а не включая её, иначе выброс сам увеличивает СКО и скрывает себя
+        rolling = extended.rolling(self.window, min_periods=max(self.window // 2, 2))
+        mean = rolling.mean().shift(1).to_numpy()[history:]
+        std = rolling.std().shift(1).to_numpy()[history:]
+        # EWMA продолжается с последнего значения: ewm(adjust=False) - та же рекурсия m = (1 - a) m + a x
+        seed = [] if np.isnan(self.ewma) else [self.ewma]
+        ewma = pd.Series(np.concatenate([seed, values])).ewm(alpha=self.alpha, adjust=False,
+                                                            ignore_na=True).mean().to_numpy()[len(seed):]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(std > 0, (values - mean) / std, np.nan)
+        chunk = pd.DataFrame({'mean': mean, 'std': std, 'ewma': ewma, 'z': z,
+                              'anomaly': np.abs(np.nan_to_num(z)) > self.threshold}, index=series.index)
+        self.tail = extended.to_numpy()[-self.window:]
+        if not np.isnan(ewma[-1]):
+            self.ewma = ewma[-1]
+        self.rows += len(series)
+        self.last = series.index[-1]
+        self.chunks.append(chunk)
+        return chunk
+
+    def sync(self, series):
+        """
+        Статистики всего ряда series: если он продолжает уже обработанный, считаются только новые записи,
+        иначе (записи вставлены в середину или ряд заменён) - весь ряд заново.
+        """
+        if len(series) < self.rows or (self.rows and series.index[self.rows - 1] != self.last):
+            self.reset()
+        self.update(series.iloc[self.rows:])
+        return self.frame
+
+
+class AnomalyTracker:
+    """
+    StreamingStats по (устройство, столбец) между построениями графиков.
+    После дозаписи выгрузки обновляются только новые записи; обращения идут из фоновых потоков построения.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def stats(self, device, column, series):
+        with self._lock:
+            return self._stats.setdefault((device, column), StreamingStats()).sync(series)
+
+    def invalidate(self, device=None):
+        with self._lock:
+            for key in [key for key in self._stats if device is None or key[0] == device]:
+                del self._stats[key]
+
+    def __len__(self):
+        return len(self._stats)
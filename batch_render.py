@@ -0,0 +1,190 @@
+"""
+Пакетное построение графиков без GUI.
+
+Пример:
+    python batch_render.py export.json -d "Сервер*" -y system_LA1 system_IDLE --avg 1h 1d -f png html -o charts
+    python batch_render.py archive/*.json.gz --effective-temp -f svg -j 4
+"""
+import argparse
+import fnmatch
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+import pandas as pd
+from matplotlib.figure import Figure
+
+from chart_builder import HUMIDITY_PRIORITY, TEMP_PRIORITY, ChartRequest, build_chart_figure, draw_figure, to_plotly
+from device_store import as_frame, merge_device_frames, read_device_file
+from thermal_comfort import COMFORT_INDICES
+
+FORMATS = ('png', 'svg', 'html')
+AVERAGES = {'1h': 'avg_one_hour', '3h': 'avg_three_hours', '1d': 'avg_one_day', 'minmax': 'min_max_daily'}
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*]')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетное построение графиков по выгрузкам устройств.')
+    parser.add_argument('files', nargs='+', help='файлы выгрузок (.json, .jsonl, в том числе .gz/.xz/.zst)')
+    parser.add_argument('-d', '--device', default='*', help='шаблон имени устройства, например "Сервер*"')
+    parser.add_argument('-x', '--x', default='Date', help='параметр оси X (по умолчанию Date)')
+    parser.add_argument('-y', '--y', nargs='*', default=[], help='параметры оси Y')
+    parser.add_argument('-t', '--chart-type', choices=('line', 'bar', 'scatter'), default='line')
+    parser.add_argument('--avg', nargs='*', choices=tuple(AVERAGES), default=[],
+                        help='осреднения: 1h, 3h, 1d и суточные minmax')
+    parser.add_argument('--anomalies', action='store_true', help='EWMA и аномалии (z-оценка) параметров Y')
+    parser.add_argument('--effective-temp', action='store_true', help='график эффективной температуры')
+    parser.add_argument('--temp', help='столбец температуры для эффективной температуры')
+    parser.add_argument('--humidity', help='столбец влажности для эффективной температуры')
+    parser.add_argument('--index', choices=tuple(COMFORT_INDICES), default='ЭТ',
+                        help='индекс комфорта графика --effective-temp (по умолчанию ЭТ)')
+    parser.add_argument('--start', type=pd.Timestamp, help='начало интервала, например "2025-05-01 00:00"')
+    parser.add_argument('--end', type=pd.Timestamp, help='конец интервала')
+    parser.add_argument('-f', '--formats', nargs='+', choices=FORMATS, default=['png'])
+    parser.add_argument('-o', '--output', default='charts', help='папка для графиков')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='число процессов')
+    options = parser.parse_args(argv)
+    if not options.effective_temp and not options.y:
+        parser.error('укажите параметры Y (-y) или --effective-temp')
+    return options
+
+
+def load_devices(file_paths, pattern, executor=None):
+    frame_sets = executor.map(read_device_file, file_paths) if executor else map(read_device_file, file_paths)
+    frames = merge_device_frames(frame_sets)
+    return {name: as_frame(frame) for name, frame in frames.items() if fnmatch.fnmatchcase(name, pattern)}
+
+
+def _climate_columns(columns, options):
+    temp_column = options.temp or next((column for column in TEMP_PRIORITY if column in columns), None)
+    humidity_column = options.humidity or next((column for column in HUMIDITY_PRIORITY if column in columns), None)
+    return temp_column, humidity_column
+
+
+def has_parameters(frame, options):
+    """Есть ли у устройства что строить: серверы без датчиков пропускаются, а не считаются ошибкой."""
+    if options.effective_temp:
+        return all(column in frame.columns for column in _climate_columns(frame.columns, options))
+    return any(column in frame.columns for column in options.y)
+
+
+def build_figure(frame, device, options):
+    """Собирает ChartSpec устройства так же, как render_chart в приложении, и возвращает его с параметром оси X."""
+    if options.effective_temp:
+        temp_column, humidity_column = _climate_columns(frame.columns, options)
+        request = ChartRequest(device, frame, 'Date', [], options.chart_type, (options.start, options.end),
+                               effective_temp=True, temp_column=temp_column, humidity_column=humidity_column,
+                               comfort_index=options.index)
+        return build_chart_figure(request), 'Date'
+    y_parameters = [column for column in options.y if column in frame.columns]
+    if not y_parameters:
+        raise ValueError('Нет выбранных параметров Y')
+    if options.x != 'Date' and options.x not in frame.columns:
+        raise ValueError(f'Нет параметра X: {options.x}')
+    averages = {AVERAGES[name]: True for name in options.avg}
+    request = ChartRequest(device, frame, options.x, y_parameters, options.chart_type, (options.start, options.end),
+                           averages=averages, anomalies=options.anomalies)
+    return build_chart_figure(request), options.x
+
+
+def output_names(devices):
+    """
+    Имена файлов устройств: недопустимые символы заменяются на '_', а совпавшие после замены имена
+    («A/B» и «A_B») получают номер, иначе процессы перезаписали бы графики друг друга.
+    """
+    names = {}
+    used = set()
+    for device in devices:
+        base = name = _UNSAFE_CHARS.sub('_', device)
+        num = 1
+        # Регистр не различается файловыми системами Windows и macOS
+        while name.casefold() in used:
+            num += 1
+            name = f'{base}_{num}'
+        used.add(name.casefold())
+        names[device] = name
+    return names
+
+
+def render_device(device, frame, options, name=None):
+    """
+    Строит графики одного устройства и возвращает [(путь, секунды)]; выполняется в рабочем процессе.
+    name - имя файла без расширения из output_names.
+    """
+    started = time.perf_counter()
+    figure, x_parameter = build_figure(frame, device, options)
+    suffix = f' {options.index}' if options.effective_temp else ''
+    base = os.path.join(options.output, (name or _UNSAFE_CHARS.sub('_', device)) + suffix)
+    # Подготовка фигуры делится поровну между форматами, чтобы время графика было полным
+    build_time = (time.perf_counter() - started) / len(options.formats)
+    timings = []
+    matplotlib_figure = None
+    for file_format in options.formats:
+        started = time.perf_counter()
+        path = f'{base}.{file_format}'
+        if file_format == 'html':
+            to_plotly(figure).write_html(path, include_plotlyjs='cdn')
+        else:
+            if matplotlib_figure is None:
+                matplotlib_figure = Figure(figsize=(8, 6))
+                draw_figure(figure, matplotlib_figure, x_parameter, device)
+            matplotlib_figure.savefig(path, format=file_format, bbox_inches='tight')
+        timings.append((path, build_time + time.perf_counter() - started))
+    return timings
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    # Графики строятся через Figure без pyplot, но backend фиксируется явно, чтобы не требовался дисплей
+    matplotlib.use('Agg')
+    if options.jobs <= 1:
+        return _render_all(options, None)
+    with ProcessPoolExecutor(max_workers=options.jobs) as executor:
+        return _render_all(options, executor)
+
+
+def _render_all(options, executor):
+    started = time.perf_counter()
+    device_data = load_devices(options.files, options.device, executor)
+    print(f'Загружено устройств: {len(device_data)} за {time.perf_counter() - started:.2f} с')
+    skipped = [device for device, frame in device_data.items() if not has_parameters(frame, options)]
+    for device in skipped:
+        print(f'{device}: нет выбранных параметров, пропущено')
+        del device_data[device]
+    if not device_data:
+        return 1
+    os.makedirs(options.output, exist_ok=True)
+    names = output_names(device_data)
+    if executor:
+        futures = {executor.submit(render_device, device, frame, options, names[device]): device
+                   for device, frame in device_data.items()}
+        results = ((futures[future], _run(future.result)) for future in as_completed(futures))
+    else:
+        results = ((device, _run(render_device, device, frame, options, names[device]))
+                   for device, frame in device_data.items())
+    failed = 0
+    charts = 0
+    for device, (timings, error) in results:
+        if error:
+            failed += 1
+            print(f'{device}: ошибка - {error}', file=sys.stderr)
+            continue
+        for path, seconds in timings:
+            charts += 1
+            print(f'{device}: {path} - {seconds:.2f} с')
+    print(f'Построено графиков: {charts} за {time.perf_counter() - started:.2f} с')
+    return 1 if failed else 0
+
+
+def _run(function, *args):
+    try:
+        return function(*args), None
+    except Exception as e:
+        return None, e
+
+
+if __name__ == '__main__':
+    sys.exit(main())
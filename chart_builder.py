@@ -0,0 +1,608 @@
+import copy
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
+
+from aggregates import window_aggregates, window_mean, window_width
+from alignment import align_devices
+from anomalies import StreamingStats
+from decimation import MAX_POINTS, decimate_indices, take
+from thermal_comfort import COMFORT_INDICES, calculate_comfort_index
+
+TEMP_PRIORITY = ['weather_temp', 'BME280_temp', 'temperature']
+HUMIDITY_PRIORITY = ['weather_humidity', 'BME280_humidity', 'humidity']
+# С этого числа точек трасса интерактивного HTML рисуется через WebGL
+WEBGL_MIN_POINTS = 10000
+
+
+class TraceSpec:
+    """
+    Одна трасса графика: массивы NumPy, вид ('line', 'markers' или 'bar') и оформление.
+    Даты по оси X хранятся числами matplotlib; step - ступенчатая линия осреднений.
+    Разноцветная трасса вместо color задаёт codes - номер цвета каждой точки (-1 - не рисуется)
+    и palette - ((подпись легенды, цвет), ...).
+    """
+
+    __slots__ = ('name', 'kind', 'x', 'y', 'step', 'color', 'width', 'dash', 'size', 'opacity', 'codes', 'palette')
+
+    def __init__(self, name, kind, x, y, step=False, color=None, width=None, dash=None, size=None, opacity=None,
+                 codes=None, palette=None):
+        self.name = name
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.step = step
+        self.color = color
+        self.width = width
+        self.dash = dash
+        self.size = size
+        self.opacity = opacity
+        self.codes = codes
+        self.palette = palette
+
+
+class ChartSpec:
+    """Трассы и подписи графика; в приложении заменяет plotly-фигуру, в plotly переводится только для экспорта."""
+
+    __slots__ = ('traces', 'title', 'x_title', 'y_title', 'dates')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.traces = []
+        self.title = None
+        self.x_title = None
+        self.y_title = None
+        # Ось X - даты в числах matplotlib
+        self.dates = False
+
+    def add_trace(self, trace):
+        self.traces.append(trace)
+
+
+def _date_numbers(index):
+    """Даты индекса в числах matplotlib: считаются один раз на индекс и общие для всех его трасс."""
+    return mdates.date2num(index.to_numpy())
+
+
+def _values(series):
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _visible(x_values, y_values, view_range):
+    """
+    Точки, попадающие в окно просмотра view_range (границы в единицах оси X), с запасом в половину окна
+    с каждой стороны, чтобы при небольшой прокрутке график не обрывался до следующего перезапроса.
+    """
+    if view_range is None:
+        return x_values, y_values
+    start, end = view_range
+    margin = (end - start) / 2
+    lo = max(np.searchsorted(x_values, start - margin, 'left') - 1, 0)
+    hi = np.searchsorted(x_values, end + margin, 'right') + 1
+    return x_values[lo:hi], y_values[lo:hi]
+
+
+def _decimated(x_values, y_values, method='minmax', max_points=MAX_POINTS):
+    """Прореживает ряд до нескольких точек на пиксель окна графика."""
+    positions = decimate_indices(x_values, y_values, max_points, method)
+    if positions is None:
+        return x_values, y_values
+    return take(x_values, positions), y_values[positions]
+
+
+def _cached(memoize, operation, columns, compute):
+    return compute() if memoize is None else memoize(operation, columns, compute)
+
+
+def _aggregate(data, rules, pyramid=None, memoize=None):
+    if memoize is not None:
+        return _cached(memoize, ('aggregate', rules), tuple(data.columns), lambda: _aggregate(data, rules, pyramid))
+    if pyramid is None:
+        return window_aggregates(data, rules)
+    return pyramid.aggregate(data, rules)
+
+
+def _steps(index, y_values, rule):
+    """
+    Ступенчатый ряд окна: начала интервалов и конец последнего, чтобы ступенька последнего интервала
+    дорисовывалась до его конца, а не обрывалась на его начале.
+    """
+    if not len(index):
+        return _date_numbers(index), y_values
+    edges = index.append(pd.DatetimeIndex([index[-1] + pd.Timedelta(window_width(rule))]))
+    return _date_numbers(edges), np.append(y_values, y_values[-1])
+
+
+def _trace_name(column, device, suffix=None):
+    name = f'{column} {suffix}' if suffix else column
+    return f'{name} ({device})' if device else name
+
+
+def update_regular_layout(figure, x_parameter, device):
+    figure.title = f'График данных\nПрибор: {device}'
+    figure.x_title = x_parameter if x_parameter != 'Date' else 'Дата'
+    figure.y_title = 'Значение'
+
+
+def add_effective_temp_traces(figure, chart_type, effective_temp, sensation, device, sensation_colors=None,
+                              max_points=MAX_POINTS, view_range=None, comfort_index='ЭТ'):
+    """
+    Добавляет на figure индекс комфорта (по умолчанию эффективную температуру) одной трассой: цвет каждой точки
+    (а у линии - отрезка от неё до следующей) задаётся кодом категории, -1 - нет данных.
+    """
+    comfort_index = COMFORT_INDICES[comfort_index]
+    # Пользовательские цвета теплоощущения перекрывают цвета шкалы индекса
+    sensation_colors = {**comfort_index.scale.colors, **(sensation_colors or {})}
+    x_values, positions = _visible(_date_numbers(effective_temp.index), np.arange(len(effective_temp)), view_range)
+    y_values = _values(effective_temp)[positions]
+    sensation = sensation.iloc[positions]
+    # Ряд прореживается целиком до разбиения на категории, чтобы коды совпадали с точками
+    positions = decimate_indices(x_values, y_values, max_points, 'lttb' if chart_type == 'scatter' else 'minmax')
+    if positions is not None:
+        x_values, y_values, sensation = x_values[positions], y_values[positions], sensation.iloc[positions]
+    codes, categories = pd.factorize(sensation)
+    palette = tuple((f'{category} ({device})', sensation_colors.get(category, '#000000')) for category in categories)
+    trace_label = f'{comfort_index.label} ({device})'
+    if chart_type == 'line':
+        figure.add_trace(TraceSpec(trace_label, 'line', x_values, y_values, width=2, codes=codes, palette=palette))
+    elif chart_type == 'bar':
+        figure.add_trace(TraceSpec(trace_label, 'bar', x_values, y_values, codes=codes, palette=palette))
+    elif chart_type == 'scatter':
+        figure.add_trace(TraceSpec(trace_label, 'markers', x_values, y_values, size=8, opacity=0.7, codes=codes,
+                                   palette=palette))
+    figure.title = f'{comfort_index.title}\nПрибор: {device}'
+    figure.x_title = 'Дата'
+    figure.y_title = comfort_index.y_title
+    figure.dates = True
+
+
+def add_regular_traces(figure, chart_type, x_data, y_data, x_parameter, y_parameters, device, avg_one_hour=False,
+                       avg_three_hours=False, avg_one_day=False, min_max_daily=False, max_points=MAX_POINTS,
+                       view_range=None, pyramid=None, memoize=None, anomalies=False, anomaly_stats=None):
+    """
+    Добавляет на figure выбранные параметры и, по флагам, их осреднения, суточные min/max и аномалии.
+    Все ряды прореживаются до max_points точек (None - без прореживания); при view_range по датам
+    берётся только окно просмотра, а осреднения считаются по всему ряду и обрезаются после.
+    pyramid - AggregatePyramid устройства, из которого берутся осреднения, если y_data - непрерывный участок его ряда;
+    memoize(операция, столбцы, compute) - кэш осреднений между построениями;
+    anomalies - EWMA параметра и выделенные точки с |z| выше порога (только для оси дат);
+    anomaly_stats(столбец) - статистики StreamingStats по всей истории устройства, иначе они считаются по y_data;
+    device=None - столбцы уже подписаны устройствами (сравнение нескольких устройств).
+    """
+    x_values = _values(x_data[x_parameter]) if x_parameter != 'Date' else _date_numbers(x_data.index)
+    figure.dates = x_parameter == 'Date'
+    if not figure.dates:
+        view_range = None
+    method = 'lttb' if chart_type == 'scatter' else 'minmax'
+    for column in y_parameters:
+        trace_label = _trace_name(column, device)
+        x_trace, y_trace = _decimated(*_visible(x_values, _values(y_data[column]), view_range), method, max_points)
+        if chart_type == 'line':
+            figure.add_trace(TraceSpec(trace_label, 'line', x_trace, y_trace, width=2))
+        elif chart_type == 'bar':
+            figure.add_trace(TraceSpec(trace_label, 'bar', x_trace, y_trace, width=0.1))
+        elif chart_type == 'scatter':
+            figure.add_trace(TraceSpec(trace_label, 'markers', x_trace, y_trace, size=8, opacity=0.7))
+    if anomalies and figure.dates:
+        for column in y_parameters:
+            if anomaly_stats is None:
+                stats = StreamingStats().update(y_data[column])
+            else:
+                # Окно статистик на границе интервала дат заполнено записями до него, на график идёт только интервал
+                stats = anomaly_stats(column)
+                stats = filter_by_date(stats, (y_data.index[0], y_data.index[-1])) if len(y_data) else stats.iloc[:0]
+            stats_x = _date_numbers(stats.index)
+            x_trace, y_trace = _decimated(*_visible(stats_x, _values(stats['ewma']), view_range),
+                                          max_points=max_points)
+            figure.add_trace(TraceSpec(_trace_name(column, device, 'EWMA'), 'line', x_trace, y_trace, width=1))
+            flagged = stats['anomaly'].to_numpy(dtype=bool)
+            x_trace, y_trace = _decimated(*_visible(stats_x[flagged], _values(y_data[column])[flagged], view_range),
+                                          'lttb', max_points)
+            figure.add_trace(TraceSpec(_trace_name(column, device, 'аномалии'), 'markers', x_trace, y_trace,
+                                       color='red', size=10))
+
+    averages = [(rule, suffix, dash) for enabled, rule, suffix, dash in (
+        (avg_one_hour, '1h', '1ч', 'dash'), (avg_three_hours, '3h', '3ч', 'dot'), (avg_one_day, 'D', '1д', 'dashdot'))
+        if enabled]
+    rules = tuple(dict.fromkeys([rule for rule, _, _ in averages] + (['D'] if min_max_daily else [])))
+    if not rules:
+        return
+    # Все окна считаются одним проходом по записям
+    windows = _aggregate(y_data[y_parameters], rules, pyramid, memoize)
+    for rule, suffix, dash in averages:
+        mean = window_mean(windows[rule])
+        for column in y_parameters:
+            y_values = _values(mean[column])
+            # Суточное среднее без данных не рисуется
+            if rule == 'D' and np.isnan(y_values).all():
+                continue
+            x_trace, y_trace = _decimated(*_visible(*_steps(mean.index, y_values, rule), view_range),
+                                          max_points=max_points)
+            figure.add_trace(TraceSpec(_trace_name(column, device, suffix), 'line', x_trace, y_trace, step=True,
+                                       width=1.5, dash=dash))
+    if min_max_daily:
+        daily = windows['D']
+        for column in y_parameters:
+            for how, color, dash in (('min', 'blue', 'dash'), ('max', 'red', 'solid')):
+                y_values = _values(daily[how][column])
+                if np.isnan(y_values).all():
+                    continue
+                x_trace, y_trace = _decimated(*_visible(*_steps(daily[how].index, y_values, 'D'), view_range),
+                                              max_points=max_points)
+                figure.add_trace(TraceSpec(_trace_name(column, device, f'{how} 1д'), 'line', x_trace, y_trace,
+                                           step=True, color=color, width=1, dash=dash))
+
+
+def _plotly_dates(x_values):
+    # Обратный перевод чисел matplotlib в datetime64 без поэлементного num2date
+    epoch = np.datetime64(mdates.get_epoch(), 'us')
+    return epoch + np.round(x_values * 86400e6).astype('timedelta64[us]')
+
+
+def _unix_milliseconds(x_values):
+    # Числа matplotlib в миллисекунды Unix: plotly читает их на оси дат, а float64 уходит в HTML двоичным массивом
+    return (x_values - mdates.date2num(np.datetime64('1970-01-01'))) * 86400e3
+
+
+def _plotly_traces(traces):
+    """Разноцветные трассы для plotly раскладываются по цветам; линия каждого цвета включает конец своего отрезка."""
+    for trace in traces:
+        if trace.codes is None:
+            yield trace
+            continue
+        for code, (name, color) in enumerate(trace.palette):
+            mask = trace.codes == code
+            if trace.kind == 'line':
+                mask[1:] |= mask[:-1]
+                yield TraceSpec(name, 'line', trace.x, np.where(mask, trace.y, np.nan), color=color, width=trace.width)
+            else:
+                yield TraceSpec(name, trace.kind, trace.x[mask], trace.y[mask], color=color, width=trace.width,
+                                size=trace.size, opacity=trace.opacity)
+
+
+def to_plotly(figure, webgl=False):
+    """
+    Plotly-фигура по ChartSpec для экспорта в HTML.
+    webgl=True - для интерактивного просмотра: длинные трассы рисуются Scattergl, а даты передаются числами,
+    чтобы все массивы встраивались в HTML двоичными, а не списками JSON.
+    """
+    plotly_figure = go.Figure()
+    for trace in _plotly_traces(figure.traces):
+        if not figure.dates:
+            x_values = trace.x
+        else:
+            x_values = _unix_milliseconds(trace.x) if webgl else _plotly_dates(trace.x)
+        scatter = go.Scattergl if webgl and len(trace.x) >= WEBGL_MIN_POINTS else go.Scatter
+        if trace.kind == 'bar':
+            plotly_figure.add_trace(go.Bar(x=x_values, y=trace.y, name=trace.name, width=trace.width,
+                                           marker=dict(color=trace.color)))
+        elif trace.kind == 'markers':
+            plotly_figure.add_trace(scatter(x=x_values, y=trace.y, mode='markers', name=trace.name,
+                                            marker=dict(size=trace.size, opacity=trace.opacity, color=trace.color)))
+        else:
+            plotly_figure.add_trace(scatter(x=x_values, y=trace.y, mode='lines', name=trace.name,
+                                            line=dict(width=trace.width, color=trace.color, dash=trace.dash,
+                                                      shape='hv' if trace.step else 'linear')))
+    axis = dict(showline=True, linecolor='black', linewidth=1, mirror=True, showgrid=True, gridcolor='lightgrey',
+                gridwidth=1, griddash='dot')
+    plotly_figure.update_layout(
+        yaxis_title=figure.y_title,
+        title=dict(text=figure.title, font=dict(size=16)),
+        template='plotly_white', margin=dict(t=100), hovermode='x unified', plot_bgcolor='white',
+        paper_bgcolor='white',
+        xaxis_rangeslider_visible=True,
+        xaxis=dict(title=figure.x_title, type='date' if figure.dates else None, **axis),
+        yaxis=axis)
+    return plotly_figure
+
+
+def _point_colors(trace):
+    if not trace.palette:
+        return np.zeros((len(trace.codes), 4))
+    return to_rgba_array([color for _, color in trace.palette])[trace.codes]
+
+
+def _segments(trace):
+    """Отрезки между соседними точками с цветом по коду начала; отрезки с пропуском данных отбрасываются."""
+    points = np.column_stack((trace.x, trace.y))
+    valid = (trace.codes[:-1] >= 0) & np.isfinite(points[:-1]).all(axis=1) & np.isfinite(points[1:]).all(axis=1)
+    segments = np.stack((points[:-1], points[1:]), axis=1)[valid]
+    return segments, _point_colors(trace)[:-1][valid] if len(segments) else np.empty((0, 4))
+
+
+class FigureArtists:
+    """
+    Артисты осей matplotlib по именам трасс.
+    Повторное построение обновляет только изменившиеся трассы, поэтому окно, фигуру и холст не нужно пересоздавать.
+    """
+
+    def __init__(self, matplotlib_figure, on_view_change=None):
+        self.ax = matplotlib_figure.gca()
+        self.on_view_change = on_view_change
+        # Границы оси X после последнего автомасштабирования - исходный вид графика
+        self.home_xlim = None
+        self._updating = False
+        self._connect()
+        self.x_parameter = None
+        # {имя трассы: ((вид, ступенчатая, разноцветная), цвет, артист, x, y)}
+        self.artists = {}
+        # {имя трассы: [(элемент легенды, подпись)]}
+        self.legend_entries = {}
+
+    def _create(self, trace, label):
+        if trace.codes is not None:
+            return self._create_colored(trace)
+        if trace.kind == 'markers':
+            return self.ax.scatter(trace.x, trace.y, label=label, s=trace.size ** 2, alpha=trace.opacity,
+                                   color=trace.color)
+        if trace.kind == 'bar':
+            return self.ax.bar(trace.x, trace.y, label=label, color=trace.color)
+        if trace.step:
+            return self.ax.step(trace.x, trace.y, label=label, color=trace.color, where='post')[0]
+        return self.ax.plot(trace.x, trace.y, label=label, color=trace.color)[0]
+
+    def _create_colored(self, trace):
+        """Вся разноцветная трасса - один артист; в легенде по элементу на каждый встреченный цвет."""
+        present = np.unique(trace.codes[trace.codes >= 0])
+        if trace.kind == 'line':
+            segments, colors = _segments(trace)
+            artist = self.ax.add_collection(LineCollection(segments, colors=colors, linewidths=trace.width),
+                                            autolim=False)
+            handles = [Line2D([], [], color=trace.palette[code][1], linewidth=trace.width) for code in present]
+        else:
+            valid = trace.codes >= 0
+            colors = _point_colors(trace)[valid]
+            if trace.kind == 'markers':
+                artist = self.ax.scatter(trace.x[valid], trace.y[valid], s=trace.size ** 2, alpha=trace.opacity,
+                                         c=colors)
+                handles = [Line2D([], [], color=trace.palette[code][1], marker='o', linestyle='', alpha=trace.opacity)
+                           for code in present]
+            else:
+                artist = self.ax.bar(trace.x[valid], trace.y[valid], color=colors)
+                handles = [Patch(color=trace.palette[code][1]) for code in present]
+        self.legend_entries[trace.name] = list(zip(handles, [trace.palette[code][0] for code in present]))
+        return artist
+
+    def _connect(self):
+        # ax.clear() пересоздаёт реестр обратных вызовов осей, поэтому подписка восстанавливается после очистки
+        self.ax.callbacks.connect('xlim_changed', self._xlim_changed)
+
+    def _xlim_changed(self, ax):
+        # Изменения границ при самом обновлении трасс не считаются действием пользователя
+        if not self._updating and self.on_view_change:
+            self.on_view_change()
+
+    def view_range(self):
+        """Видимый участок оси X или None, если показан исходный вид."""
+        xlim = self.ax.get_xlim()
+        if self.home_xlim is None or np.allclose(xlim, self.home_xlim):
+            return None
+        return float(xlim[0]), float(xlim[1])
+
+    def _remove(self, label):
+        self.artists.pop(label)[2].remove()
+        self.legend_entries.pop(label, None)
+
+    def update(self, chart_figure, x_parameter, device, autoscale=True):
+        """
+        Приводит оси к трассам chart_figure; возвращает False, если перерисовывать нечего.
+        autoscale=False сохраняет текущие границы осей (подкачка данных для увеличенного участка).
+        """
+        self._updating = True
+        try:
+            return self._update(chart_figure, x_parameter, device, autoscale)
+        finally:
+            self._updating = False
+
+    def _update(self, chart_figure, x_parameter, device, autoscale):
+        ax = self.ax
+        changed = False
+        if x_parameter != self.x_parameter:
+            # Другой параметр X меняет единицы оси, поэтому оси очищаются целиком
+            ax.clear()
+            self._connect()
+            self.artists = {}
+            self.legend_entries = {}
+            self.x_parameter = x_parameter
+            autoscale = changed = True
+        if x_parameter == 'Date':
+            # Трассы уже содержат числа matplotlib, единицы оси задаются явно
+            ax.xaxis_date()
+        labels = []
+        for trace in chart_figure.traces:
+            label = trace.name if trace.name else 'Unnamed'
+            kind = (trace.kind, trace.step, trace.codes is not None)
+            color = trace.color if trace.codes is None else trace.palette
+            x, y = trace.x, trace.y
+            labels.append(label)
+            previous = self.artists.get(label)
+            if previous and previous[:2] == (kind, color):
+                if np.array_equal(previous[3], x, equal_nan=True) and np.array_equal(previous[4], y, equal_nan=True):
+                    continue
+                if kind == ('line', trace.step, False):
+                    previous[2].set_data(x, y)
+                    self.artists[label] = (kind, color, previous[2], x, y)
+                    changed = True
+                    continue
+            if previous:
+                self._remove(label)
+            self.artists[label] = (kind, color, self._create(trace, label), x, y)
+            changed = True
+        for label in set(self.artists).difference(labels):
+            self._remove(label)
+            changed = True
+        if not changed:
+            return False
+
+        ax.set_xlabel(x_parameter if x_parameter != 'Date' else 'Дата')
+        ax.set_ylabel('Значение')
+        ax.set_title(f'График\nПрибор: {device}')
+        ax.grid(True)
+        if x_parameter == 'Date':
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+            ax.tick_params(axis='x', labelrotation=45)
+        if autoscale:
+            # Масштабирование панелью инструментов отключает автомасштаб, новое построение его возвращает.
+            # relim не учитывает коллекции, поэтому их границы добавляются отдельно
+            ax.set_autoscale_on(True)
+            ax.relim()
+            for kind, _, artist, x, y in self.artists.values():
+                if kind[0] == 'markers':
+                    ax.update_datalim(artist.get_offsets())
+                elif kind[0] == 'line' and kind[2]:
+                    points = np.column_stack((x, y))
+                    ax.update_datalim(points[np.isfinite(points).all(axis=1)])
+            ax.autoscale_view()
+            self.home_xlim = ax.get_xlim()
+        if ax.get_legend():
+            ax.get_legend().remove()
+        entries = []
+        for label in labels:
+            entries.extend(self.legend_entries.get(label, [(self.artists[label][2], label)]))
+        if entries:
+            ax.legend(*zip(*entries))
+        return True
+
+
+def draw_figure(chart_figure, matplotlib_figure, x_parameter, device):
+    """Рисует трассы ChartSpec на осях matplotlib_figure; не зависит от Tk и работает с любым backend."""
+    FigureArtists(matplotlib_figure).update(chart_figure, x_parameter, device)
+
+
+class ChartRequest:
+    """
+    Параметры одного построения, снятые с виджетов в главном потоке.
+    date_range - пара (начало, конец), любая граница может быть None;
+    view_range - видимый участок оси дат в числах matplotlib после масштабирования (None - весь график);
+    pyramid - готовые осреднения по всему ряду устройства (AggregatePyramid) или None;
+    cache - SeriesCache для осреднений и индексов комфорта или None;
+    max_points - предел точек трассы после прореживания (None - все точки, для интерактивного HTML);
+    overlay - {устройство: DataFrame} устройств, чьи параметры Y выравниваются по времени на сетку device
+    и рисуются на том же графике;
+    comfort_index - индекс графика effective_temp из COMFORT_INDICES ('ЭТ', 'Хьюмидекс', ...);
+    anomalies - EWMA и аномалии параметров Y, anomaly_tracker - AnomalyTracker их статистик или None.
+    """
+
+    __slots__ = ('device', 'data', 'x_parameter', 'y_parameters', 'chart_type', 'date_range', 'effective_temp',
+                 'temp_column', 'humidity_column', 'averages', 'sensation_colors', 'view_range', 'pyramid',
+                 'cache', 'max_points', 'overlay', 'comfort_index', 'anomalies', 'anomaly_tracker', 'generation')
+
+    def __init__(self, device, data, x_parameter, y_parameters, chart_type, date_range=None, effective_temp=False,
+                 temp_column=None, humidity_column=None, averages=None, sensation_colors=None, view_range=None,
+                 pyramid=None, cache=None, max_points=MAX_POINTS, overlay=None, comfort_index='ЭТ', anomalies=False,
+                 anomaly_tracker=None):
+        self.device = device
+        self.data = data
+        self.x_parameter = x_parameter
+        self.y_parameters = y_parameters
+        self.chart_type = chart_type
+        self.date_range = date_range
+        self.effective_temp = effective_temp
+        self.temp_column = temp_column
+        self.humidity_column = humidity_column
+        self.averages = averages or {}
+        self.sensation_colors = sensation_colors
+        self.view_range = view_range
+        self.pyramid = pyramid
+        self.cache = cache
+        self.max_points = max_points
+        self.overlay = overlay or {}
+        self.comfort_index = comfort_index
+        self.anomalies = anomalies
+        self.anomaly_tracker = anomaly_tracker
+        self.generation = 0
+
+    @property
+    def device_label(self):
+        """Подпись устройств графика: основное и сравниваемые через запятую."""
+        if self.effective_temp or not self.overlay:
+            return self.device
+        return ', '.join([self.device, *self.overlay])
+
+    def with_view(self, data, view_range):
+        """Тот же график по свежим данным устройства для другого участка оси."""
+        request = copy.copy(self)
+        request.data = data
+        request.view_range = view_range
+        if request.pyramid is not None and not request.pyramid.matches(data):
+            request.pyramid = None
+        return request
+
+
+def filter_by_date(data, date_range):
+    """
+    Записи между границами date_range включительно (любая граница может быть None).
+    Индекс устройства отсортирован при загрузке, поэтому это срез через searchsorted без масок и копий.
+    """
+    start, end = date_range
+    first = 0 if start is None else data.index.searchsorted(start, side='left')
+    last = len(data) if end is None else data.index.searchsorted(end, side='right')
+    return data.iloc[first:last]
+
+
+def _memoizer(request):
+    """memoize(операция, столбцы, compute) поверх кэша запроса или None без кэша."""
+    cache = request.cache
+    if cache is None:
+        return None
+    data = request.data
+    # Длина и последняя дата ряда отличают данные до и после дозаписи, если сброс кэша опоздал
+    stamp = (len(data), data.index[-1] if len(data) else None)
+    return lambda operation, columns, compute: cache.get(
+        (request.device, columns, request.date_range, operation, stamp), compute)
+
+
+def _anomaly_stats(request):
+    """anomaly_stats(столбец) по трекеру запроса - статистики всей истории устройства - или None без трекера."""
+    tracker = request.anomaly_tracker
+    if tracker is None:
+        return None
+    return lambda column: tracker.stats(request.device, column, request.data[column])
+
+
+def build_chart_figure(request):
+    """Фильтрует данные и собирает ChartSpec; ошибки данных - ValueError с текстом для пользователя."""
+    memoize = _memoizer(request)
+    data = request.data
+    if request.date_range:
+        data = filter_by_date(data, request.date_range)
+    figure = ChartSpec()
+    if request.effective_temp:
+        effective_temp, sensation = _cached(
+            memoize, ('comfort', request.comfort_index), (request.temp_column, request.humidity_column),
+            lambda: calculate_comfort_index(data, request.temp_column, request.humidity_column, request.comfort_index))
+        if not effective_temp.notna().any():
+            raise ValueError('Нет валидных данных для построения графика теплоощущения.')
+        # Пропуски остаются в ряду, чтобы линия на них прерывалась
+        add_effective_temp_traces(figure, request.chart_type, effective_temp, sensation, request.device,
+                                  request.sensation_colors, request.max_points, request.view_range,
+                                  request.comfort_index)
+    elif request.overlay:
+        # Выровненные ряды не совпадают с рядом устройства, поэтому пирамида, кэш и трекер аномалий не используются
+        frames = {request.device: data}
+        for device, frame in request.overlay.items():
+            frames[device] = filter_by_date(frame, request.date_range) if request.date_range else frame
+        aligned = align_devices(frames, request.y_parameters)
+        if request.x_parameter != 'Date':
+            aligned.insert(0, request.x_parameter, data[request.x_parameter].to_numpy())
+        y_parameters = [column for column in aligned.columns if column != request.x_parameter]
+        add_regular_traces(figure, request.chart_type, aligned, aligned, request.x_parameter, y_parameters, None,
+                           max_points=request.max_points, view_range=request.view_range, anomalies=request.anomalies,
+                           **request.averages)
+        update_regular_layout(figure, request.x_parameter, request.device_label)
+    else:
+        add_regular_traces(figure, request.chart_type, data, data, request.x_parameter, request.y_parameters,
+                           request.device, max_points=request.max_points, view_range=request.view_range,
+                           pyramid=request.pyramid, memoize=memoize, anomalies=request.anomalies,
+                           anomaly_stats=_anomaly_stats(request), **request.averages)
+        update_regular_layout(figure, request.x_parameter, request.device)
+    return figure
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from device_store import as_frame, sorted_unique
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.calculus_graphicus', 'cache')
+DEFAULT_MAX_BYTES = 2 << 30
+SAMPLE_SIZE = 1 << 16
+SAMPLE_COUNT = 16
+META_FILE = 'meta.json'
+SERIES_CACHE_BYTES = 256 << 20
+
+
+class DeviceDataCache:
+    """
+    Кэш разобранных выгрузок на диске.
+    Для каждого исходного файла хранится каталог с индексом и значениями устройств в формате .npy
+    (значения по столбцам, Fortran-порядок), которые при повторном открытии отображаются в память без разбора JSON.
+    Ключ строится из пути, размера, времени изменения и хэша содержимого; при превышении max_bytes
+    удаляются давно не использованные записи.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _content_hash(file_path, size):
+        # Размер и mtime уже отражают почти любое изменение файла, поэтому хэш считается по равномерно
+        # распределённым фрагментам, а не по всей многогигабайтной выгрузке
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            if size <= SAMPLE_SIZE * SAMPLE_COUNT:
+                digest.update(file.read())
+            else:
+                step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+                for num in range(SAMPLE_COUNT):
+                    file.seek(num * step)
+                    digest.update(file.read(SAMPLE_SIZE))
+        return digest.hexdigest()
+
+    def fingerprint(self, file_path):
+        stat = os.stat(file_path)
+        source = os.path.abspath(file_path)
+        content_hash = self._content_hash(file_path, stat.st_size)
+        key = hashlib.blake2b(f'{source}|{stat.st_size}|{stat.st_mtime_ns}|{content_hash}'.encode('utf-8'),
+                              digest_size=16).hexdigest()
+        return key, source
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        # Каталоги с точкой в начале - недописанные записи
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if not name.startswith('.') and os.path.isfile(os.path.join(self.directory, name, META_FILE))]
+
+    @staticmethod
+    def _read_meta(entry):
+        with open(os.path.join(entry, META_FILE), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def load(self, file_path, with_offset=False):
+        """
+        Возвращает {устройство: DataFrame} поверх отображённых в память файлов или None.
+        При with_offset=True - пару (данные, смещение закрывающей скобки, сохранённое при разборе) или None.
+        """
+        try:
+            key, source = self.fingerprint(file_path)
+            entry = os.path.join(self.directory, key)
+            if not os.path.isfile(os.path.join(entry, META_FILE)):
+                return None
+            meta = self._read_meta(entry)
+            if with_offset and 'closing_offset' not in meta:
+                # Записи прежних версий без смещения разбираются заново
+                return None
+            device_data = {}
+            for device in meta['devices']:
+                index = np.load(os.path.join(entry, device['index']), mmap_mode='r')
+                values = np.load(os.path.join(entry, device['values']), mmap_mode='r')
+                # Транспонирование Fortran-массива даёт C-порядок, который pandas использует без копирования
+                # Записи, сохранённые до упорядочивания при загрузке, приводятся к тому же виду
+                device_data[device['name']] = sorted_unique(pd.DataFrame(
+                    values, index=pd.DatetimeIndex(index, name='Date'), columns=device['columns'], copy=False))
+            # Время изменения meta.json служит отметкой последнего использования для LRU
+            os.utime(os.path.join(entry, META_FILE))
+            return (device_data, meta['closing_offset']) if with_offset else device_data
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, file_path, device_data, closing_offset=None):
+        temp_entry = None
+        try:
+            key, source = self.fingerprint(file_path)
+            os.makedirs(self.directory, exist_ok=True)
+            temp_entry = os.path.join(self.directory, f'.tmp-{uuid.uuid4().hex}')
+            os.makedirs(temp_entry)
+            devices = []
+            for num, (name, entry) in enumerate(device_data.items()):
+                frame = as_frame(entry)
+                device = {'name': name, 'columns': [str(column) for column in frame.columns],
+                          'index': f'd{num}_index.npy', 'values': f'd{num}_values.npy'}
+                np.save(os.path.join(temp_entry, device['index']), frame.index.to_numpy())
+                np.save(os.path.join(temp_entry, device['values']),
+                        np.asfortranarray(frame.to_numpy(dtype=np.float64)))
+                devices.append(device)
+            with open(os.path.join(temp_entry, META_FILE), 'w', encoding='utf-8') as file:
+                json.dump({'source': source, 'devices': devices, 'closing_offset': closing_offset}, file,
+                          ensure_ascii=False)
+            self.invalidate(file_path)
+            entry = os.path.join(self.directory, key)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(temp_entry, entry)
+            self._evict(keep=entry)
+        except OSError:
+            # Кэш не должен мешать загрузке: при ошибке записи данные просто не кэшируются
+            if temp_entry:
+                shutil.rmtree(temp_entry, ignore_errors=True)
+
+    def invalidate(self, file_path):
+        """Удаляет все записи, построенные по указанному исходному файлу."""
+        source = os.path.abspath(file_path)
+        for entry in self._entries():
+            try:
+                if self._read_meta(entry).get('source') == source:
+                    shutil.rmtree(entry)
+            except (OSError, ValueError):
+                continue
+
+    def clear(self):
+        for entry in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+    @staticmethod
+    def _entry_size(entry):
+        return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+    def _evict(self, keep=None):
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append((os.path.getmtime(os.path.join(entry, META_FILE)), self._entry_size(entry), entry))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            try:
+                shutil.rmtree(entry)
+                total -= size
+            except OSError:
+                # Файлы записи ещё отображены в память (Windows) - удалим при следующей очистке
+                continue
+
+
+def _result_nbytes(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(index=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_result_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_result_nbytes(item) for item in value.values())
+    return 0
+
+
+class SeriesCache:
+    """
+    Кэш в памяти для осреднений и эффективной температуры между построениями графиков.
+    Ключ - кортеж (устройство, столбцы, интервал, операция, ...); при превышении max_bytes вытесняются давно
+    не использованные результаты. Обращения идут из фонового потока построения, поэтому словарь под блокировкой.
+    """
+
+    def __init__(self, max_bytes=SERIES_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Результат для key; при промахе вызывает compute() и запоминает результат."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Вычисление идёт вне блокировки; результаты кэша не изменяются, поэтому отдаются без копирования
+        value = compute()
+        size = _result_nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def invalidate(self, device=None):
+        """Удаляет результаты устройства (первый элемент ключа) или, без device, все."""
+        with self._lock:
+            for key in [key for key in self._entries if device is None or key[0] == device]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,19 +1,70 @@
+import os
+import pathlib
+import tempfile
 import tkinter as tk
+import webbrowser
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import pandas as pd
-import json
 import time
 import threading
 import matplotlib.pyplot as plt
-import plotly.graph_objects as go
 from tkinter import messagebox, filedialog
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
+from ttkbootstrap.dialogs import Querybox
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from aggregates import AggregatePyramid
+from anomalies import AnomalyTracker
+from chart_builder import (HUMIDITY_PRIORITY, TEMP_PRIORITY, ChartRequest, ChartSpec, FigureArtists,
+                           build_chart_figure, to_plotly)
+from data_cache import DeviceDataCache, SeriesCache
+from device_store import (DeviceColumnBuffer, DeviceStore, compact_device_frame, merge_device_frames,
+                          read_appended_records, read_device_file)
+from json_stream import COMPRESSED_EXTENSIONS, LINE_EXTENSIONS, is_line_export, split_lines
+from load_progress import LoadCancelled, LoadProgress
+
+JSON_EXTENSIONS = ('.json', '.txt') + LINE_EXTENSIONS
+EXPORT_EXTENSIONS = JSON_EXTENSIONS + tuple(extension + suffix for extension in JSON_EXTENSIONS
+                                            for suffix in COMPRESSED_EXTENSIONS)
+EXPORT_FILE_TYPES = [('JSON', ' '.join(f'*{extension}' for extension in EXPORT_EXTENSIONS))]
+NDJSON_PART_BYTES = 64 << 20
+FOLLOW_INTERVAL_MS = 2000
+# Интервал до стольких дней предлагается для выбора целиком, длиннее - по началам месяцев
+QUICK_PICK_DAYS = 62
+# Пауза после масштабирования или прокрутки графика, после которой видимый участок перезапрашивается
+VIEW_REQUERY_MS = 200
+
 
 class DataProcessor:
     def __init__(self, master):
         self.master = master
-        self.master.chart_figure = go.Figure()
+        self.master.chart_figure = ChartSpec()
         self.loading_thread = None
+        self.load_progress = None
+        self.data_cache = DeviceDataCache()
+        # Осреднения и ЭТ повторных построений; сбрасывается при изменении device_data
+        self.series_cache = SeriesCache()
+        # Скользящие статистики параметров для аномалий; после дозаписи обновляются только новые записи
+        self.anomaly_tracker = AnomalyTracker()
+        # {файл: смещение закрывающей скобки} для режима слежения за дописываемыми выгрузками
+        self.follow_offsets = {}
+        self.follow_job = None
+        # Поток, дочитывающий файлы; следующая проверка начинается только после применения его результата
+        self.follow_thread = None
+        # Фоновое построение графика: поколение последнего запроса и запрос, ждущий окончания текущего
+        self.render_thread = None
+        self.render_generation = 0
+        self.pending_render = None
+        # Артисты открытого окна графика: повторные построения обновляют их, а не пересоздают окно
+        self.chart_artists = None
+        self.chart_toolbar = None
+        # Последний показанный запрос и отложенный перезапрос видимого участка при масштабировании
+        self.last_request = None
+        self.view_job = None
+        # {устройство: AggregatePyramid} осреднений 1ч/3ч/1д, строятся в фоне после загрузки
+        self.pyramids = {}
+        self.pyramid_thread = None
+        # Все параметры выбранного устройства; списки осей показывают их с учётом строки поиска
+        self.x_parameter_names = []
+        self.y_parameter_names = []
 
     @staticmethod
     def _parse_datetime(date_combobox, hour_entry, minute_entry, min_datetime=None):
@@ -21,8 +72,13 @@ class DataProcessor:
             date_str = date_combobox.get()
             if not date_str:
                 return None
-            year = min_datetime.year if min_datetime else pd.Timestamp.now().year
-            date_struct = time.strptime(date_str, "%d-%m")
+            try:
+                date_struct = time.strptime(date_str, "%d-%m-%Y")
+                year = date_struct.tm_year
+            except ValueError:
+                # Дата без года, введённая вручную
+                date_struct = time.strptime(date_str, "%d-%m")
+                year = min_datetime.year if min_datetime else pd.Timestamp.now().year
             hour = int(hour_entry.get()) if hour_entry.get() else 0
             minute = int(minute_entry.get()) if minute_entry.get() else 0
             return year, date_struct.tm_mon, date_struct.tm_mday, hour, minute
@@ -31,125 +87,428 @@ class DataProcessor:
                 f"Ошибка парсинга даты: {e}, date_str={date_str}, hour={hour_entry.get()}, minute={minute_entry.get()}")
             return None
 
-    def _begin_json_load(self):
+    def _begin_json_load(self, folder=False):
         self.master.gui.load_json_button.config(state='disabled')
+        self.master.gui.load_folder_button.config(state='disabled')
         self.master.gui.loading_bar.grid()
         self.master.gui.loading_bar['value'] = 0
-        threading.Thread(target=self._process_json_load, daemon=True).start()
+        self.master.gui.cancel_load_button.grid()
+        self.master.gui.loading_label.grid()
+        self.loading_thread = threading.Thread(target=self._process_json_load,
+                                               args=(folder, self.master.compact_storage.get(),
+                                                     self.master.lazy_loading.get()), daemon=True)
+        self.loading_thread.start()
+
+    def _begin_json_folder_load(self):
+        self._begin_json_load(folder=True)
+
+    @staticmethod
+    def _collect_json_files(directory):
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.lower().endswith(EXPORT_EXTENSIONS) and os.path.isfile(os.path.join(directory, name))]
+
+    def _cancel_json_load(self):
+        if self.load_progress:
+            self.load_progress.cancel()
+            self.master.gui.cancel_load_button.config(state='disabled')
+
+    def _post_load_progress(self, percent, eta):
+        self.master.after(0, lambda: self._show_load_progress(percent, eta))
+
+    def _show_load_progress(self, percent, eta):
+        self.master.gui.loading_bar['value'] = percent
+        self.master.gui.loading_label.config(text=f'{percent:.0f}%  {LoadProgress.format_eta(eta)}')
+
+    def _read_json_files(self, file_paths, progress, compact=False, lazy=False):
+        # Вместе с данными возвращаются смещения закрывающих скобок на момент разбора: с них начинается слежение,
+        # поэтому записи, дописанные во время загрузки, не теряются
+        # Неизменившиеся файлы берутся из кэша, разбираются только остальные
+        cached = [self.data_cache.load(path, with_offset=True) for path in file_paths]
+        results = [entry and entry[0] for entry in cached]
+        offsets = [entry and entry[1] for entry in cached]
+        missing = [num for num, frames in enumerate(results) if frames is None]
+        if compact:
+            for num, frames in enumerate(results):
+                if frames is not None:
+                    results[num] = {name: compact_device_frame(frame) for name, frame in frames.items()}
+        bytes_done = sum(os.path.getsize(path) for path, frames in zip(file_paths, results) if frames is not None)
+        progress.update(bytes_done)
+        tasks = self._split_tasks(file_paths, missing)
+        if len(tasks) == 1:
+            progress.offset = bytes_done
+            results[missing[0]], offsets[missing[0]] = read_device_file(file_paths[missing[0]], progress, compact,
+                                                                        lazy, with_offset=True)
+        elif tasks:
+            self._read_json_files_parallel(file_paths, tasks, results, offsets, bytes_done, progress, compact, lazy)
+        if lazy:
+            # В каталоге нет разобранных данных - кэш пополняется только полной загрузкой
+            return results, offsets
+        for num in missing:
+            progress.check_cancelled()
+            self.data_cache.store(file_paths[num], results[num], offsets[num])
+        return results, offsets
+
+    @staticmethod
+    def _split_tasks(file_paths, missing):
+        """Пары (номер файла, диапазон байт); большой NDJSON без сжатия делится по строкам между процессами."""
+        workers = os.cpu_count() or 1
+        tasks = []
+        for num in missing:
+            parts = min(workers, os.path.getsize(file_paths[num]) // NDJSON_PART_BYTES)
+            if parts > 1 and is_line_export(file_paths[num]):
+                with open(file_paths[num], 'rb') as file:
+                    tasks.extend((num, byte_range) for byte_range in split_lines(file, parts))
+            else:
+                tasks.append((num, None))
+        return tasks
+
+    @staticmethod
+    def _read_json_files_parallel(file_paths, tasks, results, offsets, bytes_done, progress, compact, lazy=False):
+        # Каждый файл или часть NDJSON разбирается в отдельном процессе, прогресс считается по завершённым частям
+        executor = ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1))
+        futures = {}
+        parts = {}
+        for num, _ in tasks:
+            parts.setdefault(num, [])
+        completed = False
+        try:
+            for num, byte_range in tasks:
+                future = executor.submit(read_device_file, file_paths[num], None, compact, lazy, byte_range, True)
+                futures[future] = (num, len(parts[num]), byte_range)
+                parts[num].append(None)
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                progress.check_cancelled()
+                for future in done:
+                    num, position, byte_range = futures[future]
+                    try:
+                        parts[num][position] = future.result()
+                    except Exception as e:
+                        raise ValueError(f"{os.path.basename(file_paths[num])}: {e}") from e
+                    if all(part is not None for part in parts[num]):
+                        # Части одного файла идут по порядку строк, поэтому сливаются без пересортировки
+                        frame_sets = [frames for frames, _ in parts[num]]
+                        results[num] = (frame_sets[0] if len(frame_sets) == 1 else
+                                        merge_device_frames(frame_sets, compact))
+                        # Смещение файла - закрывающая скобка последней части, содержащей записи
+                        offsets[num] = max((offset for _, offset in parts[num] if offset is not None), default=None)
+                    bytes_done += byte_range[1] - byte_range[0] if byte_range else os.path.getsize(file_paths[num])
+                    progress.update(bytes_done)
+            completed = True
+        finally:
+            if not completed:
+                # При отмене или ошибке уже начатые разборы иначе дочитывают многогигабайтные файлы в фоне
+                DataProcessor._terminate_workers(executor)
+            executor.shutdown(wait=False, cancel_futures=True)
 
-    def _process_json_load(self):
-        file_path = filedialog.askopenfilename(filetypes=[('JSON', '*.json;*.txt')])
-        if not file_path:
+    @staticmethod
+    def _terminate_workers(executor):
+        if hasattr(executor, 'terminate_workers'):
+            # Python 3.14+
+            executor.terminate_workers()
+            return
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+
+    def _process_json_load(self, folder=False, compact=False, lazy=False):
+        if folder:
+            directory = filedialog.askdirectory()
+            file_paths = self._collect_json_files(directory) if directory else []
+        else:
+            file_paths = list(filedialog.askopenfilenames(filetypes=EXPORT_FILE_TYPES))
+        if not file_paths:
             self.master.after(0, self._complete_load)
             return
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                json_data = json.load(file)
-            temp_device_data = {}
-
-            for num, value in enumerate(json_data.values()):
-                value_num = num / len(json_data.values())
-                self.master.after(0, lambda: self.master.gui.loading_bar.config(value=value_num * 100))
-                if 'uName' not in value or 'serial' not in value or 'Date' not in value or 'data' not in value:
-                    continue
-                device_name = f"{value['uName']} ({value['serial']})"
-                if device_name not in temp_device_data:
-                    temp_device_data[device_name] = []
-                record = {'Date': pd.to_datetime(value['Date'])}
-                record.update(value['data'])
-                temp_device_data[device_name].append(record)
-            self.master.device_data = {
-                name: pd.DataFrame(records).set_index('Date').apply(pd.to_numeric, errors='coerce').dropna(how='all')
-                for name, records in temp_device_data.items()}
-            if not self.master.device_data:
+            total_bytes = sum(os.path.getsize(path) for path in file_paths)
+            progress = self.load_progress = LoadProgress(total_bytes, self._post_load_progress)
+            frame_sets, offsets = self._read_json_files(file_paths, progress, compact, lazy)
+            device_data = DeviceStore(merge_device_frames(frame_sets, compact), compact=compact)
+            progress.check_cancelled()
+            if not device_data:
                 raise ValueError("Нет данных для устройств")
+            # При отмене до этого места остаются ранее загруженные данные
+            self.master.device_data = device_data
+            self.pyramids = {}
+            self.series_cache.invalidate()
+            self.anomaly_tracker.invalidate()
+            self._start_pyramid_build(device_data, list(device_data.keys()))
+            self.follow_offsets = dict(zip(file_paths, offsets))
             self.master.after(0, self._update_device_lists)
-            self.master.after(0, lambda: messagebox.showinfo("Успех", f"JSON загружен: {file_path}"))
+            if len(file_paths) == 1:
+                message = f"JSON загружен: {file_paths[0]}"
+            else:
+                message = f"Загружено файлов: {len(file_paths)}"
+            self.master.after(0, lambda: messagebox.showinfo("Успех", message))
+        except LoadCancelled:
+            pass
         except Exception as e:
             self.master.after(0, lambda: messagebox.showerror('Ошибка', str(e)))
         finally:
+            self.load_progress = None
             self.master.after(0, self._complete_load)
 
+    def _start_pyramid_build(self, device_data, names):
+        # Кадры берутся здесь без разворачивания: фоновый поток не обращается к хранилищу и его LRU,
+        # а устройства каталога и свёрнутые компактные получат пирамиду при первом графике с осреднением
+        frames = {name: device_data.loaded_frame(name) for name in names}
+        frames = {name: frame for name, frame in frames.items() if frame is not None and len(frame)}
+        if not frames:
+            return
+        self.pyramid_thread = threading.Thread(target=self._build_pyramids, args=(frames, self.pyramids), daemon=True)
+        self.pyramid_thread.start()
+
+    def _build_pyramids(self, frames, pyramids):
+        built = {name: AggregatePyramid(frame) for name, frame in frames.items()}
+        self.master.after(0, lambda: self._store_pyramids(pyramids, built))
+
+    def _store_pyramids(self, pyramids, built):
+        # После новой загрузки словарь уже заменён - пирамиды прежних данных отбрасываются
+        if pyramids is self.pyramids:
+            pyramids.update(built)
+
     def _complete_load(self):
         self.master.gui.loading_bar.grid_remove()
+        self.master.gui.cancel_load_button.grid_remove()
+        self.master.gui.cancel_load_button.config(state='normal')
+        self.master.gui.loading_label.grid_remove()
+        self.master.gui.loading_label.config(text='')
         self.master.gui.load_json_button.config(state='normal')
+        self.master.gui.load_folder_button.config(state='normal')
         self.master.gui.loading_bar['value'] = 0
 
+    def _toggle_follow_file(self):
+        if self.master.follow_file.get():
+            if self.follow_job is None:
+                self.follow_job = self.master.after(FOLLOW_INTERVAL_MS, self._follow_files)
+        elif self.follow_job is not None:
+            self.master.after_cancel(self.follow_job)
+            self.follow_job = None
+
+    def _follow_files(self):
+        self.follow_job = None
+        if not self.master.follow_file.get():
+            return
+        # Во время полной загрузки device_data будет заменён целиком
+        if (self.follow_thread is None and isinstance(self.master.device_data, DeviceStore) and
+                not (self.loading_thread and self.loading_thread.is_alive())):
+            # Словари копируются здесь: их меняет поток Tk, пока фоновый поток читает копии
+            self.follow_thread = threading.Thread(
+                target=self._follow_worker,
+                args=(self.master.device_data, dict(self.follow_offsets), self.pyramids, dict(self.pyramids)),
+                daemon=True)
+            self.follow_thread.start()
+        self.follow_job = self.master.after(FOLLOW_INTERVAL_MS, self._follow_files)
+
+    def _follow_worker(self, device_data, offsets, pyramids, pyramid_snapshot):
+        # Чтение, разбор и подготовка дозаписи идут вне потока Tk, главному передаётся только готовый результат
+        try:
+            appended = self._read_appended_records(device_data, offsets, pyramid_snapshot)
+        except Exception:
+            appended = None
+        self.master.after(0, lambda: self._apply_appended_records(device_data, pyramids, appended))
+
+    @staticmethod
+    def _read_appended_records(device_data, offsets, pyramids):
+        """
+        Дочитывает записи, появившиеся в файлах после смещений offsets, не меняя device_data.
+        Возвращает новые смещения, записи по файлам, {устройство: DataFrame новых записей},
+        подготовленную DeviceStore.extend_frames дозапись и пирамиды, продолженные новыми записями
+        (None - пирамиду нельзя продолжить и её нужно построить заново).
+        """
+        new_offsets = {}
+        records = {}
+        buffers = {}
+        for file_path, offset in offsets.items():
+            if offset is None:
+                continue
+            try:
+                if os.path.getsize(file_path) <= offset + 1:
+                    continue
+                file_records, new_offset = read_appended_records(file_path, offset)
+            except (OSError, ValueError):
+                # Запись ещё дописывается или файл перезаписан целиком - смещение не сдвигаем
+                continue
+            new_offsets[file_path] = new_offset
+            records[file_path] = file_records
+            for name, date, data, _, _ in file_records:
+                buffers.setdefault(name, DeviceColumnBuffer()).append(date, data)
+        tails = {name: buffer.to_frame() for name, buffer in buffers.items()}
+        extended = device_data.extend_frames(tails)
+        pyramids = {name: pyramids[name].extended(tail) for name, tail in tails.items() if name in pyramids}
+        return new_offsets, records, tails, extended, pyramids
+
+    def _apply_appended_records(self, device_data, pyramids, appended):
+        self.follow_thread = None
+        # После новой загрузки смещения и пирамиды относятся к прежним данным
+        if appended is None or device_data is not self.master.device_data or pyramids is not self.pyramids:
+            return
+        offsets, records, tails, extended, extended_pyramids = appended
+        self.follow_offsets.update(offsets)
+        changed = device_data.append_records(records, tails, extended)
+        if changed:
+            self._refresh_appended_data(changed, tails, extended_pyramids)
+
+    def _refresh_appended_data(self, changed, tails, pyramids):
+        rebuild = []
+        for name in changed:
+            self.series_cache.invalidate(name)
+            if pyramids.get(name) is not None:
+                self.pyramids[name] = pyramids[name]
+            elif name in pyramids:
+                # Новые столбцы или записи раньше конца ряда - пирамида строится заново в фоне
+                self.pyramids.pop(name, None)
+                rebuild.append(name)
+        self._start_pyramid_build(self.master.device_data, rebuild)
+        device_names = list(self.master.device_data.keys())
+        if list(self.master.gui.device_selector['values']) != device_names:
+            self.master.gui.device_selector['values'] = device_names
+            self._fill_compare_list(device_names)
+        device = self.master.gui.device_selector.get()
+        if device not in changed and not changed.intersection(self._get_compare_devices()):
+            return
+        tail = tails.get(device)
+        if tail is not None and not tail.empty:
+            # Выбранные поля и интервал не сбрасываются, а список дат расширяется по границам новых записей
+            start, end = tail.index[0], tail.index[-1]
+            if self.master.min_datetime is None or start < self.master.min_datetime:
+                self.master.min_datetime = start
+            if self.master.max_datetime is None or end > self.master.max_datetime:
+                self.master.max_datetime = end
+            date_strs = self._date_strings(self.master.min_datetime, self.master.max_datetime)
+            self.master.gui.start_datetime_selector['values'] = date_strs
+            self.master.gui.end_datetime_selector['values'] = date_strs
+        if self.master.chart_display:
+            self.render_chart()
+
+    @staticmethod
+    def _date_strings(min_datetime, max_datetime):
+        """
+        Даты быстрого выбора: все дни короткого интервала, а у длинного - первый и последний день и начала месяцев.
+        Остальные дни выбираются календарём, поэтому многолетний интервал не перечисляется по дням.
+        """
+        start, end = min_datetime.normalize(), max_datetime.normalize()
+        if (end - start).days <= QUICK_PICK_DAYS:
+            dates = pd.date_range(start, end, freq='D')
+        else:
+            dates = pd.date_range(start, end, freq='MS').union([start, end])
+        return [dt.strftime("%d-%m-%Y") for dt in dates]
+
     def _update_device_lists(self):
         device_names = list(self.master.device_data.keys())
         self.master.gui.device_selector['values'] = device_names
+        self._fill_compare_list(device_names)
         if device_names:
             self.master.gui.device_selector.set(device_names[0])
-            self._handle_x_device_selection(None)
-            self._handle_y_device_selection(None)
-
-    def _handle_x_device_selection(self, event=None):
+            self._handle_device_selection()
+
+    def _fill_compare_list(self, device_names):
+        """Заполняет список устройств для сравнения, сохраняя выбор тех, что остались в данных."""
+        compare_list = self.master.gui.compare_list
+        selected = set(self._get_compare_devices())
+        compare_list.delete(0, 'end')
+        for num, name in enumerate(device_names):
+            compare_list.insert('end', name)
+            if name in selected:
+                compare_list.selection_set(num)
+
+    def _get_compare_devices(self):
+        compare_list = self.master.gui.compare_list
+        return [compare_list.get(num) for num in compare_list.curselection()]
+
+    def _handle_device_selection(self, event=None):
         """
-        Событие <<ComboboxSelected>> автоматически передает объект события (event) как аргумент в привязанный метод.
-        Соответственно метод _handle_x_device_selection определённый без параметра event выдаст ошибку.
+        Заполняет списки параметров, датчики ЭТ и интервал дат по выбранному устройству за один проход.
+        Событие <<ComboboxSelected>> передаёт объект события (event), поэтому параметр обязателен.
         """
-        selected_device = self.master.gui.device_selector.get()
-        if selected_device in self.master.device_data:
-            dataframe = self.master.device_data[selected_device]
-            self.master.gui.x_axis_list.delete(0, 'end')
-            self.master.gui.x_axis_list.insert('end', 'Date')
-            for column in dataframe.columns:
-                self.master.gui.x_axis_list.insert('end', column)
-            self.master.gui.x_axis_list.selection_clear(0, 'end')
-            self.master.gui.x_axis_list.selection_set(0)
-            self.master.min_datetime = dataframe.index.min()
-            self.master.max_datetime = dataframe.index.max()
-            if self.master.min_datetime and self.master.max_datetime:
-                date_range = pd.date_range(start=self.master.min_datetime, end=self.master.max_datetime, freq='D')
-                date_strs = [dt.strftime("%d-%m") for dt in date_range]
-                self.master.gui.start_datetime_selector['values'] = date_strs
-                self.master.gui.end_datetime_selector['values'] = date_strs
-                self.master.gui.start_datetime_selector.set(self.master.min_datetime.strftime("%d-%m"))
-                self.master.gui.end_datetime_selector.set(self.master.max_datetime.strftime("%d-%m"))
-                self.master.gui.start_hour_entry.delete(0, 'end')
-                self.master.gui.start_hour_entry.insert(0, self.master.min_datetime.strftime("%H"))
-                self.master.gui.start_minute_entry.delete(0, 'end')
-                self.master.gui.start_minute_entry.insert(0, self.master.min_datetime.strftime("%M"))
-                self.master.gui.end_hour_entry.delete(0, 'end')
-                self.master.gui.end_hour_entry.insert(0, self.master.max_datetime.strftime("%H"))
-                self.master.gui.end_minute_entry.delete(0, 'end')
-                self.master.gui.end_minute_entry.insert(0, self.master.max_datetime.strftime("%M"))
-
-    def _handle_y_device_selection(self, event=None):
+        device = self.master.gui.device_selector.get()
+        if device not in self.master.device_data:
+            return
+        dataframe = self.master.device_data[device]
+        # Типы берутся из dtypes без построения Series на каждый из сотен столбцов
+        numeric_columns = [column for column, dtype in dataframe.dtypes.items()
+                           if pd.api.types.is_numeric_dtype(dtype)]
+        self.x_parameter_names = ['Date'] + list(dataframe.columns)
+        self.y_parameter_names = numeric_columns
+        self.master.gui.x_filter_entry.delete(0, 'end')
+        self.master.gui.y_filter_entry.delete(0, 'end')
+        self.master.gui.x_axis_list.selection_clear(0, 'end')
+        self.master.gui.y_axis_list.selection_clear(0, 'end')
+        self._fill_parameter_list(self.master.gui.x_axis_list, self.x_parameter_names)
+        self._fill_parameter_list(self.master.gui.y_axis_list, self.y_parameter_names)
+        self.master.gui.x_axis_list.selection_set(0)
+
+        numeric_set = set(numeric_columns)
+        temp_candidates = [col for col in TEMP_PRIORITY if col in numeric_set] + [
+            col for col in numeric_columns if col not in TEMP_PRIORITY]
+        humidity_candidates = [col for col in HUMIDITY_PRIORITY if col in numeric_set] + [
+            col for col in numeric_columns if col not in HUMIDITY_PRIORITY]
+        self.master.gui.temp_selector['values'] = temp_candidates
+        self.master.gui.humidity_selector['values'] = humidity_candidates
+        if temp_candidates:
+            self.master.gui.temp_selector.set(temp_candidates[0])
+        if humidity_candidates:
+            self.master.gui.humidity_selector.set(humidity_candidates[0])
+
+        if dataframe.empty:
+            return
+        # Индекс отсортирован при загрузке - границы берутся без прохода по ряду
+        self.master.min_datetime = dataframe.index[0]
+        self.master.max_datetime = dataframe.index[-1]
+        date_strs = self._date_strings(self.master.min_datetime, self.master.max_datetime)
+        self.master.gui.start_datetime_selector['values'] = date_strs
+        self.master.gui.end_datetime_selector['values'] = date_strs
+        self.master.gui.start_datetime_selector.set(self.master.min_datetime.strftime("%d-%m-%Y"))
+        self.master.gui.end_datetime_selector.set(self.master.max_datetime.strftime("%d-%m-%Y"))
+        self.master.gui.start_hour_entry.delete(0, 'end')
+        self.master.gui.start_hour_entry.insert(0, self.master.min_datetime.strftime("%H"))
+        self.master.gui.start_minute_entry.delete(0, 'end')
+        self.master.gui.start_minute_entry.insert(0, self.master.min_datetime.strftime("%M"))
+        self.master.gui.end_hour_entry.delete(0, 'end')
+        self.master.gui.end_hour_entry.insert(0, self.master.max_datetime.strftime("%H"))
+        self.master.gui.end_minute_entry.delete(0, 'end')
+        self.master.gui.end_minute_entry.insert(0, self.master.max_datetime.strftime("%M"))
+
+    @staticmethod
+    def _fill_parameter_list(listbox, names, text=''):
         """
-        Событие <<ComboboxSelected>> автоматически передает объект события (event) как аргумент в привязанный метод.
-        Соответственно метод _handle_y_device_selection определённый без параметра event выдаст ошибку.
+        Показывает параметры, содержащие text без учёта регистра, одной вставкой.
+        Выбранные параметры остаются в списке, чтобы поиск следующего поля не сбрасывал выбор.
         """
-        selected_y_device = self.master.gui.device_selector.get()
-        if selected_y_device in self.master.device_data:
-            self.master.gui.device_selector.set(selected_y_device)
-            self._handle_x_device_selection(None)
-            dataframe = self.master.device_data[selected_y_device]
-            numeric_columns = [col for col in dataframe.columns if pd.api.types.is_numeric_dtype(dataframe[col])]
-            self.master.gui.y_axis_list.delete(0, 'end')
-            for col in numeric_columns:
-                self.master.gui.y_axis_list.insert('end', col)
-            temp_priority = ['weather_temp', 'BME280_temp', 'temperature']
-            humidity_priority = ['weather_humidity', 'BME280_humidity', 'humidity']
-            temp_candidates = [col for col in temp_priority if col in numeric_columns] + [col for col in numeric_columns
-                                                                                          if col not in temp_priority]
-            humidity_candidates = [col for col in humidity_priority if col in numeric_columns] + [col for col in
-                                                                                                  numeric_columns if
-                                                                                                  col not in humidity_priority]
-            self.master.gui.temp_selector['values'] = temp_candidates
-            self.master.gui.humidity_selector['values'] = humidity_candidates
-            default_temp = next((col for col in temp_priority if col in numeric_columns),
-                                temp_candidates[0] if temp_candidates else None)
-            if default_temp:
-                self.master.gui.temp_selector.set(default_temp)
-            default_humidity = next((col for col in humidity_priority if col in numeric_columns),
-                                    humidity_candidates[0] if humidity_candidates else None)
-            if default_humidity:
-                self.master.gui.humidity_selector.set(default_humidity)
+        selected = {listbox.get(num) for num in listbox.curselection()}
+        text = text.strip().casefold()
+        shown = [name for name in names if name in selected or text in name.casefold()]
+        listbox.delete(0, 'end')
+        if shown:
+            listbox.insert('end', *shown)
+        for num, name in enumerate(shown):
+            if name in selected:
+                listbox.selection_set(num)
+
+    def _filter_x_parameters(self, event=None):
+        gui = self.master.gui
+        self._fill_parameter_list(gui.x_axis_list, self.x_parameter_names, gui.x_filter_entry.get())
+
+    def _filter_y_parameters(self, event=None):
+        gui = self.master.gui
+        self._fill_parameter_list(gui.y_axis_list, self.y_parameter_names, gui.y_filter_entry.get())
+
+    def _pick_date(self, selector):
+        """Календарь для поля даты; открывается на дате поля или на первой (последней для «По») записи устройства."""
+        start_date = pd.to_datetime(selector.get(), format="%d-%m-%Y", errors='coerce')
+        if pd.isna(start_date):
+            # Пустое или неверное поле даёт NaT, а NaT.date() не бросает исключения
+            end = selector is self.master.gui.end_datetime_selector
+            start_date = self.master.max_datetime if end else self.master.min_datetime
+        start_date = None if start_date is None or pd.isna(start_date) else start_date.date()
+        # Позиционные аргументы совместимы со старыми и новыми версиями ttkbootstrap; при отмене новые дают None
+        picked = Querybox.get_date(self.master, 'Выбор даты', 0, start_date)
+        if picked is not None:
+            selector.set(picked.strftime("%d-%m-%Y"))
 
     def clear_chart(self):
-        self.master.chart_figure.data = []
-        self.master.chart_figure.layout = go.Layout()
+        self.master.chart_figure.clear()
         if self.master.chart_display:
             self.master.chart_display.destroy()
             self.master.chart_display = None
@@ -159,17 +518,12 @@ class DataProcessor:
         if self.master.matplotlib_figure:
             plt.close(self.master.matplotlib_figure)
             self.master.matplotlib_figure = None
-
-    @staticmethod
-    def _classify_sensation(effective_temp):
-        if pd.isna(effective_temp):
-            return None
-        thresholds = [(30, 'Очень жарко'), (24, 'Жарко'), (18, 'Тепло'), (12, 'Умеренно тепло'),
-                      (6, 'Прохладно'), (0, 'Умеренно холодно'), (-12, 'Холодно'), (-24, 'Очень холодно')]
-        for threshold, sensation in thresholds:
-            if effective_temp >= threshold:
-                return sensation
-        return 'Крайне холодно'
+        self.chart_artists = None
+        self.chart_toolbar = None
+        self.last_request = None
+        if self.view_job is not None:
+            self.master.after_cancel(self.view_job)
+            self.view_job = None
 
     def _get_selected_device_and_parameters(self):
         device = self.master.gui.device_selector.get()
@@ -185,9 +539,7 @@ class DataProcessor:
                         self.master.gui.y_axis_list.curselection()] if self.master.gui.y_axis_list.curselection() else []
         return device, x_parameter, y_parameters
 
-    def _filter_data_by_date(self, data, start_datetime, end_datetime):
-        if not self.master.filter_by_date.get():
-            return data
+    def _date_range(self, start_datetime, end_datetime):
         if not start_datetime or not end_datetime:
             messagebox.showerror('Ошибка', 'Некорректный формат даты/времени.')
             return None
@@ -202,22 +554,7 @@ class DataProcessor:
         if start_timestamp > end_timestamp:
             messagebox.showerror('Ошибка', 'Неверный временной диапазон.')
             return None
-        return data[(data.index >= start_timestamp) & (data.index <= end_timestamp)]
-
-    def _calculate_effective_temperature(self, data, temp_column, humidity_column):
-        if not temp_column or not humidity_column:
-            messagebox.showwarning('Ошибка', 'Выберите температуру и влажность.')
-            return None, None
-        if temp_column not in data.columns or humidity_column not in data.columns:
-            messagebox.showerror('Ошибка', 'Выбранные параметры температуры или влажности отсутствуют в данных.')
-            return None, None
-        temperature = data[temp_column]
-        humidity = data[humidity_column]
-        effective_temp = temperature - 0.4 * (temperature - 10) * (1 - humidity / 100)
-        if effective_temp.isna().all():
-            messagebox.showerror('Ошибка', 'Невозможно вычислить эффективную температуру: данные содержат только NaN.')
-            return None, None
-        return effective_temp, effective_temp.apply(self._classify_sensation)
+        return start_timestamp, end_timestamp
 
     def _create_chart_window(self, title):
         self.clear_chart()
@@ -227,262 +564,174 @@ class DataProcessor:
         self.master.chart_display.geometry("800x600")
         self.master.matplotlib_figure = plt.figure(figsize=(8, 6))
 
-
-
-    def _add_effective_temp_traces(self, chart_type, effective_temp, sensation, device):
-
-        if effective_temp.empty:
-            messagebox.showerror('Ошибка', 'Нет валидных данных для построения графика теплоощущения.')
-            self.clear_chart()
-            return
-
-        unique_sensations = sensation.dropna().unique()
-        self._create_chart_window("График")
-
-        for category in unique_sensations:
-            mask = sensation == category
-            x_values = effective_temp.index[mask]
-            y_values = effective_temp[mask]
-
-            trace_label = f'{category} ({device})'
-            if chart_type == 'line':
-                self.master.chart_figure.add_trace(go.Scatter(
-                    x=x_values,
-                    y=y_values,
-                    mode='lines',
-                    line=dict(width=2, color=self.master.sensation_colors.get(category, '#000000')),
-                    name=trace_label
-                ))
-            elif chart_type == 'bar':
-                self.master.chart_figure.add_trace(go.Bar(
-                    x=x_values,
-                    y=y_values,
-                    marker=dict(color=self.master.sensation_colors.get(category, '#000000')),
-                    name=trace_label
-                ))
-            elif chart_type == 'scatter':
-                self.master.chart_figure.add_trace(go.Scatter(
-                    x=x_values,
-                    y=y_values,
-                    mode='markers',
-                    marker=dict(
-                        size=8,
-                        color=self.master.sensation_colors.get(category, '#000000'),
-                        opacity=0.7
-                    ),
-                    name=trace_label
-                ))
-
-        self.master.chart_figure.update_layout(
-            yaxis_title='Эф. температура (°C)',
-            title=dict(text=f'ЭТ и Теплоощущение\nПрибор: {device}', font=dict(size=16)),
-            template='plotly_white',
-            margin=dict(t=100),
-            hovermode='x unified',
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            xaxis_rangeslider_visible=True,
-            xaxis=dict(
-                title='Дата',
-                showline=True,
-                linecolor='black',
-                linewidth=1,
-                mirror=True,
-                showgrid=True,
-                gridcolor='lightgrey',
-                gridwidth=1,
-                griddash='dot'
-            ),
-            yaxis=dict(
-                showline=True,
-                linecolor='black',
-                linewidth=1,
-                mirror=True,
-                showgrid=True,
-                gridcolor='lightgrey',
-                gridwidth=1,
-                griddash='dot'
-            )
-        )
-
-    def _add_regular_traces(self, chart_type, x_data, y_data, x_parameter, y_parameters, device):
-        x_values = x_data[x_parameter] if x_parameter != 'Date' else x_data.index
-        for column in y_parameters:
-            trace_label = f'{column} ({device})'
-            if chart_type == 'line':
-                self.master.chart_figure.add_trace(
-                    go.Scatter(x=x_values, y=y_data[column], mode='lines', line=dict(width=2), name=trace_label))
-            elif chart_type == 'bar':
-                self.master.chart_figure.add_trace(go.Bar(x=x_values, y=y_data[column],
-                                                          name=trace_label, width=0.1))
-
-            elif chart_type == 'scatter':
-                self.master.chart_figure.add_trace(
-                    go.Scatter(x=x_values, y=y_data[column], mode='markers', marker=dict(size=8, opacity=0.7),
-                               name=trace_label))
-
-
-        if any([self.master.avg_one_hour.get(), self.master.avg_three_hours.get(),
-                self.master.avg_one_day.get(), self.master.min_max_daily.get()]):
-            resampled_data = y_data[y_parameters].copy()
-            if not resampled_data.empty:
-                last_row = resampled_data.iloc[-1].copy()
-                last_timestamp = resampled_data.index[-1]
-                new_timestamp = last_timestamp + pd.Timedelta(minutes=1 if len(resampled_data) <= 1 else min(
-                    (resampled_data.index[1:] - resampled_data.index[:-1]).total_seconds() / 60))
-                last_row.name = new_timestamp
-                resampled_data = pd.concat([resampled_data, last_row.to_frame().T])
-            if self.master.avg_one_hour.get():
-                resampled_one_hour = resampled_data.resample('1h').mean()
-                for column in y_parameters:
-                    self.master.chart_figure.add_trace(
-                        go.Scatter(x=resampled_one_hour.index, y=resampled_one_hour[column], mode='lines',
-                                   line=dict(dash='dash', width=1.5, shape='hv'), name=f'{column} 1ч ({device})'))
-            if self.master.avg_three_hours.get():
-                resampled_three_hours = resampled_data.resample('3h').mean()
-                for column in y_parameters:
-                    self.master.chart_figure.add_trace(
-                        go.Scatter(x=resampled_three_hours.index, y=resampled_three_hours[column], mode='lines',
-                                   line=dict(dash='dot', width=1.5, shape='hv'), name=f'{column} 3ч ({device})'))
-            if self.master.avg_one_day.get():
-                resampled_one_day = resampled_data.resample('D').mean()
-                for column in y_parameters:
-                    if not resampled_one_day[column].dropna().empty:
-                        self.master.chart_figure.add_trace(
-                            go.Scatter(x=resampled_one_day.index, y=resampled_one_day[column], mode='lines',
-                                       line=dict(dash='dashdot', width=1.5, shape='hv'), name=f'{column} 1д ({device})'))
-            if self.master.min_max_daily.get():
-                daily_min = resampled_data.resample('D').min()
-                daily_max = resampled_data.resample('D').max()
-                for col in y_parameters:
-                    if not daily_min[col].dropna().empty:
-                        #Следующая строка нужна для правильной min линии
-                        if resampled_data.index[-1].strftime('%H:%M:%S') > "01:00:00":
-                            daily_min = pd.concat([daily_min, pd.DataFrame({col: [daily_min[col].iloc[-1]]}, index=[
-                                daily_min.index[-1] + pd.Timedelta(days=1)])])
-                        self.master.chart_figure.add_trace(
-                            go.Scatter(x=daily_min.index, y=daily_min[col], mode='lines',
-                                       line=dict(dash='dash', width=1, color='blue'), name=f'{col} min 1д ({device})'))
-                    if not daily_max[col].dropna().empty:
-                        # Следующая строка нужна для правильной max линии
-                        if resampled_data.index[-1].strftime('%H:%M:%S') > "01:00:00":
-                            daily_max = pd.concat([daily_max, pd.DataFrame({col: [daily_max[col].iloc[-1]]}, index=[
-                            daily_max.index[-1] + pd.Timedelta(days=1)])])
-                        self.master.chart_figure.add_trace(
-                            go.Scatter(x=daily_max.index, y=daily_max[col], mode='lines',
-                                       line=dict(dash='solid', width=1, color='red'), name=f'{col} max 1д ({device})'))
-
-    def _render_matplotlib(self, x_parameter, device):
-        for trace in self.master.chart_figure.data:
-            label = trace['name'] if trace['name'] else 'Unnamed'
-            if trace['type'] == 'scatter' and trace['mode'] == 'markers':
-                plt.scatter(
-                    trace['x'],
-                    trace['y'],
-                    label=label,
-                    s=64,
-                    alpha=0.7,
-                    color=trace['marker']['color'] if 'marker' in trace and 'color' in trace['marker'] else None
-                )
-            elif trace['type'] == 'scatter' and trace['mode'] == 'lines':
-                if '1ч' in label or '3ч' in label or '1д' in label:
-                    plt.step(
-                        trace['x'],
-                        trace['y'],
-                        label=label,
-                        color=trace['line']['color'] if 'line' in trace and 'color' in trace['line'] else None,
-                        where='post'
-                    )
-                else:
-                    plt.plot(
-                        trace['x'],
-                        trace['y'],
-                        label=label,
-                        color=trace['line']['color'] if 'line' in trace and 'color' in trace['line'] else None
-                    )
-            elif trace['type'] == 'bar':
-                plt.bar(
-                    trace['x'],
-                    trace['y'],
-                    label=label,
-                    color=trace['marker']['color'] if 'marker' in trace and 'color' in trace['marker'] else None
-                )
-        plt.xlabel(x_parameter if x_parameter != 'Date' else 'Дата')
-        plt.ylabel('Значение')
-        plt.title(f'График\nПрибор: {device}')
-        plt.grid(True)
-        if x_parameter == 'Date':
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-            plt.gca().xaxis.set_major_locator(mdates.AutoDateLocator())
-            plt.xticks(rotation=45)
-        if plt.gca().get_legend_handles_labels()[0]:
-            plt.legend()
+    def _attach_canvas(self):
         self.master.chart_canvas = FigureCanvasTkAgg(self.master.matplotlib_figure, master=self.master.chart_display)
         self.master.chart_canvas.draw()
         self.master.chart_canvas.get_tk_widget().grid(row=0, column=0, sticky='nsew')
+        self.chart_toolbar = NavigationToolbar2Tk(self.master.chart_canvas, self.master.chart_display,
+                                                  pack_toolbar=False)
+        self.chart_toolbar.update()
+        self.chart_toolbar.grid(row=1, column=0, sticky='ew')
         self.master.chart_display.grid_rowconfigure(0, weight=1)
         self.master.chart_display.grid_columnconfigure(0, weight=1)
 
     def render_chart(self):
+        request = self._collect_render_request()
+        if request is None:
+            return
+        self._submit_render(request)
+
+    def _submit_render(self, request):
+        self.render_generation += 1
+        request.generation = self.render_generation
+        if self.render_thread is not None:
+            # Построение уже идёт: сохраняется только последний запрос, промежуточные отбрасываются
+            self.pending_render = request
+            return
+        self._start_render(request)
+
+    def _collect_render_request(self):
+        """Снимает параметры графика с виджетов; проверки с сообщениями выполняются здесь, в главном потоке."""
         # Получение выбранного устройства и параметров
         device, x_parameter, y_parameters = self._get_selected_device_and_parameters()
         if not device:
-            return
-
-        # Подготовка данных
-        data = self.master.device_data[device].copy()
-        chart_type = self.master.chart_style.get()
+            return None
 
-        # Фильтрация данных по времени
+        # Границы фильтра по времени, сама фильтрация выполняется в фоновом потоке
+        date_range = None
         if self.master.filter_by_date.get():
             start_datetime = self._parse_datetime(self.master.gui.start_datetime_selector,
-                                                  self.master.gui.start_hour_entry, self.master.gui.start_minute_entry)
+                                                  self.master.gui.start_hour_entry, self.master.gui.start_minute_entry,
+                                                  self.master.min_datetime)
             end_datetime = self._parse_datetime(self.master.gui.end_datetime_selector,
-                                                self.master.gui.end_hour_entry, self.master.gui.end_minute_entry)
-            filtered_data = self._filter_data_by_date(data, start_datetime, end_datetime)
-            if filtered_data is None:
-                return
-            data = filtered_data
-            data = data.loc[data.index.intersection(data.index)]  # Синхронизация индексов
+                                                self.master.gui.end_hour_entry, self.master.gui.end_minute_entry,
+                                                self.master.min_datetime)
+            date_range = self._date_range(start_datetime, end_datetime)
+            if date_range is None:
+                return None
 
         # Проверка параметров Y в обычном режиме
-        if not self.master.effective_temp_mode.get() and not y_parameters:
+        effective_temp = self.master.effective_temp_mode.get()
+        if not effective_temp and not y_parameters:
             messagebox.showwarning('Нет полей', 'Выберите поля для оси Y.')
-            return
+            return None
 
-        # Проверка данных для эффективной температуры
-        if self.master.effective_temp_mode.get():
-            effective_temp, sensation = self._calculate_effective_temperature(
-                data, self.master.gui.temp_selector.get(), self.master.gui.humidity_selector.get())
-            if effective_temp is None:
-                return
-            valid_data = effective_temp.dropna()
-            valid_sensation = sensation[effective_temp.notna()]
-            if valid_data.empty:
-                messagebox.showerror('Ошибка', 'Нет валидных данных для построения графика теплоощущения.')
-                return
-
-        # Создание окна графика только после всех проверок
-        self._create_chart_window("График")
-
-        # Режим эффективной температуры
-        if self.master.effective_temp_mode.get():
-            self._add_effective_temp_traces(chart_type, valid_data, valid_sensation, device)
-        else:
-            self._add_regular_traces(chart_type, data, data, x_parameter, y_parameters, device)
-            self.master.chart_figure.update_layout(
-                yaxis_title='Значение',
-                title=dict(text=f'График данных\nПрибор: {device}', font=dict(size=16)),
-                template='plotly_white', margin=dict(t=100), hovermode='x unified', plot_bgcolor='white',
-                paper_bgcolor='white',
-                xaxis_rangeslider_visible=True,
-                xaxis=dict(title=x_parameter if x_parameter != 'Date' else 'Дата', showline=True, linecolor='black',
-                           linewidth=1, mirror=True,
-                           showgrid=True, gridcolor='lightgrey', gridwidth=1, griddash='dot'),
-                yaxis=dict(showline=True, linecolor='black', linewidth=1, mirror=True, showgrid=True,
-                           gridcolor='lightgrey', gridwidth=1, griddash='dot'))
-
-        # Отрисовка графика в matplotlib
-        if self.master.chart_figure.data:
-            self._render_matplotlib(x_parameter, device)
+        temp_column = self.master.gui.temp_selector.get()
+        humidity_column = self.master.gui.humidity_selector.get()
+        if effective_temp and (not temp_column or not humidity_column):
+            messagebox.showwarning('Ошибка', 'Выберите температуру и влажность.')
+            return None
 
+        averages = {name: getattr(self.master, name).get()
+                    for name in ('avg_one_hour', 'avg_three_hours', 'avg_one_day', 'min_max_daily')}
+        data = self.master.device_data[device]
+        pyramid = self.pyramids.get(device)
+        # Сравниваемые устройства без выбранных параметров Y на графике ничего не добавят
+        overlay = {name: self.master.device_data[name] for name in self._get_compare_devices()
+                   if name != device and name in self.master.device_data and not effective_temp}
+        overlay = {name: frame for name, frame in overlay.items() if frame.columns.isin(y_parameters).any()}
+        return ChartRequest(device, data, x_parameter, y_parameters,
+                            self.master.chart_style.get(), date_range=date_range, effective_temp=effective_temp,
+                            temp_column=temp_column, humidity_column=humidity_column, averages=averages,
+                            sensation_colors=self.master.sensation_colors,
+                            pyramid=pyramid if pyramid is not None and pyramid.matches(data) else None,
+                            cache=self.series_cache, overlay=overlay, comfort_index=self.master.comfort_index.get(),
+                            anomalies=self.master.anomalies.get(), anomaly_tracker=self.anomaly_tracker)
+
+    def _start_render(self, request):
+        self.render_thread = threading.Thread(target=self._render_worker, args=(request,), daemon=True)
+        self.render_thread.start()
+
+    def _render_worker(self, request):
+        # Фильтрация, осреднения, прореживание и трассы строятся вне главного потока Tk
+        pyramids = self.pyramids
+        built = {}
+        try:
+            if (request.pyramid is None and not request.effective_temp and any(request.averages.values()) and
+                    len(request.data)):
+                # Фоновая пирамида ещё не готова: строится здесь, а сохраняется для следующих графиков в потоке Tk
+                request.pyramid = built[request.device] = AggregatePyramid(request.data)
+            chart_figure = build_chart_figure(request)
+            error = None
+        except Exception as e:
+            chart_figure = None
+            error = str(e)
+        self.master.after(0, lambda: self._finish_render(request, chart_figure, error, pyramids, built))
+
+    def _finish_render(self, request, chart_figure, error, pyramids=None, built=None):
+        self.render_thread = None
+        if built:
+            self._store_pyramids(pyramids, built)
+        pending, self.pending_render = self.pending_render, None
+        if pending is not None:
+            # Пока шло построение, параметры успели измениться - результат устарел
+            self._start_render(pending)
+            return
+        if request.generation != self.render_generation:
+            return
+        if error:
+            messagebox.showerror('Ошибка', error)
+            return
+        self.last_request = request
+        # Подкачка данных для увеличенного участка не трогает границы осей, выбранные пользователем
+        self._show_chart(chart_figure, request.x_parameter, request.device_label,
+                         autoscale=request.view_range is None)
+        cache = self.series_cache
+        self.master.chart_display.title(f'График (кэш: {cache.hits} попаданий, {cache.misses} промахов, '
+                                        f'{cache.nbytes >> 20} МБ)')
+
+    def _show_chart(self, chart_figure, x_parameter, device, autoscale=True):
+        if self.chart_artists is None or not self.master.chart_display:
+            self._create_chart_window("График")
+            self.master.chart_figure = chart_figure
+            self.chart_artists = FigureArtists(self.master.matplotlib_figure, self._on_view_change)
+            self.chart_artists.update(chart_figure, x_parameter, device)
+            self._attach_canvas()
+            return
+        # Окно уже открыто: меняются только затронутые трассы, холст перерисовывается при простое Tk
+        self.master.chart_figure = chart_figure
+        if self.chart_artists.update(chart_figure, x_parameter, device, autoscale):
+            self.master.chart_canvas.draw_idle()
+        if autoscale:
+            # Новое построение становится исходным видом для кнопки «Домой»
+            if self.chart_toolbar is not None:
+                self.chart_toolbar.update()
+            self.master.chart_display.lift()
+
+    def open_interactive(self):
+        """Строит текущий график без прореживания в автономный HTML с WebGL и открывает его в браузере."""
+        request = self._collect_render_request()
+        if request is None:
+            return
+        request.max_points = None
+        threading.Thread(target=self._interactive_worker, args=(request,), daemon=True).start()
+
+    def _interactive_worker(self, request):
+        try:
+            chart_figure = build_chart_figure(request)
+            with tempfile.NamedTemporaryFile('w', suffix='.html', prefix='chart_', delete=False,
+                                             encoding='utf-8') as file:
+                # plotly.js встраивается в файл, чтобы график открывался без сети и сервера
+                to_plotly(chart_figure, webgl=True).write_html(file, include_plotlyjs=True)
+            url = pathlib.Path(file.name).resolve().as_uri()
+            self.master.after(0, lambda: webbrowser.open(url))
+        except Exception as e:
+            error = str(e)
+            self.master.after(0, lambda: messagebox.showerror('Ошибка', error))
+
+    def _on_view_change(self):
+        # При прокрутке колесом или перетаскивании границы меняются много раз подряд - берётся последнее состояние
+        if self.view_job is not None:
+            self.master.after_cancel(self.view_job)
+        self.view_job = self.master.after(VIEW_REQUERY_MS, self._request_view)
+
+    def _request_view(self):
+        """Перестраивает видимый участок по данным устройства с разрешением под ширину окна."""
+        self.view_job = None
+        request = self.last_request
+        if request is None or self.chart_artists is None or request.x_parameter != 'Date':
+            return
+        view_range = self.chart_artists.view_range()
+        if view_range == request.view_range or request.device not in self.master.device_data:
+            return
+        self._submit_render(request.with_view(self.master.device_data[request.device], view_range))
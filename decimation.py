@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Окно графика 800 px; 2-4 точки на пиксель неотличимы от полного ряда
+CHART_WIDTH_PX = 800
+POINTS_PER_PIXEL = 4
+MAX_POINTS = CHART_WIDTH_PX * POINTS_PER_PIXEL
+
+
+def _axis_values(x):
+    """Значения оси X как float64 для деления на корзины или None, если ось не числовая или не упорядочена."""
+    index = pd.Index(x)
+    if isinstance(index, pd.DatetimeIndex):
+        if index.hasnans:
+            return None
+        values = index.asi8.astype(np.float64)
+    elif pd.api.types.is_numeric_dtype(index.dtype) and not pd.api.types.is_bool_dtype(index.dtype):
+        values = index.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        return None
+    if len(values) > 1 and not (values[1:] >= values[:-1]).all():
+        return None
+    return values
+
+
+def _bucket_ids(x, count, buckets):
+    """Номер корзины каждой точки: равные отрезки по оси X, а без неё - равные по числу точек."""
+    if x is not None and x[-1] > x[0]:
+        ids = ((x - x[0]) * (buckets / (x[-1] - x[0]))).astype(np.int64)
+        return np.minimum(ids, buckets - 1, out=ids)
+    return np.arange(count, dtype=np.int64) * buckets // count
+
+
+def _first_hits(hits, segment):
+    # Первая позиция совпадения в каждой корзине
+    _, first = np.unique(segment[hits], return_index=True)
+    return hits[first]
+
+
+def minmax_indices(x, y, buckets):
+    """
+    Позиции минимума и максимума каждой корзины плюс крайние точки ряда.
+    Выбросы сохраняются; корзина из одних NaN даёт одну NaN-точку, чтобы разрыв линии не пропал.
+    """
+    count = len(y)
+    ids = _bucket_ids(x, count, buckets)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, count]))
+    missing = np.isnan(y)
+    low = np.where(missing, np.inf, y)
+    high = np.where(missing, -np.inf, y)
+    min_positions = _first_hits(np.flatnonzero(low == np.minimum.reduceat(low, starts)[segment]), segment)
+    max_positions = _first_hits(np.flatnonzero(high == np.maximum.reduceat(high, starts)[segment]), segment)
+    return np.unique(np.concatenate((min_positions, max_positions, [0, count - 1])))
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: threshold точек, лучше всего передающих форму ряда; NaN пропускаются."""
+    valid = np.flatnonzero(~np.isnan(y))
+    count = len(valid)
+    if count <= threshold or threshold < 3:
+        return valid
+    y = y[valid]
+    x = x[valid] if x is not None else valid.astype(np.float64)
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    anchor = 0
+    for num in range(threshold - 2):
+        start, end = edges[num], edges[num + 1]
+        next_end = edges[num + 2] if num + 2 < len(edges) else count
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[start:end] - y[anchor]) -
+                      (x[anchor] - x[start:end]) * (avg_y - y[anchor]))
+        anchor = start + int(np.argmax(area))
+        selected[num + 1] = anchor
+    return valid[selected]
+
+
+def decimate_indices(x, y, max_points=MAX_POINTS, method='minmax'):
+    """
+    Позиции точек, которые достаточно отрисовать, или None, если ряд и так не длиннее max_points.
+    method='minmax' - min/max по корзинам (линии, столбцы), 'lttb' - для точечных графиков.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if not max_points or len(y) <= max_points:
+        return None
+    x = _axis_values(x)
+    if method == 'lttb':
+        return lttb_indices(x, y, max_points)
+    # Каждая корзина даёт до двух точек
+    return minmax_indices(x, y, max(max_points // 2, 1))
+
+
+def take(values, positions):
+    return values.iloc[positions] if isinstance(values, pd.Series) else values[positions]
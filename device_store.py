@@ -0,0 +1,639 @@
+import json
+import operator
+import os
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from json_stream import JsonRecordStream, open_export
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+BLOCK_ROWS = 4096
+MAX_DECIMALS = 6
+
+
+def _parse_dates(dates):
+    try:
+        return pd.to_datetime(dates, format=DATE_FORMAT).to_numpy()
+    except (TypeError, ValueError):
+        # Выгрузки других сборщиков могут писать дату в ином формате
+        return pd.to_datetime(dates, format='mixed').to_numpy()
+
+
+def sorted_unique(frame):
+    """
+    Упорядочивает записи по времени и из записей с одинаковой датой оставляет последнюю.
+    Так фильтр по датам может брать срез через searchsorted, а не строить маски по всему ряду.
+    """
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index(kind='stable')
+    dates = frame.index.asi8
+    repeated = dates[1:] == dates[:-1]
+    if repeated.any():
+        frame = frame.iloc[np.flatnonzero(np.append(~repeated, True))]
+    return frame
+
+
+def _to_float_column(values):
+    """Аналог pd.to_numeric(errors='coerce') для целого столбца."""
+    try:
+        converted = np.array(values, dtype=np.float64)
+        if converted.ndim == 1:
+            return converted
+    except (TypeError, ValueError):
+        pass
+    try:
+        # Строковые поля (IP, MAC, версия) почти не меняются - приводим только уникальные значения
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    except TypeError:
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    converted = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    # Код -1 (пропуск) указывает на добавленный в конец NaN
+    return np.append(converted, np.nan)[codes]
+
+
+class DeviceColumnBuffer:
+    """
+    Столбцы одного устройства, накапливаемые по мере чтения записей.
+    Записи копятся блоками сырых значений с одинаковым набором ключей, затем дата и каждый столбец блока
+    приводятся к datetime64/float64 одной векторной операцией.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.size = 0
+        self._date_blocks = []
+        self._keys = None
+        self._dates = []
+        self._rows = []
+
+    def append(self, date, data):
+        keys = tuple(data)
+        if keys != self._keys or len(self._rows) >= BLOCK_ROWS:
+            self._flush()
+            self._keys = keys
+        self._dates.append(date)
+        self._rows.append(tuple(data.values()))
+
+    def _flush(self):
+        if not self._rows:
+            return
+        self._date_blocks.append(_parse_dates(self._dates))
+        for name, values in zip(self._keys, zip(*self._rows)):
+            # Блок хранится вместе с номером первой строки, пропуски между блоками заполняются NaN
+            self.columns.setdefault(name, []).append((self.size, _to_float_column(values)))
+        self.size += len(self._rows)
+        self._dates = []
+        self._rows = []
+
+    def to_frame(self):
+        """Собирает DataFrame и освобождает буферы по мере копирования столбцов."""
+        self._flush()
+        names = list(self.columns)
+        values = np.full((self.size, len(names)), np.nan)
+        for position, name in enumerate(names):
+            for start, block in self.columns.pop(name):
+                values[start:start + len(block), position] = block
+        dates = np.concatenate(self._date_blocks) if self._date_blocks else []
+        self._date_blocks = []
+        index = pd.DatetimeIndex(dates, name='Date')
+        return sorted_unique(pd.DataFrame(values, index=index, columns=names, copy=False).dropna(how='all'))
+
+
+def _smallest_int(values):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def _compact_values(values):
+    """Подбирает самый узкий тип float, из которого значения восстанавливаются округлением до исходных."""
+    present = values[~np.isnan(values)]
+    decimals = next((num for num in range(MAX_DECIMALS + 1) if np.array_equal(np.round(present, num), present)),
+                    None)
+    if decimals is not None:
+        for dtype in (np.float16, np.float32):
+            with np.errstate(over='ignore'):
+                narrow = values.astype(dtype)
+            if np.array_equal(np.round(narrow.astype(np.float64), decimals), values, equal_nan=True):
+                return narrow, decimals
+    return values, None
+
+
+class CompactDeviceFrame:
+    """
+    Компактное представление данных устройства.
+    Пустые столбцы хранятся только по имени, постоянные - одним значением и битовой маской пропусков,
+    остальные - в float16/float32, если округление восстанавливает исходные значения. Метки времени
+    хранятся как разности соседних меток в минимальном целом типе, для равномерного шага - только шагом.
+    """
+
+    __slots__ = ('columns', 'length', 'index_dtype', 'index_start', 'index_unit', 'index_deltas')
+
+    def __init__(self, columns, length, index_dtype, index_start, index_unit, index_deltas):
+        self.columns = columns
+        self.length = length
+        self.index_dtype = index_dtype
+        self.index_start = index_start
+        self.index_unit = index_unit
+        self.index_deltas = index_deltas
+
+    @classmethod
+    def from_frame(cls, frame):
+        stamps = frame.index.asi8
+        deltas = np.diff(stamps)
+        unit = int(np.gcd.reduce(deltas)) if len(deltas) and deltas.any() else 1
+        if not len(deltas) or (deltas == deltas[0]).all():
+            # Равномерный шаг: разности не хранятся вовсе
+            index_deltas = int(deltas[0]) // unit if len(deltas) else 0
+        else:
+            index_deltas = _smallest_int(deltas // unit)
+        columns = []
+        for name in frame.columns:
+            values = frame[name].to_numpy(dtype=np.float64)
+            nulls = np.isnan(values)
+            if nulls.all():
+                columns.append((name, 'null', None, None))
+                continue
+            present = values[~nulls]
+            if (present == present[0]).all():
+                mask = np.packbits(nulls) if nulls.any() else None
+                columns.append((name, 'constant', float(present[0]), mask))
+                continue
+            narrow, decimals = _compact_values(values)
+            columns.append((name, 'values', narrow, decimals))
+        return cls(columns, len(frame), frame.index.dtype, int(stamps[0]) if len(stamps) else 0, unit, index_deltas)
+
+    @property
+    def column_names(self):
+        return [name for name, _, _, _ in self.columns]
+
+    @property
+    def nbytes(self):
+        total = self.index_deltas.nbytes if isinstance(self.index_deltas, np.ndarray) else 0
+        for _, kind, payload, extra in self.columns:
+            if kind == 'values':
+                total += payload.nbytes
+            elif kind == 'constant' and extra is not None:
+                total += extra.nbytes
+        return total
+
+    def _index(self):
+        if isinstance(self.index_deltas, np.ndarray):
+            offsets = np.zeros(self.length, dtype=np.int64)
+            np.cumsum(self.index_deltas, dtype=np.int64, out=offsets[1:])
+        else:
+            offsets = np.arange(self.length, dtype=np.int64) * self.index_deltas
+        stamps = self.index_start + offsets * self.index_unit
+        return pd.DatetimeIndex(stamps.view(self.index_dtype), name='Date')
+
+    def to_frame(self):
+        values = np.empty((self.length, len(self.columns)), dtype=np.float64)
+        for position, (_, kind, payload, extra) in enumerate(self.columns):
+            if kind == 'null':
+                values[:, position] = np.nan
+            elif kind == 'constant':
+                values[:, position] = payload
+                if extra is not None:
+                    values[np.unpackbits(extra, count=self.length).astype(bool), position] = np.nan
+            elif extra is not None:
+                values[:, position] = np.round(payload.astype(np.float64), extra)
+            else:
+                values[:, position] = payload
+        return pd.DataFrame(values, index=self._index(), columns=self.column_names, copy=False)
+
+
+def compact_device_frame(frame):
+    """Сжимает DataFrame устройства, если его индекс - метки времени без часового пояса."""
+    if isinstance(frame, CompactDeviceFrame) or not isinstance(frame.index, pd.DatetimeIndex) \
+            or frame.index.tz is not None:
+        return frame
+    return CompactDeviceFrame.from_frame(frame)
+
+
+def _read_spans(file_path, offsets, lengths, chunk_size=1 << 20):
+    """Читает и разбирает значения записей по байтовым смещениям, возрастающим вдоль файла."""
+    with open(file_path, 'rb') as file:
+        chunk = b''
+        chunk_start = 0
+        for offset, length in zip(offsets, lengths):
+            if offset < chunk_start or offset + length > chunk_start + len(chunk):
+                file.seek(offset)
+                chunk = file.read(max(chunk_size, length))
+                chunk_start = offset
+            yield json.loads(chunk[offset - chunk_start:offset - chunk_start + length])
+
+
+class LazyDeviceFrame:
+    """
+    Запись каталога устройства: число записей, интервал времени, столбцы с долей пропусков
+    и байтовые смещения записей в исходных файлах. DataFrame строится по смещениям только при обращении.
+    Уже разобранные части устройства (например, из кэша разбора) хранятся как есть и добавляются к нему тогда же.
+    """
+
+    __slots__ = ('name', 'count', 'first_date', 'last_date', 'parts', 'frames', '_schemas')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.first_date = None
+        self.last_date = None
+        # {путь: (смещения, длины)}
+        self.parts = {}
+        # DataFrame и CompactDeviceFrame других выгрузок
+        self.frames = []
+        # {(ключи, признаки None по ключам): число записей}
+        self._schemas = {}
+
+    def add(self, file_path, date, data, start, end):
+        part = self.parts.get(file_path)
+        if part is None:
+            part = self.parts[file_path] = (array('q'), array('q'))
+        part[0].append(start)
+        part[1].append(end - start)
+        self.count += 1
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+        # Хранятся только различающиеся схемы записей со счётчиками, а не схема каждой записи
+        schema = (tuple(data), tuple(map(operator.is_, data.values(), repeat(None))))
+        self._schemas[schema] = self._schemas.get(schema, 0) + 1
+
+    def merge(self, other):
+        for file_path, (offsets, lengths) in other.parts.items():
+            part = self.parts.setdefault(file_path, (array('q'), array('q')))
+            part[0].extend(offsets)
+            part[1].extend(lengths)
+        self.count += other.count
+        for date in (other.first_date, other.last_date):
+            if date is not None:
+                self.first_date = date if self.first_date is None else min(self.first_date, date)
+                self.last_date = date if self.last_date is None else max(self.last_date, date)
+        for schema, count in other._schemas.items():
+            self._schemas[schema] = self._schemas.get(schema, 0) + count
+        self.frames.extend(other.frames)
+        return self
+
+    def add_frame(self, part):
+        """Присоединяет разобранную часть (DataFrame или CompactDeviceFrame) без чтения каталога."""
+        self.frames.append(part)
+        frame = as_frame(part)
+        if frame.empty:
+            return self
+        self.count += len(frame)
+        for date in (str(frame.index[0]), str(frame.index[-1])):
+            self.first_date = date if self.first_date is None else min(self.first_date, date)
+            self.last_date = date if self.last_date is None else max(self.last_date, date)
+        # Заполненность столбцов части учитывается схемами из одного ключа
+        for column, filled in frame.notna().sum().items():
+            schema = ((column,), (False,))
+            self._schemas[schema] = self._schemas.get(schema, 0) + int(filled)
+        return self
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys(key for keys, _ in self._schemas for key in keys))
+
+    @property
+    def null_ratios(self):
+        present = dict.fromkeys(self.columns, 0)
+        for (keys, nulls), count in self._schemas.items():
+            for key, is_null in zip(keys, nulls):
+                if not is_null:
+                    present[key] += count
+        return {column: 1 - filled / self.count for column, filled in present.items()}
+
+    @property
+    def time_span(self):
+        if self.first_date is None:
+            return None, None
+        return pd.Timestamp(self.first_date), pd.Timestamp(self.last_date)
+
+    def to_frame(self):
+        buffer = DeviceColumnBuffer()
+        for file_path, (offsets, lengths) in self.parts.items():
+            for value in _read_spans(file_path, offsets, lengths):
+                buffer.append(value['Date'], value['data'])
+        if not self.frames:
+            return buffer.to_frame()
+        return sorted_unique(pd.concat([buffer.to_frame()] + [as_frame(part) for part in self.frames]))
+
+
+def as_frame(entry):
+    return entry.to_frame() if isinstance(entry, (CompactDeviceFrame, LazyDeviceFrame)) else entry
+
+
+class FrameBuffer:
+    """
+    DataFrame устройства поверх массивов с запасом строк: frame - представление первых строк без копирования.
+    Записи, дописанные после последней, копируются в запас, так что дозапись стоит порядка числа новых записей;
+    массивы пересоздаются с двойным запасом, только когда он исчерпан или появились новые столбцы.
+    """
+
+    __slots__ = ('values', 'dates', 'columns', 'frame')
+
+    def __init__(self, values, dates, columns, rows):
+        self.values = values
+        self.dates = dates
+        self.columns = columns
+        self.frame = pd.DataFrame(values[:rows], index=pd.DatetimeIndex(dates[:rows], name='Date', copy=False),
+                                  columns=columns, copy=False)
+
+    @classmethod
+    def from_frame(cls, frame):
+        rows = len(frame)
+        capacity = max(2 * rows, BLOCK_ROWS)
+        # Столбцы в Fortran-порядке непрерывны, pandas использует их без копирования
+        values = np.empty((capacity, len(frame.columns)), dtype=np.float64, order='F')
+        values[:rows] = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+        dates = np.empty(capacity, dtype=frame.index.dtype)
+        dates[:rows] = frame.index.to_numpy()
+        return cls(values, dates, list(frame.columns), rows)
+
+    def extended(self, tail):
+        """
+        Буфер с записями tail, дописанными после последней записи, или None, если tail начинается не позже неё.
+        Прежний буфер и его frame остаются верными: запас за их строками им не виден.
+        """
+        rows = len(self.frame)
+        if tail.empty or (rows and tail.index[0] <= self.frame.index[-1]):
+            return None
+        end = rows + len(tail)
+        if end > len(self.dates) or not tail.columns.isin(self.columns).all():
+            return FrameBuffer.from_frame(pd.concat([self.frame, tail]))
+        self.values[rows:end] = tail.reindex(columns=self.columns).to_numpy(dtype=np.float64, na_value=np.nan)
+        self.dates[rows:end] = tail.index.to_numpy()
+        return FrameBuffer(self.values, self.dates, self.columns, end)
+
+
+class DeviceStore(MutableMapping):
+    """
+    Словарь устройств для master.device_data.
+    Хранит DataFrame, CompactDeviceFrame или LazyDeviceFrame и всегда отдаёт DataFrame; развёрнутые компактные
+    устройства держатся в небольшом LRU-кэше, чтобы переключение между графиками не разворачивало данные заново.
+    Устройство из каталога читается из файла при первом обращении и дальше хранится как обычное
+    (в компактном виде при compact=True).
+    Дописанные записи не пересобирают устройство: развёрнутые DataFrame растут в FrameBuffer,
+    а к компактным записи копятся частями и сворачиваются заново, лишь когда их наберётся четверть устройства.
+    """
+
+    def __init__(self, devices=None, materialized_limit=2, compact=False):
+        self._devices = dict(devices or {})
+        self._materialized = OrderedDict()
+        self.materialized_limit = materialized_limit
+        self.compact = compact
+        # {устройство: FrameBuffer}, действителен, пока его frame - текущий DataFrame устройства
+        self._buffers = {}
+        # {устройство: [DataFrame]} записи, дописанные к компактному устройству после сворачивания
+        self._tails = {}
+
+    def __getitem__(self, name):
+        entry = self._devices[name]
+        if isinstance(entry, LazyDeviceFrame):
+            # Первое обращение к устройству из каталога: его записи читаются из файла по смещениям
+            frame = entry.to_frame()
+            entry = self._devices[name] = compact_device_frame(frame) if self.compact else frame
+            if isinstance(entry, CompactDeviceFrame):
+                self._remember(name, frame)
+            return frame
+        if not isinstance(entry, CompactDeviceFrame):
+            return entry
+        frame = self._materialized.get(name)
+        if frame is None:
+            frame = entry.to_frame()
+            if name in self._tails:
+                frame = sorted_unique(pd.concat([frame] + self._tails[name]))
+            self._remember(name, frame)
+        else:
+            self._materialized.move_to_end(name)
+        return frame
+
+    def _remember(self, name, frame):
+        self._materialized[name] = frame
+        while len(self._materialized) > self.materialized_limit:
+            evicted, _ = self._materialized.popitem(last=False)
+            self._buffers.pop(evicted, None)
+
+    def __setitem__(self, name, entry):
+        self._devices[name] = entry
+        self._materialized.pop(name, None)
+        self._buffers.pop(name, None)
+        self._tails.pop(name, None)
+
+    def __delitem__(self, name):
+        del self._devices[name]
+        self._materialized.pop(name, None)
+        self._buffers.pop(name, None)
+        self._tails.pop(name, None)
+
+    def __contains__(self, name):
+        # Без этого MutableMapping проверяет имя через __getitem__ и читает устройство каталога из файла
+        return name in self._devices
+
+    def __iter__(self):
+        return iter(self._devices)
+
+    def __len__(self):
+        return len(self._devices)
+
+    def entry(self, name):
+        """Хранимое представление устройства без разворачивания."""
+        return self._devices[name]
+
+    def extend_frames(self, tails):
+        """
+        Готовит дозапись tails ({устройство: DataFrame новых записей}) к развёрнутым устройствам, не меняя хранилище:
+        {устройство: (текущий DataFrame, FrameBuffer с дописанными записями)}. Предназначен для фонового потока -
+        копирование в запас и редкое пересоздание массивов не задерживают главный; применяет результат append_records.
+        """
+        extended = {}
+        for name, tail in tails.items():
+            frame = self.loaded_frame(name)
+            if frame is None:
+                continue
+            buffer = self._buffers.get(name)
+            if buffer is None or buffer.frame is not frame:
+                buffer = FrameBuffer.from_frame(frame)
+            grown = buffer.extended(tail)
+            if grown is not None:
+                extended[name] = (frame, grown)
+        return extended
+
+    def append_records(self, records, tails, extended=None):
+        """
+        Дописывает новые записи выгрузок и возвращает множество изменённых устройств.
+        records - {путь: [(устройство, дата, данные, начало, конец)]} для устройств каталога,
+        tails - те же записи {устройство: DataFrame} для остальных, extended - результат extend_frames.
+        """
+        extended = extended or {}
+        changed = set()
+        for file_path, file_records in records.items():
+            source = os.path.abspath(file_path)
+            for name, date, data, start, end in file_records:
+                entry = self._devices.get(name)
+                if isinstance(entry, LazyDeviceFrame):
+                    entry.add(source, str(date), data, start, end)
+                    changed.add(name)
+        for name, tail in tails.items():
+            entry = self._devices.get(name)
+            if tail.empty or isinstance(entry, LazyDeviceFrame):
+                continue
+            changed.add(name)
+            frame, grown = extended.get(name, (None, None))
+            if entry is None:
+                self[name] = compact_device_frame(tail) if self.compact else tail
+            elif isinstance(entry, CompactDeviceFrame):
+                self._append_compact(name, entry, tail, frame, grown)
+            elif grown is not None and entry is frame:
+                self._devices[name] = grown.frame
+                self._buffers[name] = grown
+            else:
+                # Записи раньше последней или устройство изменилось во время чтения - полное слияние
+                self[name] = sorted_unique(pd.concat([entry, tail]))
+        return changed
+
+    def _append_compact(self, name, entry, tail, frame, grown):
+        tails = self._tails.setdefault(name, [])
+        tails.append(tail)
+        if grown is not None and self._materialized.get(name) is frame:
+            self._materialized[name] = grown.frame
+            self._buffers[name] = grown
+        else:
+            self._materialized.pop(name, None)
+            self._buffers.pop(name, None)
+        # Повторное сворачивание стоит порядка длины устройства, поэтому делается при росте на четверть
+        if 4 * sum(len(part) for part in tails) >= max(entry.length, BLOCK_ROWS):
+            frame = self[name]
+            self._devices[name] = compact_device_frame(frame)
+            del self._tails[name]
+
+    def is_loaded(self, name):
+        return not isinstance(self._devices[name], LazyDeviceFrame)
+
+    def loaded_frame(self, name):
+        """DataFrame устройства, если он уже есть в памяти, иначе None; в отличие от [] ничего не разворачивает."""
+        entry = self._devices.get(name)
+        return entry if isinstance(entry, pd.DataFrame) else self._materialized.get(name)
+
+    @property
+    def nbytes(self):
+        return sum(int(entry.memory_usage().sum()) if isinstance(entry, pd.DataFrame) else
+                   entry.nbytes if isinstance(entry, CompactDeviceFrame) else 0
+                   for entry in self._devices.values()) + \
+            sum(int(part.memory_usage().sum()) for parts in self._tails.values() for part in parts)
+
+
+def _device_name(value):
+    """Имя устройства записи или None, если запись не похожа на показания устройства."""
+    if not isinstance(value, dict) or not isinstance(value.get('data'), dict):
+        return None
+    if 'uName' not in value or 'serial' not in value or 'Date' not in value:
+        return None
+    return f"{value['uName']} ({value['serial']})"
+
+
+def read_device_file(file_path, progress=None, compact=False, lazy=False, byte_range=None, with_offset=False):
+    """
+    Читает одну выгрузку и возвращает словарь {устройство: DataFrame}, а при lazy=True - каталог
+    {устройство: LazyDeviceFrame} без построения столбцов. byte_range=(начало, конец) задаёт часть
+    NDJSON-файла, границы которой совпадают с началом строк.
+    При with_offset=True возвращается пара (данные, смещение закрывающей скобки на момент разбора),
+    для сжатого файла смещение - None.
+    Функция верхнего уровня, чтобы её можно было запускать в отдельном процессе.
+    """
+    temp_device_data = {}
+    source = os.path.abspath(file_path)
+    with open_export(file_path) as (file, raw):
+        # По смещениям в распакованном потоке нельзя читать сжатый файл, поэтому он всегда разбирается целиком
+        lazy = lazy and file is raw
+        track_offsets = (lazy or with_offset) and file is raw
+        if byte_range:
+            file.seek(byte_range[0])
+            stream = JsonRecordStream(file, track_offsets=track_offsets, lines=True,
+                                      length=byte_range[1] - byte_range[0])
+        else:
+            stream = JsonRecordStream(file, track_offsets=track_offsets)
+        bytes_read = 0
+        for _, value in stream:
+            if progress and stream.bytes_read != bytes_read:
+                bytes_read = stream.bytes_read
+                progress.check_cancelled()
+                progress.update(raw.tell())
+            device_name = _device_name(value)
+            if device_name is None:
+                continue
+            if lazy:
+                if device_name not in temp_device_data:
+                    temp_device_data[device_name] = LazyDeviceFrame(device_name)
+                temp_device_data[device_name].add(source, str(value['Date']), value['data'], stream.record_start,
+                                                  stream.record_end)
+                continue
+            if device_name not in temp_device_data:
+                temp_device_data[device_name] = DeviceColumnBuffer()
+            temp_device_data[device_name].append(value['Date'], value['data'])
+        if progress:
+            progress.update(raw.tell(), force=True)
+    if lazy:
+        return (temp_device_data, stream.closing_offset) if with_offset else temp_device_data
+    # Буферы освобождаются по одному, чтобы не держать в памяти две копии данных
+    device_data = {}
+    for name in list(temp_device_data):
+        if progress:
+            progress.check_cancelled()
+        frame = temp_device_data.pop(name).to_frame()
+        device_data[name] = compact_device_frame(frame) if compact else frame
+    return (device_data, stream.closing_offset) if with_offset else device_data
+
+
+def merge_device_frames(frame_sets, compact=False):
+    """
+    Объединяет данные нескольких выгрузок по устройствам с сортировкой по времени.
+    compact - режим хранилища: объединённые части сворачиваются в CompactDeviceFrame независимо от вида первой.
+    Если хотя бы одна часть устройства - каталог, устройство остаётся каталогом и читается при обращении.
+    """
+    merged = {}
+    for frames in frame_sets:
+        for name, frame in frames.items():
+            merged.setdefault(name, []).append(frame)
+    device_data = {}
+    for name, frames in merged.items():
+        catalog = next((part for part in frames if isinstance(part, LazyDeviceFrame)), None)
+        if catalog is not None:
+            for part in frames:
+                if part is catalog:
+                    continue
+                if isinstance(part, LazyDeviceFrame):
+                    catalog.merge(part)
+                else:
+                    catalog.add_frame(part)
+            device_data[name] = catalog
+        elif len(frames) > 1:
+            frame = sorted_unique(pd.concat([as_frame(part) for part in frames]))
+            device_data[name] = compact_device_frame(frame) if compact else frame
+        else:
+            device_data[name] = frames[0]
+    return device_data
+
+
+def read_appended_records(file_path, offset):
+    """
+    Разбирает записи, дописанные в выгрузку после закрывающей скобки со смещением offset.
+    Возвращает список (устройство, дата, данные, начало, конец) и новое смещение закрывающей скобки.
+    Недописанная запись в конце файла приводит к ValueError - её стоит прочитать при следующей проверке.
+    """
+    records = []
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        stream = JsonRecordStream(file, track_offsets=True, resume=True)
+        for _, value in stream:
+            device_name = _device_name(value)
+            if device_name is not None:
+                records.append((device_name, value['Date'], value['data'], stream.record_start, stream.record_end))
+    return records, stream.closing_offset
@@ -1,12 +1,19 @@
 import tkinter as tk
 import ttkbootstrap as ttk
 
+from thermal_comfort import COMFORT_INDICES
+
 
 class ChartAppGUI:
     def __init__(self, master):
         """Flags"""
         self.master = master
         self.device_selector = None
+        self.compare_list = None
+        self.x_filter_entry = None
+        self.y_filter_entry = None
+        self.start_calendar_button = None
+        self.end_calendar_button = None
         self.start_datetime_selector = None
         self.end_datetime_selector = None
         self.start_hour_entry = None
@@ -17,8 +24,12 @@ class ChartAppGUI:
         self.y_axis_list = None
         self.temp_selector = None
         self.humidity_selector = None
+        self.comfort_index_selector = None
         self.load_json_button = None
+        self.load_folder_button = None
         self.loading_bar = None
+        self.loading_label = None
+        self.cancel_load_button = None
 
         self._initialize_widgets()
         self._configure_time_validation()
@@ -48,16 +59,35 @@ class ChartAppGUI:
         """data load frame"""
         data_load_frame = ttk.LabelFrame(left_frame, text='Загрузка данных', padding=10, bootstyle='primary')
         data_load_frame.grid(row=0, column=0, sticky='ew', pady=5)
-        data_load_frame.columnconfigure(1, weight=1)
+        data_load_frame.columnconfigure(2, weight=1)
 
         """load_json_button and loading_bar"""
         self.load_json_button = ttk.Button(data_load_frame, text='Загрузить JSON',
                                            command=self.master.data_processor._begin_json_load, bootstyle='primary')
         self.load_json_button.grid(row=0, column=0, padx=5, sticky='w')
+        self.load_folder_button = ttk.Button(data_load_frame, text='Папка',
+                                             command=self.master.data_processor._begin_json_folder_load,
+                                             bootstyle='primary-outline')
+        self.load_folder_button.grid(row=0, column=1, padx=5, sticky='w')
         self.loading_bar = ttk.Progressbar(data_load_frame, orient='horizontal', mode='determinate', length=200,
                                            bootstyle='primary')
-        self.loading_bar.grid(row=0, column=1, padx=5, sticky='ew')
+        self.loading_bar.grid(row=0, column=2, padx=5, sticky='ew')
         self.loading_bar.grid_remove()
+        self.cancel_load_button = ttk.Button(data_load_frame, text='Отмена',
+                                             command=self.master.data_processor._cancel_json_load,
+                                             bootstyle='danger-outline')
+        self.cancel_load_button.grid(row=0, column=3, padx=5, sticky='e')
+        self.cancel_load_button.grid_remove()
+        ttk.Checkbutton(data_load_frame, text='Компактное хранение', variable=self.master.compact_storage,
+                        bootstyle='primary').grid(row=1, column=0, sticky='w', padx=5, pady=(5, 0))
+        ttk.Checkbutton(data_load_frame, text='По требованию', variable=self.master.lazy_loading,
+                        bootstyle='primary').grid(row=1, column=1, sticky='w', padx=5, pady=(5, 0))
+        ttk.Checkbutton(data_load_frame, text='Следить за файлом', variable=self.master.follow_file,
+                        command=self.master.data_processor._toggle_follow_file,
+                        bootstyle='primary').grid(row=1, column=2, sticky='w', padx=5, pady=(5, 0))
+        self.loading_label = ttk.Label(data_load_frame, text='', font=('Arial', 9))
+        self.loading_label.grid(row=1, column=3, padx=5, sticky='e')
+        self.loading_label.grid_remove()
 
         """device_select_frame"""
         device_select_frame = ttk.LabelFrame(left_frame, text='Выбор устройств', padding=10, bootstyle='primary')
@@ -67,8 +97,17 @@ class ChartAppGUI:
         self.device_selector = ttk.Combobox(device_select_frame, state='readonly', font=('Arial', 10),
                                             bootstyle='primary')
         self.device_selector.grid(row=0, column=1, padx=5, sticky='ew')
-        self.device_selector.bind('<<ComboboxSelected>>', self.master.data_processor._handle_x_device_selection)
-        self.device_selector.bind('<<ComboboxSelected>>', self.master.data_processor._handle_y_device_selection)
+        self.device_selector.bind('<<ComboboxSelected>>', self.master.data_processor._handle_device_selection)
+        ttk.Label(device_select_frame, text='Сравнить с :').grid(row=1, column=0, padx=5, pady=(5, 0), sticky='ne')
+        compare_frame = ttk.Frame(device_select_frame)
+        compare_frame.grid(row=1, column=1, padx=5, pady=(5, 0), sticky='ew')
+        self.compare_list = tk.Listbox(compare_frame, selectmode='extended', height=3, exportselection=False,
+                                       font=('Arial', 10))
+        self.compare_list.pack(side='left', fill='x', expand=True)
+        compare_scrollbar = ttk.Scrollbar(compare_frame, orient='vertical', command=self.compare_list.yview,
+                                          bootstyle='primary')
+        compare_scrollbar.pack(side='right', fill='y')
+        self.compare_list.config(yscrollcommand=compare_scrollbar.set)
 
         """axis_params_frame"""
         axis_params_frame = ttk.LabelFrame(left_frame, text='Параметры осей', padding=10, bootstyle='primary')
@@ -77,6 +116,9 @@ class ChartAppGUI:
         axis_params_frame.columnconfigure(1, weight=1)
         x_axis_frame = ttk.LabelFrame(axis_params_frame, text='Ось X', padding=5, bootstyle='primary')
         x_axis_frame.grid(row=0, column=0, padx=5, sticky='ew')
+        self.x_filter_entry = ttk.Entry(x_axis_frame, font=('Arial', 10))
+        self.x_filter_entry.pack(side='top', fill='x', pady=(0, 5))
+        self.x_filter_entry.bind('<KeyRelease>', self.master.data_processor._filter_x_parameters)
         self.x_axis_list = tk.Listbox(x_axis_frame, selectmode='single', width=25, height=6, exportselection=False,
                                       font=('Arial', 10))
         self.x_axis_list.pack(side='left', fill='y')
@@ -86,6 +128,9 @@ class ChartAppGUI:
         self.x_axis_list.config(yscrollcommand=x_scrollbar.set)
         y_axis_frame = ttk.LabelFrame(axis_params_frame, text='Ось Y', padding=5, bootstyle='primary')
         y_axis_frame.grid(row=0, column=1, padx=5, sticky='ew')
+        self.y_filter_entry = ttk.Entry(y_axis_frame, font=('Arial', 10))
+        self.y_filter_entry.pack(side='top', fill='x', pady=(0, 5))
+        self.y_filter_entry.bind('<KeyRelease>', self.master.data_processor._filter_y_parameters)
         self.y_axis_list = tk.Listbox(y_axis_frame, selectmode='extended', width=25, height=6, exportselection=False,
                                       font=('Arial', 10))
         self.y_axis_list.pack(side='left', fill='y')
@@ -102,8 +147,10 @@ class ChartAppGUI:
         settings_frame.columnconfigure(2, weight=1)
         settings_frame.columnconfigure(3, weight=1)
         ttk.Checkbutton(settings_frame, text='Фильтр по дате', variable=self.master.filter_by_date,
-                        command=self._toggle_date_filter, bootstyle='primary').grid(row=0, column=0, columnspan=4,
+                        command=self._toggle_date_filter, bootstyle='primary').grid(row=0, column=0, columnspan=2,
                                                                                     sticky='w', padx=5, pady=5)
+        ttk.Checkbutton(settings_frame, text='Аномалии (z-оценка)', variable=self.master.anomalies,
+                        bootstyle='primary').grid(row=0, column=2, columnspan=2, sticky='w', padx=5, pady=5)
         ttk.Label(settings_frame, text='С:').grid(row=1, column=0, sticky='e', padx=5, pady=2)
         self.start_datetime_selector = ttk.Combobox(settings_frame, state='disabled', font=('Arial', 10),
                                                     bootstyle='primary')
@@ -112,6 +159,10 @@ class ChartAppGUI:
         self.start_hour_entry.grid(row=1, column=2, padx=2, pady=2, sticky='e')
         self.start_minute_entry = ttk.Entry(settings_frame, state='disabled', width=4, font=('Arial', 10))
         self.start_minute_entry.grid(row=1, column=3, padx=2, pady=2, sticky='w')
+        self.start_calendar_button = ttk.Button(
+            settings_frame, text='▦', width=2, state='disabled', bootstyle='primary-outline',
+            command=lambda: self.master.data_processor._pick_date(self.start_datetime_selector))
+        self.start_calendar_button.grid(row=1, column=4, padx=2, pady=2)
         ttk.Label(settings_frame, text='По:').grid(row=2, column=0, sticky='e', padx=5, pady=2)
         self.end_datetime_selector = ttk.Combobox(settings_frame, state='disabled', font=('Arial', 10),
                                                   bootstyle='primary')
@@ -120,8 +171,17 @@ class ChartAppGUI:
         self.end_hour_entry.grid(row=2, column=2, padx=2, pady=2, sticky='e')
         self.end_minute_entry = ttk.Entry(settings_frame, state='disabled', width=4, font=('Arial', 10))
         self.end_minute_entry.grid(row=2, column=3, padx=2, pady=2, sticky='w')
+        self.end_calendar_button = ttk.Button(
+            settings_frame, text='▦', width=2, state='disabled', bootstyle='primary-outline',
+            command=lambda: self.master.data_processor._pick_date(self.end_datetime_selector))
+        self.end_calendar_button.grid(row=2, column=4, padx=2, pady=2)
         ttk.Checkbutton(settings_frame, text='ЭТ + Теплоощущение', variable=self.master.effective_temp_mode,
-                        bootstyle='primary').grid(row=3, column=0, columnspan=4, sticky='w', padx=5, pady=5)
+                        bootstyle='primary').grid(row=3, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Label(settings_frame, text='Индекс:').grid(row=3, column=2, sticky='e', padx=5, pady=2)
+        self.comfort_index_selector = ttk.Combobox(settings_frame, state='readonly', width=15, font=('Arial', 10),
+                                                   textvariable=self.master.comfort_index,
+                                                   values=list(COMFORT_INDICES), bootstyle='primary')
+        self.comfort_index_selector.grid(row=3, column=3, padx=5, pady=2, sticky='ew')
         ttk.Label(settings_frame, text='Температура:').grid(row=4, column=0, sticky='e', padx=5, pady=2)
         self.temp_selector = ttk.Combobox(settings_frame, state='readonly', width=15, font=('Arial', 10),
                                           bootstyle='primary')
@@ -151,6 +211,8 @@ class ChartAppGUI:
         button_frame.grid(row=2, column=0, sticky='ew', pady=5)
         ttk.Button(button_frame, text='Построить', command=self.master.data_processor.render_chart,
                    bootstyle='primary').grid(row=0, column=0, padx=5)
+        ttk.Button(button_frame, text='Открыть интерактивно', command=self.master.data_processor.open_interactive,
+                   bootstyle='info').grid(row=0, column=1, padx=5)
 
     def _configure_time_validation(self):
         hour_validator = (self.master.register(self._validate_hour), '%P')
@@ -227,3 +289,5 @@ class ChartAppGUI:
         self.start_minute_entry.config(state=state_entry)
         self.end_hour_entry.config(state=state_entry)
         self.end_minute_entry.config(state=state_entry)
+        self.start_calendar_button.config(state=state_entry)
+        self.end_calendar_button.config(state=state_entry)
@@ -0,0 +1,241 @@
+import codecs
+import gzip
+import json
+import lzma
+import re
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_KEY = re.compile(r'[ \t\n\r]*"((?:[^"\\]|\\.)*)"[ \t\n\r]*:', re.DOTALL)
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,}])')
+LINE_EXTENSIONS = ('.jsonl', '.ndjson')
+# Сколько текста просматривается в поисках конца первой строки при определении формата
+_DETECT_SIZE = 1 << 20
+COMPRESSED_EXTENSIONS = ('.gz', '.xz', '.zst')
+_MAGIC = {b'\x1f\x8b': 'gzip', b'\xfd7zXZ\x00': 'xz', b'\x28\xb5\x2f\xfd': 'zstd'}
+
+
+def _compression(raw):
+    head = raw.read(6)
+    raw.seek(0)
+    return next((name for magic, name in _MAGIC.items() if head.startswith(magic)), None)
+
+
+@contextmanager
+def open_export(file_path):
+    """
+    Открывает выгрузку для потокового чтения и отдаёт (поток, исходный файл).
+    Сжатые gzip/xz/zstd файлы распознаются по сигнатуре и распаковываются блоками по мере чтения;
+    позиция исходного файла (raw.tell()) показывает, сколько сжатых байт уже прочитано.
+    """
+    with open(file_path, 'rb') as raw:
+        compression = _compression(raw)
+        if compression == 'gzip':
+            file = gzip.GzipFile(fileobj=raw)
+        elif compression == 'xz':
+            file = lzma.LZMAFile(raw)
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise ValueError("Для чтения .zst установите пакет zstandard (pip install zstandard)")
+            file = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+        else:
+            file = raw
+        try:
+            yield file, raw
+        finally:
+            if file is not raw:
+                file.close()
+
+
+def _is_record_line(text, complete):
+    """Проверяет, что первая строка текста - законченная запись NDJSON, а не начало выгрузки-объекта."""
+    line_end = text.find('\n')
+    if line_end < 0 and not complete:
+        return False
+    try:
+        value = json.loads(text[:line_end] if line_end >= 0 else text)
+    except ValueError:
+        return False
+    return isinstance(value, dict) and 'Date' in value and isinstance(value.get('data'), dict)
+
+
+def is_line_export(file_path, sample_size=_DETECT_SIZE):
+    """NDJSON без сжатия - такой файл можно делить между процессами по строкам."""
+    if file_path.lower().endswith(COMPRESSED_EXTENSIONS):
+        return False
+    with open(file_path, 'rb') as raw:
+        if _compression(raw):
+            return False
+        if file_path.lower().endswith(LINE_EXTENSIONS):
+            return True
+        sample = raw.read(sample_size)
+        return _is_record_line(sample.decode('utf-8', errors='ignore'), len(sample) < sample_size)
+
+
+def split_lines(file, parts):
+    """Делит файл на parts диапазонов байт, границы которых совпадают с началом строки."""
+    file.seek(0, 2)
+    size = file.tell()
+    bounds = [0]
+    for num in range(1, parts):
+        file.seek(max(size * num // parts, bounds[-1]))
+        file.readline()
+        if file.tell() >= size:
+            break
+        if file.tell() > bounds[-1]:
+            bounds.append(file.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class JsonRecordStream:
+    """
+    Потоковый разбор выгрузки вида {"0": {...}, "1": {...}} или NDJSON (одна запись на строку).
+    Файл читается блоками по chunk_size байт, в памяти держится только текущий блок и одна запись,
+    поэтому размер файла не ограничен объёмом оперативной памяти.
+    Формат определяется по первому блоку, если lines не задан явно; для NDJSON ключом служит номер строки.
+    length ограничивает чтение диапазоном байт от текущей позиции файла.
+    С track_offsets=True после каждой записи в record_start/record_end лежат байтовые границы её значения в файле,
+    а после разбора в closing_offset - смещение закрывающей скобки (для NDJSON - последней скобки последней записи).
+    С resume=True файл должен стоять на прежней закрывающей скобке: разбираются только записи, дописанные после неё.
+    """
+
+    def __init__(self, file, chunk_size=1 << 20, track_offsets=False, resume=False, lines=None, length=None):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.track_offsets = track_offsets
+        self.resume = resume
+        self.lines = lines
+        self.length = length
+        self.record_start = 0
+        self.record_end = 0
+        self.closing_offset = None
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        # Позиция в буфере и соответствующее ей смещение в файле: байты считаются только по пройденному тексту
+        self._mark = 0
+        self._mark_offset = file.tell() if track_offsets else 0
+        self._ascii = False
+
+    def __iter__(self):
+        if self.resume:
+            if self._next_char() == '}':
+                # Скобка на месте: это NDJSON либо выгрузка-объект без новых записей,
+                # дальше могут идти только записи по строкам
+                self._pos += 1
+                yield from self._iter_lines()
+                return
+            # У дописанной выгрузки-объекта на месте прежней закрывающей скобки стоит запятая
+            self._match(_SEPARATOR, "символ ','")
+        elif self.lines or self.lines is None and self._detect_lines():
+            yield from self._iter_lines()
+            return
+        else:
+            self._expect('{')
+            if self._next_char() == '}':
+                self._pos += 1
+                self._close()
+                return
+        while True:
+            key = self._match(_KEY, 'ключ записи').group(1)
+            if '\\' in key:
+                key = json.loads(f'"{key}"')
+            yield key, self._decode_value()
+            if self._match(_SEPARATOR, "символ ','").group(1) == '}':
+                self._close()
+                return
+
+    def _detect_lines(self):
+        while len(self._buffer) < _DETECT_SIZE and '\n' not in self._buffer and self._fill():
+            pass
+        return _is_record_line(self._buffer[self._pos:], self._eof)
+
+    def _iter_lines(self):
+        end_offset = self._byte_offset(self._pos) if self.track_offsets else 0
+        number = 0
+        while self._next_char():
+            value = self._decode_value()
+            yield str(number), value
+            number += 1
+            end_offset = self.record_end
+        if self.track_offsets and (number or self.resume):
+            self.closing_offset = end_offset - 1
+
+    def _close(self):
+        if self.track_offsets:
+            self.closing_offset = self._byte_offset(self._pos - 1)
+
+    def _fill(self):
+        if self._eof:
+            return False
+        size = self.chunk_size if self.length is None else min(self.chunk_size, self.length - self.bytes_read)
+        chunk = self.file.read(size) if size > 0 else b''
+        self.bytes_read += len(chunk)
+        if self.track_offsets:
+            self._byte_offset(self._pos)
+            self._mark = 0
+        self._buffer = self._buffer[self._pos:] + self._text_decoder.decode(chunk, final=not chunk)
+        self._pos = 0
+        # Для ASCII-текста (обычный json.dump) смещение в байтах совпадает со смещением в символах
+        self._ascii = self.track_offsets and self._buffer.isascii()
+        if not chunk:
+            self._eof = True
+        return True
+
+    def _next_char(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        found = self._next_char()
+        if found != char:
+            raise ValueError(f"Ожидался символ '{char}', получено '{found or 'конец файла'}'")
+        self._pos += 1
+
+    def _match(self, pattern, expected):
+        while True:
+            match = pattern.match(self._buffer, self._pos)
+            if match:
+                self._pos = match.end()
+                return match
+            if not self._fill():
+                found = self._buffer[self._pos:self._pos + 20].strip()
+                raise ValueError(f"Ожидался {expected}, получено '{found or 'конец файла'}'")
+
+    def _decode_value(self):
+        self._next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Запись обрезана границей блока - дочитываем и разбираем заново
+                if not self._fill():
+                    raise
+                continue
+            if self.track_offsets:
+                self.record_start = self._byte_offset(self._pos)
+                self.record_end = self._byte_offset(end)
+            self._pos = end
+            return value
+
+    def _byte_offset(self, pos):
+        if pos > self._mark:
+            if self._ascii:
+                self._mark_offset += pos - self._mark
+            else:
+                self._mark_offset += len(self._buffer[self._mark:pos].encode('utf-8'))
+            self._mark = pos
+        return self._mark_offset
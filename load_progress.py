@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class LoadProgress:
+    """
+    Прогресс загрузки по количеству прочитанных байт.
+    Обновления передаются в callback(процент, оставшиеся секунды) не чаще одного раза за interval_ms,
+    чтобы не переполнять очередь событий Tk на больших файлах.
+    """
+
+    def __init__(self, total_bytes, callback, interval_ms=100):
+        self.total_bytes = max(total_bytes, 1)
+        self.callback = callback
+        self.interval = interval_ms / 1000
+        self._cancel_event = threading.Event()
+        self._started = time.monotonic()
+        self._last_posted = None
+        # Байты, уже учтённые до текущего файла (например, взятые из кэша)
+        self.offset = 0
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise LoadCancelled()
+
+    def update(self, bytes_done, force=False):
+        now = time.monotonic()
+        if not force and self._last_posted is not None and now - self._last_posted < self.interval:
+            return
+        self._last_posted = now
+        fraction = min((self.offset + bytes_done) / self.total_bytes, 1)
+        eta = (now - self._started) * (1 - fraction) / fraction if fraction > 0 else None
+        self.callback(fraction * 100, eta)
+
+    @staticmethod
+    def format_eta(seconds):
+        if seconds is None:
+            return ''
+        seconds = int(round(seconds))
+        if seconds < 1:
+            return 'осталось < 1 с'
+        if seconds < 60:
+            return f'осталось ~{seconds} с'
+        return f'осталось ~{seconds // 60} мин {seconds % 60:02d} с'
@@ -1,4 +1,5 @@
 import tkinter as tk
+from thermal_comfort import SENSATION_COLORS
 from gui import ChartAppGUI
 from data_processing import DataProcessor
 
@@ -9,8 +10,11 @@ class ChartApp(tk.Tk):
 
         """TitleBar"""
         self.title("Calculus Graphicus")
-        self.geometry("1200x400")
-        self.resizable(False, False)
+        # Высота рассчитана на флажки загрузки, список сравнения и строки поиска параметров;
+        # по вертикали окно можно растянуть, если шрифты системы крупнее
+        self.geometry("1200x560")
+        self.minsize(1200, 560)
+        self.resizable(False, True)
         self.iconbitmap(r"myApp.ico")
 
         """Device data"""
@@ -23,27 +27,22 @@ class ChartApp(tk.Tk):
         self.avg_three_hours = tk.BooleanVar(value=False)
         self.avg_one_day = tk.BooleanVar(value=False)
         self.min_max_daily = tk.BooleanVar(value=False)
+        self.anomalies = tk.BooleanVar(value=False)
+        self.compact_storage = tk.BooleanVar(value=False)
+        self.lazy_loading = tk.BooleanVar(value=False)
+        self.follow_file = tk.BooleanVar(value=False)
         self.min_datetime = None
         self.max_datetime = None
 
         """Chart Flags"""
         self.chart_style = tk.StringVar(value='line')
+        self.comfort_index = tk.StringVar(value='ЭТ')
         self.chart_figure = None
         self.chart_display = None
         self.chart_canvas = None
         self.matplotlib_figure = None
 
-        self.sensation_colors = {
-            'Крайне холодно': '#000080',
-            'Очень холодно': '#0000FF',
-            'Холодно': '#87CEFA',
-            'Умеренно холодно': '#ADD8E6',
-            'Прохладно': '#008000',
-            'Умеренно тепло': '#9ACD32',
-            'Тепло': '#FFD700',
-            'Жарко': '#FF8C00',
-            'Очень жарко': '#FF0000'
-        }
+        self.sensation_colors = dict(SENSATION_COLORS)
 
         self.data_processor = DataProcessor(self)
         self.gui = ChartAppGUI(self)
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+SENSATION_COLORS = {
+    'Крайне холодно': '#000080',
+    'Очень холодно': '#0000FF',
+    'Холодно': '#87CEFA',
+    'Умеренно холодно': '#ADD8E6',
+    'Прохладно': '#008000',
+    'Умеренно тепло': '#9ACD32',
+    'Тепло': '#FFD700',
+    'Жарко': '#FF8C00',
+    'Очень жарко': '#FF0000'
+}
+# Нижние границы категорий теплоощущения по ЭТ, °C; категории в SENSATION_COLORS идут по возрастанию
+SENSATION_THRESHOLDS = (-24, -12, 0, 6, 12, 18, 24, 30)
+
+
+class ComfortScale:
+    """Шкала индекса: нижние границы категорий по возрастанию, названия категорий (на одну больше) и их цвета."""
+
+    __slots__ = ('thresholds', 'categories', 'colors')
+
+    def __init__(self, thresholds, colors):
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.categories = tuple(colors)
+        self.colors = colors
+
+    def codes(self, values):
+        """Номер категории каждого значения одним searchsorted; -1 - нет данных."""
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.searchsorted(self.thresholds, values, side='right').astype(np.int8)
+        codes[np.isnan(values)] = -1
+        return codes
+
+    def classify(self, series):
+        """Категории ряда как pandas.Categorical: коды int8 вместо строки на каждую запись."""
+        codes = self.codes(series.to_numpy(dtype=np.float64, na_value=np.nan))
+        return pd.Series(pd.Categorical.from_codes(codes, categories=self.categories), index=series.index,
+                         name=series.name)
+
+
+SENSATION_SCALE = ComfortScale(SENSATION_THRESHOLDS, SENSATION_COLORS)
+HUMIDEX_SCALE = ComfortScale((30, 40, 46), {
+    'Без дискомфорта': '#008000',
+    'Небольшой дискомфорт': '#FFD700',
+    'Сильный дискомфорт': '#FF8C00',
+    'Опасно': '#FF0000'
+})
+HEAT_INDEX_SCALE = ComfortScale((27, 32, 41, 54), {
+    'Норма': '#008000',
+    'Осторожно': '#FFD700',
+    'Повышенная осторожность': '#FF8C00',
+    'Опасно': '#FF0000',
+    'Крайне опасно': '#8B0000'
+})
+DEW_POINT_SCALE = ComfortScale((10, 16, 18, 21), {
+    'Сухо': '#87CEFA',
+    'Комфортно': '#008000',
+    'Влажно': '#FFD700',
+    'Душно': '#FF8C00',
+    'Тягостно': '#FF0000'
+})
+
+
+def classify_sensation(effective_temp):
+    """Теплоощущение одного значения ЭТ или None для пропуска."""
+    if pd.isna(effective_temp):
+        return None
+    return SENSATION_SCALE.categories[int(np.searchsorted(SENSATION_SCALE.thresholds, effective_temp, side='right'))]
+
+
+def _like(template, values):
+    # np.where возвращает массив - для ряда pandas восстанавливается его индекс
+    return pd.Series(values, index=template.index) if isinstance(template, pd.Series) else values
+
+
+def effective_temperature(temperature, humidity):
+    """Эффективная температура (Миссенард) по температуре, °C, и относительной влажности, %."""
+    return temperature - 0.4 * (temperature - 10) * (1 - humidity / 100)
+
+
+def equivalent_effective_temperature(temperature, humidity, wind_speed=0.0):
+    """Эквивалентно-эффективная температура (Миссенард) с учётом скорости ветра, м/с; в помещении ветра нет."""
+    return (37 - (37 - temperature) / (0.68 - 0.0014 * humidity + 1 / (1.76 + 1.4 * wind_speed ** 0.75))
+            - 0.29 * temperature * (1 - humidity / 100))
+
+
+def dew_point(temperature, humidity):
+    """Точка росы по формуле Магнуса, °C; при нулевой влажности - NaN."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = np.log(humidity / 100) + 17.62 * temperature / (243.12 + temperature)
+        result = 243.12 * gamma / (17.62 - gamma)
+    return _like(temperature, np.where(np.isfinite(result), result, np.nan))
+
+
+def humidex(temperature, humidity):
+    """Хьюмидекс (Канада) по температуре и точке росы."""
+    vapour_pressure = 6.11 * np.exp(5417.7530 * (1 / 273.16 - 1 / (273.15 + dew_point(temperature, humidity))))
+    return temperature + 0.5555 * (vapour_pressure - 10)
+
+
+def heat_index(temperature, humidity):
+    """
+    Индекс жары NWS, °C: простая формула Стедмана, а от 80 °F - регрессия Ротфуса с поправками
+    на низкую и высокую влажность. Все ветви считаются для всего ряда и выбираются через where.
+    """
+    fahrenheit = temperature * 1.8 + 32
+    simple = 0.5 * (fahrenheit + 61 + (fahrenheit - 68) * 1.2 + humidity * 0.094)
+    full = (-42.379 + 2.04901523 * fahrenheit + 10.14333127 * humidity - 0.22475541 * fahrenheit * humidity
+            - 6.83783e-3 * fahrenheit ** 2 - 5.481717e-2 * humidity ** 2 + 1.22874e-3 * fahrenheit ** 2 * humidity
+            + 8.5282e-4 * fahrenheit * humidity ** 2 - 1.99e-6 * fahrenheit ** 2 * humidity ** 2)
+    with np.errstate(invalid='ignore'):
+        dry = (13 - humidity) / 4 * np.sqrt((17 - np.abs(fahrenheit - 95)) / 17)
+    humid = (humidity - 85) / 10 * (87 - fahrenheit) / 5
+    full = np.where((humidity < 13) & (fahrenheit >= 80) & (fahrenheit <= 112), full - dry, full)
+    full = np.where((humidity > 85) & (fahrenheit >= 80) & (fahrenheit <= 87), full + humid, full)
+    return _like(temperature, (np.where((simple + fahrenheit) / 2 >= 80, full, simple) - 32) / 1.8)
+
+
+class ComfortIndex:
+    """
+    Индекс теплового комфорта: подписи графика, формула от (температура, влажность) и шкала категорий.
+    name - название индекса для сообщений об ошибке.
+    """
+
+    __slots__ = ('label', 'name', 'title', 'y_title', 'compute', 'scale')
+
+    def __init__(self, label, name, title, y_title, compute, scale):
+        self.label = label
+        self.name = name
+        self.title = title
+        self.y_title = y_title
+        self.compute = compute
+        self.scale = scale
+
+
+COMFORT_INDICES = {index.label: index for index in (
+    ComfortIndex('ЭТ', 'эффективную температуру', 'ЭТ и Теплоощущение', 'Эф. температура (°C)',
+                 effective_temperature, SENSATION_SCALE),
+    ComfortIndex('ЭЭТ', 'эквивалентно-эффективную температуру', 'ЭЭТ и Теплоощущение', 'Экв.-эф. температура (°C)',
+                 equivalent_effective_temperature, SENSATION_SCALE),
+    ComfortIndex('Хьюмидекс', 'хьюмидекс', 'Хьюмидекс', 'Хьюмидекс (°C)', humidex, HUMIDEX_SCALE),
+    ComfortIndex('Индекс жары', 'индекс жары', 'Индекс жары', 'Индекс жары (°C)', heat_index, HEAT_INDEX_SCALE),
+    ComfortIndex('Точка росы', 'точку росы', 'Точка росы', 'Точка росы (°C)', dew_point, DEW_POINT_SCALE),
+)}
+
+
+def calculate_comfort_index(data, temp_column, humidity_column, index='ЭТ'):
+    """
+    Значения индекса и их категории (Categorical); при непригодных данных - ValueError с текстом для пользователя.
+    """
+    if temp_column not in data.columns or humidity_column not in data.columns:
+        raise ValueError('Выбранные параметры температуры или влажности отсутствуют в данных.')
+    comfort_index = COMFORT_INDICES[index]
+    values = comfort_index.compute(data[temp_column], data[humidity_column])
+    if values.isna().all():
+        raise ValueError(f'Невозможно вычислить {comfort_index.name}: данные содержат только NaN.')
+    return values, comfort_index.scale.classify(values)
+
+
+def calculate_effective_temperature(data, temp_column, humidity_column):
+    """Эффективная температура и теплоощущение; при непригодных данных - ValueError с текстом для пользователя."""
+    return calculate_comfort_index(data, temp_column, humidity_column, 'ЭТ')